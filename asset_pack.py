@@ -0,0 +1,271 @@
+# asset_pack.py
+"""
+Пак ассетов: один файл со всеми картинками, звуками и данными уровней.
+
+Формат (все числа little-endian):
+- заголовок 32 байта: магия b"FMGPACK\\0", версия (u32), число записей (u32),
+  смещение индекса (u64), длина индекса (u64);
+- данные записей подряд, каждая выровнена на PACK_ALIGN байт;
+- индекс в конце файла: JSON {"entries": [{name, offset, length, type, hash}]},
+  hash - SHA-1 содержимого.
+
+Имена записей - пути с прямыми слешами, как в коде игры:
+- "Изображения/..." - картинки (type "image");
+- "mp/..."          - звуки из mp.zip с исправленными именами (type "sound");
+- "level_cache/..." - скомпилированные уровни (type "level" / "level_meta").
+
+Пак читается через mmap: view(name) отдаёт memoryview на кусок файла без
+копирования, open_file(name) - файловый объект поверх него же (для PIL и
+pyglet). Вместо сотни open() и распаковки zip на старте - одно открытие
+файла и подкачка нужных страниц.
+
+Сборка пака:
+    python asset_pack.py build              # -> assets.pack
+    python asset_pack.py list               # содержимое пака
+    python asset_pack.py verify             # проверка хэшей
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import zipfile
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+PACK_FILENAME = "assets.pack"
+PACK_MAGIC = b"FMGPACK\0"
+PACK_VERSION = 1
+PACK_ALIGN = 16
+
+HEADER = struct.Struct("<8sIIQQ")
+
+IMAGES_DIR = "Изображения"
+SOUNDS_PREFIX = "mp/"
+
+
+class PackEntry(NamedTuple):
+    """Запись индекса пака"""
+    name: str
+    offset: int
+    length: int
+    type: str
+    hash: str
+
+
+def normalize_name(name: str) -> str:
+    """Имя записи: прямые слеши, без ./ в начале"""
+    name = name.replace("\\", "/")
+    return name[2:] if name.startswith("./") else name
+
+
+class PackReader(io.RawIOBase):
+    """Файловый объект только для чтения поверх memoryview (без копирования)"""
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self.view = view
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self.view) - self.position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self.view[self.position:self.position + size]
+        self.position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+
+class AssetPack:
+    """Чтение пака через mmap"""
+
+    def __init__(self, path: str = PACK_FILENAME):
+        self.path = path
+        self.file = None
+        self.mmap: Optional[mmap.mmap] = None
+        self.entries: Dict[str, PackEntry] = {}
+        self.failed = False  # пака нет или он битый - работаем с отдельными файлами
+
+    def open(self) -> bool:
+        """Отобразить пак в память и прочитать индекс"""
+        if self.mmap is not None:
+            return True
+        if self.failed:
+            return False
+        if not os.path.exists(self.path):
+            self.failed = True  # пак необязателен
+            return False
+        try:
+            self.file = open(self.path, "rb")
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count, index_offset, index_length = HEADER.unpack_from(self.mmap, 0)
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise ValueError("неизвестный формат")
+            index = json.loads(bytes(self.mmap[index_offset:index_offset + index_length]))
+            for item in index["entries"]:
+                entry = PackEntry(item["name"], item["offset"], item["length"], item["type"], item["hash"])
+                self.entries[entry.name] = entry
+            if len(self.entries) != count:
+                raise ValueError("индекс повреждён")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ошибка при открытии пака {self.path}: {e}")
+            self.close()
+            self.failed = True
+            return False
+        return True
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.entries.clear()
+
+    def __contains__(self, name: str) -> bool:
+        return self.open() and normalize_name(name) in self.entries
+
+    def get(self, name: str) -> Optional[PackEntry]:
+        """Запись по имени или None"""
+        if not self.open():
+            return None
+        return self.entries.get(normalize_name(name))
+
+    def names(self, entry_type: Optional[str] = None) -> List[str]:
+        """Имена записей (при entry_type - только этого типа)"""
+        if not self.open():
+            return []
+        return [name for name, entry in self.entries.items()
+                if entry_type is None or entry.type == entry_type]
+
+    def view(self, name: str) -> memoryview:
+        """Содержимое записи без копирования"""
+        entry = self.get(name)
+        if entry is None:
+            raise KeyError(name)
+        return memoryview(self.mmap)[entry.offset:entry.offset + entry.length]
+
+    def open_file(self, name: str) -> io.BufferedReader:
+        """Файловый объект для чтения записи (для PIL, pyglet, numpy)"""
+        return io.BufferedReader(PackReader(self.view(name)))
+
+    def verify(self, name: str) -> bool:
+        """Сверить хэш записи"""
+        return hashlib.sha1(self.view(name)).hexdigest() == self.get(name).hash
+
+
+# === СБОРКА ===
+
+def collect_images(root: str = IMAGES_DIR) -> Iterable[Tuple[str, str, bytes]]:
+    """Все картинки из папки Изображения"""
+    for directory, _, files in sorted(os.walk(root)):
+        for file_name in sorted(files):
+            if file_name.lower().endswith(".png"):
+                path = os.path.join(directory, file_name)
+                with open(path, "rb") as f:
+                    yield normalize_name(path), "image", f.read()
+
+
+def collect_sounds(zip_path: str) -> Iterable[Tuple[str, str, bytes]]:
+    """Звуки из mp.zip (с исправленными именами, уже распакованные)"""
+    from audio import fix_zip_name
+    if not os.path.exists(zip_path):
+        print(f"{zip_path} не найден - звуки в пак не попадут")
+        return
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = fix_zip_name(info)
+            if not name.startswith(SOUNDS_PREFIX):
+                name = SOUNDS_PREFIX + name
+            yield name, "sound", archive.read(info)
+
+
+def collect_levels() -> Iterable[Tuple[str, str, bytes]]:
+    """Скомпилированные уровни (компилируются перед упаковкой)"""
+    from constants import LEVELS
+    from level_compiler import cache_paths, compile_level
+    for level in LEVELS.values():
+        compile_level(level["map"])
+        array_path, meta_path = cache_paths(level["map"])
+        for path, entry_type in ((array_path, "level"), (meta_path, "level_meta")):
+            with open(path, "rb") as f:
+                yield normalize_name(path), entry_type, f.read()
+
+
+def build_pack(output: str = PACK_FILENAME, zip_path: str = "mp.zip") -> List[PackEntry]:
+    """Собрать пак из картинок, звуков и уровней"""
+    entries = []
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        sources = (collect_images(), collect_sounds(zip_path), collect_levels())
+        for source in sources:
+            for name, entry_type, data in source:
+                padding = -f.tell() % PACK_ALIGN
+                f.write(b"\0" * padding)
+                entries.append(PackEntry(name, f.tell(), len(data), entry_type,
+                                         hashlib.sha1(data).hexdigest()))
+                f.write(data)
+
+        index = json.dumps({"entries": [entry._asdict() for entry in entries]},
+                           ensure_ascii=False).encode("utf-8")
+        index_offset = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries), index_offset, len(index)))
+    os.replace(tmp_path, output)
+    return entries
+
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else "build"
+    path = argv[2] if len(argv) > 2 else PACK_FILENAME
+
+    if command == "build":
+        entries = build_pack(path)
+        total = sum(entry.length for entry in entries)
+        print(f"Пак {path}: {len(entries)} записей, {total / 1024:.0f} КБ данных")
+        return 0
+
+    pack = AssetPack(path)
+    if not pack.open():
+        print(f"Пак {path} не открылся")
+        return 1
+    if command == "list":
+        for entry in pack.entries.values():
+            print(f"{entry.type:10} {entry.length:10}  {entry.name}")
+        return 0
+    if command == "verify":
+        broken = [name for name in pack.entries if not pack.verify(name)]
+        for name in broken:
+            print(f"Хэш не совпал: {name}")
+        print("Пак в порядке" if not broken else f"Повреждено записей: {len(broken)}")
+        return 1 if broken else 0
+
+    print(f"Неизвестная команда: {command} (build, list, verify)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
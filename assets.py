@@ -0,0 +1,330 @@
+# assets.py
+"""
+Манифест ассетов и фоновая загрузка по группам.
+
+Все картинки и звуки игры перечислены в ASSET_MANIFEST и разбиты на группы:
+- "menu"   - нужно сразу при запуске (музыка меню);
+- "level"  - нужно при старте уровня (здания, игрок, дрон, тайлы, фоновая музыка);
+- "combat" - нужно к первой волне (жуки, турели, пули, звуки стрельбы).
+
+AssetLoader декодирует группу в пуле потоков и отдаёт futures:
+- wait(group, timeout) - дождаться группы (например, на экране загрузки);
+- get(key, default) - не блокирует: если ассет ещё не готов, вернёт default;
+- require(key) - дождаться одного ассета (блокирует только на нём);
+- preload(key, func, *args) - любая другая фоновая задача в том же пуле
+  (например, загрузка следующего уровня, см. preload_level).
+
+Картинки грузятся через общий кэш текстур arcade, поэтому потом
+arcade.Sprite(path) с тем же путём берёт готовую текстуру из кэша,
+а не читает и не разбирает файл посреди кадра.
+
+Если рядом с игрой собран пак ассетов (assets.pack, см. asset_pack.py),
+картинки, звуки и уровни читаются из него: один файл, отображённый в
+память, вместо сотни отдельных открытий файлов и распаковки mp.zip.
+Без пака всё грузится из отдельных файлов, как раньше.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import arcade
+import PIL.Image
+
+from asset_pack import PACK_FILENAME, AssetPack
+from audio import ZIP_FILENAME, ZipAudio
+
+# Группы в порядке загрузки
+ASSET_GROUPS = ["menu", "level", "combat"]
+
+# Сколько потоков декодируют ассеты
+LOADER_WORKERS = 4
+
+# Сколько секунд уровень ждёт свои ассеты, прежде чем стартовать без них
+LEVEL_LOAD_TIMEOUT = 5.0
+
+# ключ -> (группа, вид, путь или список путей)
+# вид: "texture" - картинка, "music" - потоковый трек из mp.zip,
+#      "effect" - короткий звук из mp.zip (декодируется целиком)
+ASSET_MANIFEST: Dict[str, Tuple[str, str, Any]] = {
+    # --- Меню ---
+    "music_menu": ("menu", "music", "OST/Меню/ДляМеню.mp3"),
+
+    # --- Уровень ---
+    "music_calm": ("level", "music", [
+        "OST/Обычная/Обычная1.mp3",
+        "OST/Обычная/Обычная2.mp3",
+        "OST/Обычная/Обычная3.mp3",
+    ]),
+    "core": ("level", "texture", "Изображения/Здания/Ядро (2).png"),
+    "player": ("level", "texture", "Изображения/Остальное/Нгг.png"),
+    "drone": ("level", "texture", "Изображения/Остальное/Дрон.png"),
+    "drill": ("level", "texture", "Изображения/Здания/Буры/Бур.png"),
+    "furnace": ("level", "texture", "Изображения/Здания/Заводы/Печь.png"),
+    "factory": ("level", "texture", "Изображения/Здания/Заводы/Завод.png"),
+    "resource_icons": ("level", "texture", [
+        "Изображения/Остальное/Ресурсы/Медь.png",
+        "Изображения/Остальное/Ресурсы/Олово.png",
+        "Изображения/Остальное/Ресурсы/Уголь.png",
+        "Изображения/Остальное/Ресурсы/Бронза.png",
+        "Изображения/Остальное/Ресурсы/Кремний.png",
+        "Изображения/Остальное/Ресурсы/Боеприпасы.png",
+    ]),
+    "tiles": ("level", "texture", [
+        "Изображения/assets/Камень_1.png",
+        "Изображения/assets/Камень_1_Медная руда.png",
+        "Изображения/assets/Камень_1_Оловяно_свинцовавая_руда.png",
+        "Изображения/assets/Камень_1_Уголь.png",
+        "Изображения/assets/Камень_2.png",
+        "Изображения/assets/Камень_2_Медная руда.png",
+        "Изображения/assets/Камень_2_Оловяно_свинцовавая_руда.png",
+        "Изображения/assets/Камень_2_Уголь.png",
+        "Изображения/assets/Песок_1 (2).png",
+        "Изображения/assets/Песок_1 Медная руда.png",
+        "Изображения/assets/Песок_1 Оловяно-свинцовавая руда.png",
+        "Изображения/assets/Песок_1 Уголь.png",
+        "Изображения/assets/Песок_2 (2).png",
+        "Изображения/assets/Песок_2 Медная руда.png",
+        "Изображения/assets/Песок_2 Оловяно-свинцовавая руда.png",
+        "Изображения/assets/Песок_2 Уголь.png",
+        "Изображения/assets/Песок_3 (2).png",
+        "Изображения/assets/Песок_3 Медная руда.png",
+        "Изображения/assets/Песок_3 Оловяно-свинцовавая руда.png",
+        "Изображения/assets/Песок_3 Уголь.png",
+    ]),
+
+    # --- Бой ---
+    "music_attack": ("combat", "music", [
+        "OST/Атака/Атака1.mp3",
+        "OST/Атака/Атака2.mp3",
+        "OST/Атака/Атака3.mp3",
+    ]),
+    "hit": ("combat", "effect", [
+        "Стрельба/Поподание/п1.mp3",
+        "Стрельба/Поподание/п2.mp3",
+        "Стрельба/Поподание/п3.mp3",
+        "Стрельба/Поподание/п4.mp3",
+        "Стрельба/Поподание/п5.mp3",
+        "Стрельба/Поподание/п6.mp3",
+        "Стрельба/Поподание/п7.mp3",
+    ]),
+    "turret_copper": ("combat", "effect", [
+        "Стрельба/Турель/Медная/т1.mp3",
+        "Стрельба/Турель/Медная/т2.mp3",
+        "Стрельба/Турель/Медная/т3.mp3",
+    ]),
+    "turret_bronze": ("combat", "effect", [
+        "Стрельба/Турель/Бронзавая/т1.mp3",
+        "Стрельба/Турель/Бронзавая/т2.mp3",
+    ]),
+    "turret_long": ("combat", "effect", [
+        "Стрельба/Турель/Длинноствольная/т1.mp3",
+        "Стрельба/Турель/Длинноствольная/т2.mp3",
+        "Стрельба/Турель/Длинноствольная/т3.mp3",
+    ]),
+    "turret_base": ("combat", "texture", "Изображения/Здания/Турели/РГ турель основание.png"),
+    "turret_tower": ("combat", "texture", "Изображения/Здания/Турели/РГ турель башня.png"),
+    "bullet": ("combat", "texture", "Изображения/Остальное/Пуля.png"),
+    "stone": ("combat", "texture", "Изображения/Остальное/Камень.png"),
+    "bugs": ("combat", "texture", [
+        "Изображения/Жуки/Обычный/Жук.png",
+        "Изображения/Жуки/Крепкий/Жук брониносиц.png",
+        "Изображения/Жуки/Плевака/Жук плевака.png",
+        "Изображения/Жуки/Харкатель/Харкатель (2).png",
+    ]),
+}
+
+
+def level_key(path: str) -> str:
+    """Ключ фоновой задачи загрузки уровня"""
+    return "level:" + path
+
+
+def load_compiled_level(path: str, tile_size: int, pack: Optional[AssetPack] = None):
+    """Скомпилированный уровень из пака или кэша (компилятор импортируется только здесь)"""
+    from level_compiler import load_level
+    return load_level(path, tile_size, pack=pack)
+
+
+class AssetLoader:
+    """Фоновая загрузка ассетов из манифеста в пуле потоков"""
+
+    def __init__(self, audio: ZipAudio, manifest: Dict[str, Tuple[str, str, Any]] = ASSET_MANIFEST,
+                 workers: int = LOADER_WORKERS, pack: Optional[AssetPack] = None):
+        """
+        audio: архив звуков mp.zip
+        manifest: ключ -> (группа, вид, путь или список путей)
+        workers: число потоков декодирования
+        pack: пак ассетов (None - только отдельные файлы)
+        """
+        self.audio = audio
+        self.pack = pack
+        self.manifest = manifest
+        self.workers = workers
+        self.executor: Optional[ThreadPoolExecutor] = None  # создаётся при первой загрузке
+        self.futures: Dict[str, Future] = {}
+        self.failed: Set[str] = set()  # упавшие загрузки: get() ставит их в очередь заново
+        self.lock = threading.Lock()
+
+    def keys(self, group: str) -> List[str]:
+        """Ключи ассетов группы"""
+        return [key for key, entry in self.manifest.items() if entry[0] == group]
+
+    # === ЗАПУСК ЗАГРУЗКИ ===
+
+    def load_group(self, group: str) -> List[Future]:
+        """
+        Поставить группу в очередь на загрузку (повторный вызов ничего не делает).
+        Возвращает futures всех ассетов группы.
+        """
+        return [self._submit(key) for key in self.keys(group)]
+
+    def load_groups(self, *groups: str):
+        """Поставить в очередь несколько групп по порядку"""
+        for group in groups:
+            self.load_group(group)
+
+    def _submit(self, key: str) -> Future:
+        if key not in self.manifest:
+            # Задача вне манифеста: её должны были запустить через preload()
+            future = self.futures.get(key)
+            if future is None:
+                raise KeyError(key)
+            return future
+        if key not in self.futures:
+            # Пак и каталог архива открываются один раз в основном потоке,
+            # дальше потоки только читают и декодируют
+            self._open_pack()
+            if self.manifest[key][1] != "texture":
+                self.audio.open()
+        return self.preload(key, self._load, key)
+
+    def _open_pack(self) -> bool:
+        return self.pack is not None and self.pack.open()
+
+    def preload(self, key: str, func: Callable, *args) -> Future:
+        """
+        Фоновая задача вне манифеста (результат потом берётся через get/require).
+        Повторный вызов с тем же ключом возвращает уже запущенную задачу;
+        упавшая задача не запоминается, и следующий вызов запускает её снова.
+        """
+        with self.lock:
+            future = self.futures.get(key)
+            if future is not None:
+                return future
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="assets"
+                )
+            future = self.executor.submit(func, *args)
+            self.futures[key] = future
+            self.failed.discard(key)
+        # Вне lock: у уже завершённой задачи колбэк вызывается сразу, в этом потоке
+        future.add_done_callback(lambda done: self._forget_failed(key, done))
+        return future
+
+    def _forget_failed(self, key: str, future: Future):
+        """Убрать упавшую или отменённую задачу, чтобы её можно было запустить снова"""
+        cancelled = future.cancelled()
+        if not cancelled and future.exception() is None:
+            return
+        with self.lock:
+            if self.futures.get(key) is future:
+                del self.futures[key]
+                if not cancelled:
+                    self.failed.add(key)
+
+    def preload_level(self, path: str, tile_size: int) -> Future:
+        """Загрузить скомпилированный уровень в фоне (результат - CompiledLevel)"""
+        pack = self.pack if self._open_pack() else None
+        return self.preload(level_key(path), load_compiled_level, path, tile_size, pack)
+
+    def _load(self, key: str):
+        """Загрузка одного ассета (выполняется в потоке пула)"""
+        kind, paths = self.manifest[key][1:]
+        if isinstance(paths, str):
+            return self._load_one(kind, paths)
+        # У списка пропускаем то, что не загрузилось
+        return [asset for asset in (self._load_one(kind, path) for path in paths)
+                if asset is not None]
+
+    def _load_one(self, kind: str, path: str):
+        if kind == "texture":
+            try:
+                if self.pack is not None and path in self.pack:
+                    self._cache_packed_image(path)
+                return arcade.texture.default_texture_cache.load_or_get_texture(path)
+            except (OSError, ValueError) as e:
+                print(f"Ошибка при загрузке картинки {path}: {e}")
+                return None
+        if kind == "music":
+            return self.audio.load_music(path)
+        return self.audio.load_effect(path)
+
+    def _cache_packed_image(self, path: str):
+        """
+        Декодировать картинку из пака и положить в кэш картинок arcade
+        под тем же именем, под которым её искал бы arcade.Sprite(path)
+        """
+        cache = arcade.texture.default_texture_cache.image_data_cache
+        name = arcade.Texture.create_image_cache_name(arcade.resources.resolve(path))
+        if cache.get(name) is not None:
+            return
+        image = PIL.Image.open(self.pack.open_file(path)).convert("RGBA")
+        cache.put(name, arcade.texture.ImageData(image, hash=self.pack.get(path).hash))
+
+    # === ПОЛУЧЕНИЕ ===
+
+    def is_ready(self, key: str) -> bool:
+        """Загружен ли ассет"""
+        future = self.futures.get(key)
+        return future is not None and future.done()
+
+    def get(self, key: str, default=None):
+        """
+        Ассет, если он уже загружен, иначе default.
+        Никогда не блокирует - годится для кода внутри кадра.
+        """
+        future = self.futures.get(key)
+        if future is None and key in self.failed and key in self.manifest:
+            # Прошлая загрузка упала - пробуем ещё раз в фоне
+            self._submit(key)
+            return default
+        if future is None or not future.done() or future.exception() is not None:
+            return default
+        result = future.result()
+        return default if result is None else result
+
+    def require(self, key: str, timeout: Optional[float] = None):
+        """Дождаться одного ассета (если он ещё не в очереди - поставить)"""
+        try:
+            return self._submit(key).result(timeout)
+        except Exception as e:
+            print(f"Ассет {key} не загружен: {e}")
+            return None
+
+    def wait(self, group: str, timeout: Optional[float] = None) -> bool:
+        """
+        Дождаться загрузки группы (не дольше timeout секунд).
+        Возвращает True, если вся группа готова.
+        """
+        futures = self.load_group(group)
+        _, not_done = wait_futures(futures, timeout=timeout)
+        return not not_done
+
+    def progress(self, *groups: str) -> float:
+        """Доля загруженных ассетов в группах (0..1) для экрана загрузки"""
+        keys = [key for group in groups for key in self.keys(group)]
+        if not keys:
+            return 1.0
+        return sum(1 for key in keys if self.is_ready(key)) / len(keys)
+
+    def shutdown(self):
+        """Остановить пул (незапущенные задачи отменяются)"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Пак ассетов (если собран) и общий загрузчик ассетов игры
+ASSET_PACK = AssetPack(PACK_FILENAME)
+ASSETS = AssetLoader(ZipAudio(ZIP_FILENAME, pack=ASSET_PACK), pack=ASSET_PACK)
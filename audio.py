@@ -0,0 +1,232 @@
+# audio.py
+"""
+Загрузка звуков прямо из архива mp.zip, без распаковки на диск.
+
+- Музыка (длинные треки) проигрывается потоково: в памяти держится только
+  сжатый mp3 из архива, декодирование идёт по ходу воспроизведения.
+- Короткие эффекты (попадания, выстрелы) декодируются один раз, и готовый
+  PCM сохраняется в постоянный кэш audio_cache/ в формате WAV.
+  Ключ кэша - CRC32 и размер члена архива (берутся из заголовка zip),
+  так что при замене звука в архиве кэш обновится сам.
+
+Имена в mp.zip записаны в кодировке cp866 без флага UTF-8, поэтому
+zipfile читает их как cp437 («OST/îÑ¡ε/...»). Архив индексируется по
+исправленным именам («OST/Меню/...»), старые искажённые тоже находятся.
+
+Если собран пак ассетов (asset_pack.py) и в нём есть звуки, они берутся
+из пака: члены уже распакованы и читаются из отображённого в память файла,
+mp.zip при этом не открывается.
+"""
+import io
+import os
+import wave
+import zipfile
+from typing import Dict, Optional, Union
+
+import arcade
+from pyglet import media
+from pyglet.media.codecs.base import AudioFormat, StaticMemorySource
+
+from asset_pack import AssetPack, PackEntry
+
+ZIP_FILENAME = "mp.zip"
+ZIP_ROOT = "mp/"  # все звуки лежат в архиве внутри папки mp/
+AUDIO_CACHE_DIR = "audio_cache"
+
+# Размер порции при декодировании эффекта
+DECODE_CHUNK = 64 * 1024
+
+# Член архива или запись пака
+Member = Union[zipfile.ZipInfo, PackEntry]
+
+
+def fix_zip_name(info: zipfile.ZipInfo) -> str:
+    """Исправленное имя члена архива (cp437 -> cp866, если нет флага UTF-8)"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("cp866")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+class ZipSound(arcade.Sound):
+    """
+    Звук, источник которого берётся из байтов в памяти, а не из файла.
+    Совместим с arcade.play_sound/arcade.stop_sound.
+    """
+
+    def __init__(self, name: str, data: bytes = b"", streaming: bool = False,
+                 source: Optional[media.Source] = None):
+        """
+        name: имя для подсказки декодеру (по расширению) и для отладки
+        data: сжатые байты файла (для потоковой музыки)
+        source: уже готовый (декодированный) источник для эффектов
+        """
+        self.file_name = name
+        self.data = data
+        self.streaming = streaming
+        self.min_distance = 100000000  # как в arcade.Sound
+        self.source = source if source is not None else self._open()
+        if self.source.duration is None:
+            raise ValueError(f"Не удалось определить длительность звука {name}")
+
+    def _open(self) -> media.Source:
+        return media.load(self.file_name, file=io.BytesIO(self.data), streaming=self.streaming)
+
+    def play(self, volume: float = 1.0, pan: float = 0.0, loop: bool = False,
+             speed: float = 1.0) -> media.Player:
+        """
+        Потоковый источник можно проиграть только один раз,
+        поэтому для музыки каждый запуск открывает новый поток из памяти.
+        """
+        if self.streaming and self.source.is_player_source:
+            self.source = self._open()
+        return super().play(volume=volume, pan=pan, loop=loop, speed=speed)
+
+
+class ZipAudio:
+    """Индекс звуков в mp.zip и загрузка музыки/эффектов из него"""
+
+    def __init__(self, zip_path: str = ZIP_FILENAME, cache_dir: str = AUDIO_CACHE_DIR,
+                 pack: Optional[AssetPack] = None):
+        """
+        zip_path: архив со звуками
+        cache_dir: папка кэша декодированных эффектов
+        pack: пак ассетов (если в нём есть звуки, архив не нужен)
+        """
+        self.zip_path = zip_path
+        self.cache_dir = cache_dir
+        self.pack = pack
+        self.packed = False  # звуки берутся из пака
+        self.archive: Optional[zipfile.ZipFile] = None
+        self.members: Dict[str, Member] = {}
+        self.effects: Dict[str, ZipSound] = {}  # уже загруженные эффекты
+        self.failed = False  # архив не открылся - больше не пытаемся
+
+    def open(self) -> bool:
+        """Открыть архив и построить индекс (только чтение каталога zip)"""
+        if self.archive is not None or self.packed:
+            return True
+        if self.failed:
+            return False
+        if self.pack is not None and self.pack.open():
+            for name in self.pack.names("sound"):
+                self.members[name[len(ZIP_ROOT):]] = self.pack.get(name)
+            if self.members:
+                self.packed = True
+                return True
+        if not os.path.exists(self.zip_path):
+            print(f"Ошибка: Файл {self.zip_path} не найден! Звуки отключены.")
+            self.failed = True
+            return False
+        try:
+            self.archive = zipfile.ZipFile(self.zip_path, "r")
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"Ошибка при открытии {self.zip_path}: {e}")
+            self.failed = True
+            return False
+
+        for info in self.archive.infolist():
+            if info.is_dir():
+                continue
+            for name in (fix_zip_name(info), info.filename):
+                if name.startswith(ZIP_ROOT):
+                    name = name[len(ZIP_ROOT):]
+                self.members[name] = info
+        return True
+
+    def find(self, relative_path: str) -> Optional[Member]:
+        """Найти член архива по пути относительно mp/"""
+        if not self.open():
+            return None
+        info = self.members.get(relative_path.replace("\\", "/"))
+        if info is None:
+            print(f"Файл не найден в {self.zip_path}: {relative_path}")
+        return info
+
+    def read(self, info: Member) -> bytes:
+        """Прочитать сжатый файл из архива в память (из пака - без копирования)"""
+        if isinstance(info, PackEntry):
+            return self.pack.view(info.name)
+        return self.archive.read(info)
+
+    def load_music(self, relative_path: str) -> Optional[ZipSound]:
+        """Музыкальный трек: потоковое декодирование из памяти"""
+        info = self.find(relative_path)
+        if info is None:
+            return None
+        try:
+            return ZipSound(relative_path, data=self.read(info), streaming=True)
+        except Exception as e:
+            print(f"Ошибка при загрузке музыки {relative_path}: {e}")
+            return None
+
+    def load_effect(self, relative_path: str) -> Optional[ZipSound]:
+        """Короткий эффект: полностью декодированный, с кэшем на диске"""
+        if relative_path in self.effects:
+            return self.effects[relative_path]
+        info = self.find(relative_path)
+        if info is None:
+            return None
+        try:
+            source = self._load_cached_pcm(info)
+            if source is None:
+                source = self._decode_to_cache(relative_path, info)
+            sound = ZipSound(relative_path, source=source)
+        except Exception as e:
+            print(f"Ошибка при загрузке звука {relative_path}: {e}")
+            return None
+        self.effects[relative_path] = sound
+        return sound
+
+    # === КЭШ ДЕКОДИРОВАННЫХ ЭФФЕКТОВ ===
+
+    def cache_path(self, info: Member) -> str:
+        """Файл кэша для члена архива (ключ - CRC32 и размер, для пака - хэш и размер)"""
+        if isinstance(info, PackEntry):
+            return os.path.join(self.cache_dir, f"{info.hash[:8]}_{info.length}.wav")
+        return os.path.join(self.cache_dir, f"{info.CRC:08x}_{info.file_size}.wav")
+
+    def _load_cached_pcm(self, info: Member) -> Optional[StaticMemorySource]:
+        """Прочитать уже декодированный PCM из кэша"""
+        path = self.cache_path(info)
+        if not os.path.exists(path):
+            return None
+        try:
+            with wave.open(path, "rb") as wav:
+                audio_format = AudioFormat(
+                    channels=wav.getnchannels(),
+                    sample_size=wav.getsampwidth() * 8,
+                    sample_rate=wav.getframerate()
+                )
+                data = wav.readframes(wav.getnframes())
+        except (OSError, wave.Error, EOFError):
+            return None
+        return StaticMemorySource(data, audio_format)
+
+    def _decode_to_cache(self, relative_path: str, info: Member) -> StaticMemorySource:
+        """Декодировать эффект целиком и сохранить PCM в кэш"""
+        stream = media.load(relative_path, file=io.BytesIO(self.read(info)), streaming=True)
+        audio_format = stream.audio_format
+        pcm = io.BytesIO()
+        while True:
+            chunk = stream.get_audio_data(DECODE_CHUNK)
+            if chunk is None:
+                break
+            pcm.write(chunk.data)
+        data = pcm.getvalue()
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self.cache_path(info) + ".tmp"
+            with wave.open(tmp_path, "wb") as wav:
+                wav.setnchannels(audio_format.channels)
+                wav.setsampwidth(audio_format.sample_size // 8)
+                wav.setframerate(audio_format.sample_rate)
+                wav.writeframes(data)
+            os.replace(tmp_path, self.cache_path(info))
+        except OSError as e:
+            print(f"Не удалось сохранить кэш звука {relative_path}: {e}")
+
+        return StaticMemorySource(data, audio_format)
@@ -0,0 +1,173 @@
+# bench_leaderboard.py
+"""
+Нагрузочный замер рейтингов (leaderboard.py).
+
+Во временный файл базы заливается --records синтетических результатов
+(по умолчанию миллион) в общий рейтинг и рейтинги уровней, после чего
+меряются запросы, которые делает игра и меню:
+- top         - первые 10 мест;
+- rank_of     - место случайного игрока;
+- around      - игрок и соседи по рейтингу;
+- page_after  - следующая страница после случайной строки (keyset);
+- page_at     - страница с произвольного места (по гистограмме);
+- submit      - запись нового результата (с обновлением гистограммы).
+
+Для каждого запроса печатаются p50 и p95 в миллисекундах. Если p95 хоть
+одного запроса больше --budget-ms, скрипт завершается с кодом 1.
+
+Запуск:
+    python bench_leaderboard.py                     # миллион записей
+    python bench_leaderboard.py --records 100000    # быстрее
+    python bench_leaderboard.py --keep /tmp/lb.db   # оставить базу для разбора
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import leaderboard
+from database import GameDatabase
+
+# Сколько раз повторять каждый запрос
+QUERIES = 300
+
+# Потолок p95 одного запроса (мс)
+BUDGET_MS = 5.0
+
+# Доля записей в общем рейтинге, остальные - поровну по уровням
+GLOBAL_SHARE = 0.4
+LEVELS = (1, 2, 3)
+
+# Записей в одной транзакции при заливке
+INSERT_BATCH = 50000
+
+
+def fill(db: GameDatabase, records: int, seed: int) -> int:
+    """Залить пользователей и результаты напрямую (минуя поток записи), вернуть число игроков"""
+    rng = random.Random(seed)
+    users = int(records * GLOBAL_SHARE)
+    cursor = db.connection.cursor()
+    cursor.executemany(
+        "INSERT INTO users (user_id, username) VALUES (?, ?)",
+        ((user_id, f"player_{user_id}") for user_id in range(1, users + 1))
+    )
+    rows = []
+    for user_id in range(1, users + 1):
+        # Очки с длинным хвостом, как у настоящих игроков: много слабых, мало сильных
+        rows.append((leaderboard.GLOBAL_BOARD, -int(rng.expovariate(1 / 3000)),
+                     2460000 + rng.random() * 1000, user_id, rng.randint(1, 3)))
+    per_level = (records - users) // len(LEVELS)
+    for level in LEVELS:
+        for user_id in rng.sample(range(1, users + 1), min(per_level, users)):
+            time_spent = rng.uniform(60, 900)
+            rows.append((level, -int(rng.expovariate(1 / 1000)), time_spent, user_id, time_spent))
+    for start in range(0, len(rows), INSERT_BATCH):
+        cursor.executemany(
+            "INSERT INTO leaderboard (board, neg_score, tiebreak, user_id, extra) VALUES (?, ?, ?, ?, ?)",
+            rows[start:start + INSERT_BATCH]
+        )
+    leaderboard.rebuild_buckets(cursor)
+    db.connection.commit()
+    cursor.execute("ANALYZE")
+    return users
+
+
+def measure(name: str, query, runs: int):
+    """p50 и p95 запроса в мс"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        query()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return name, statistics.median(times), times[int(len(times) * 0.95) - 1]
+
+
+def check_ranks(board: leaderboard.Leaderboard, rng: random.Random, users: int):
+    """Места по гистограмме совпадают с местами по полной нумерации"""
+    sample = [rng.randint(1, users) for _ in range(5)]
+    for user_id in sample:
+        expected = board.cursor.execute('''
+            SELECT place FROM (
+                SELECT user_id, ROW_NUMBER() OVER (ORDER BY neg_score, tiebreak, user_id) AS place
+                FROM leaderboard WHERE board = ?
+            ) WHERE user_id = ?
+        ''', (leaderboard.GLOBAL_BOARD, user_id)).fetchone()[0]
+        actual = board.rank_of(leaderboard.GLOBAL_BOARD, user_id)
+        if actual != expected:
+            raise AssertionError(f"Игрок {user_id}: место {actual}, а должно быть {expected}")
+        page = board.page_at_rank(leaderboard.GLOBAL_BOARD, expected, 1)
+        if page[0].user_id != user_id:
+            raise AssertionError(f"page_at_rank({expected}) вернул игрока {page[0].user_id}, а не {user_id}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000, help="сколько результатов залить")
+    parser.add_argument("--runs", type=int, default=QUERIES, help="повторов каждого запроса")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="потолок p95 (мс)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", help="путь, по которому оставить базу (по умолчанию - временный файл)")
+    args = parser.parse_args(argv)
+
+    path = args.keep or os.path.join(tempfile.mkdtemp(prefix="bench_leaderboard_"), "bench.db")
+    if os.path.exists(path):
+        os.remove(path)
+    db = GameDatabase(path)
+    try:
+        start = time.perf_counter()
+        users = fill(db, args.records, args.seed)
+        total = sum(db.leaderboard.size(board) for board in (leaderboard.GLOBAL_BOARD, *LEVELS))
+        print(f"Залито {total} записей ({users} игроков) за {time.perf_counter() - start:.1f} с")
+
+        rng = random.Random(args.seed + 1)
+        board = db.leaderboard
+        check_ranks(board, rng, users)
+
+        def random_key():
+            return board.key_of(leaderboard.GLOBAL_BOARD, rng.randint(1, users))
+
+        next_user = users
+
+        def submit():
+            nonlocal next_user
+            next_user += 1
+            db.writer.submit(leaderboard.submit_score, leaderboard.GLOBAL_BOARD, next_user,
+                             int(rng.expovariate(1 / 3000)), leaderboard.julian_now()).result()
+
+        results = [
+            measure("top", lambda: board.top(leaderboard.GLOBAL_BOARD), args.runs),
+            measure("rank_of", lambda: board.rank_of(leaderboard.GLOBAL_BOARD, rng.randint(1, users)), args.runs),
+            measure("around", lambda: board.around(leaderboard.GLOBAL_BOARD, rng.randint(1, users)), args.runs),
+            measure("page_after", lambda: board.page_after(leaderboard.GLOBAL_BOARD, random_key()), args.runs),
+            measure("page_at", lambda: board.page_at_rank(leaderboard.GLOBAL_BOARD, rng.randint(1, users)),
+                    args.runs),
+            measure("submit", submit, args.runs),
+        ]
+    finally:
+        db.close()
+        if not args.keep:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    print(f"{'запрос':<12}{'p50, мс':>10}{'p95, мс':>10}")
+    over = []
+    for name, p50, p95 in results:
+        mark = "  !" if p95 > args.budget_ms else ""
+        print(f"{name:<12}{p50:>10.3f}{p95:>10.3f}{mark}")
+        if p95 > args.budget_ms:
+            over.append(name)
+
+    if over:
+        print(f"\nВыше бюджета {args.budget_ms} мс: {', '.join(over)}")
+        return 1
+    print(f"\nВсе запросы в бюджете {args.budget_ms} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+# bench_simulation.py
+"""
+Нагрузочные сценарии для подсистем симуляции.
+
+Каждый сценарий строит синтетический мир на сгенерированной карте
+(map_generator, во временной папке): по N жуков каждого вида из
+enemies.py, по M турелей каждого класса, P зданий каждого
+производственного класса и K дронов на маршрутах бур -> печь. Затем
+каждый тик по отдельности меряются фазы:
+- production    - производственный цикл зданий;
+- drone_service - разгрузка и загрузка дронов в зданиях;
+- targeting     - турели: поиск цели и выстрел;
+- movement      - жуки (ИИ и движение), дроны, пули;
+- collisions    - попадания пуль;
+- step          - все фазы подряд (один тик симуляции);
+и отдельно game_update - полный GameView.on_update на том же мире.
+
+Чтобы мир не вырождался, между тиками (вне замера) патроны и сырьё
+доливаются, а здоровье жуков и зданий восстанавливается.
+
+Результат - JSON с описанием машины. С --compare результаты сверяются
+с сохранённой базой: фаза, у которой медиана выросла больше чем на
+--threshold (и больше чем на NOISE_FLOOR_MS), считается регрессией,
+и скрипт завершается с кодом 1.
+
+Работает без дисплея (ARCADE_HEADLESS, см. headless.py) и ничего не
+оставляет в папке игры: карта и базы (game_database.db, level.sqlite)
+создаются во временной папке, мир идёт без автосохранений, телеметрии
+и записи ввода (GameView.set_offline).
+
+Запуск:
+    python bench_simulation.py                            # все сценарии, сводка на экран
+    python bench_simulation.py -o bench_simulation.json   # сохранить результат (базу)
+    python bench_simulation.py --compare bench_simulation.json
+    python bench_simulation.py --scenario large --ticks 600
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+# Сценарии: жуков каждого вида, турелей каждого класса, дронов,
+# зданий каждого производственного класса
+SCENARIOS = {
+    "small": {"bugs": 5, "turrets": 3, "drones": 10, "production": 5},
+    "medium": {"bugs": 20, "turrets": 10, "drones": 50, "production": 20},
+    "large": {"bugs": 60, "turrets": 30, "drones": 200, "production": 60},
+}
+
+PHASES = ("production", "drone_service", "targeting", "movement", "collisions")
+
+# Тиков на замер и на разогрев, шаг времени
+TICKS = 300
+WARMUP_TICKS = 30
+DELTA_TIME = 1 / 60
+
+# Карта сценариев (клеток) и её зерно
+MAP_SIZE = 64
+MAP_SEED = 1
+
+# Номер уровня, под которым карта сценария регистрируется в LEVELS
+BENCH_LEVEL = 0
+
+# Порог регрессии: рост медианы в разах и минимальный рост в мс
+THRESHOLD = 0.15
+NOISE_FLOOR_MS = 0.05
+
+# Здоровье, которое не кончается за время замера
+ENDLESS_HP = 10 ** 9
+
+
+def machine_info() -> Dict[str, object]:
+    """Описание машины и версий (для сравнения результатов)"""
+    import arcade
+    import numpy
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "arcade": arcade.version.VERSION,
+        "numpy": numpy.__version__,
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def summarize(times: List[float]) -> Dict[str, float]:
+    """Времена тиков (с) -> mean/p50/p95/max в мс"""
+    ms = sorted(t * 1000 for t in times)
+    return {
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(ms[max(0, int(len(ms) * 0.95) - 1)], 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+
+class Scenario:
+    """Синтетический мир сценария на GameView"""
+
+    def __init__(self, view, sizes: Dict[str, int]):
+        from constants import T_SIZE
+        from sprite_list import bugs, buildings, players
+        import buildings as building_classes
+        import enemies
+
+        self.view = view
+        self.sizes = sizes
+        self.skipped: List[str] = []
+        core = view.core
+        core.hp = core.max_hp = ENDLESS_HP
+
+        # Клетки вокруг ядра по спирали - все в одной области загруженных чанков
+        core_column, core_row = int(core.center_x // T_SIZE), int(core.center_y // T_SIZE)
+        free = [(core_column + dx, core_row + dy)
+                for dx in range(-MAP_SIZE // 2 + 1, MAP_SIZE // 2 - 1)
+                for dy in range(-MAP_SIZE // 2 + 1, MAP_SIZE // 2 - 1)
+                if (dx, dy) != (0, 0)]
+        free.sort(key=lambda tile: (abs(tile[0] - core_column) + abs(tile[1] - core_row), tile))
+        tiles = iter(free)
+
+        def place(building):
+            buildings.append(building)
+            if isinstance(building, building_classes.Turret):
+                view.turrets.add(building)
+            else:
+                view.chunks.add_building(building)
+            building.hp = building.max_hp = ENDLESS_HP
+            return building
+
+        def position():
+            column, row = next(tiles)
+            return column * T_SIZE + T_SIZE // 2, row * T_SIZE + T_SIZE // 2
+
+        def build(building_class, count: int) -> List:
+            try:
+                return [place(building_class(*position())) for _ in range(count)]
+            except FileNotFoundError:
+                self.skipped.append(building_class.__name__)  # нет картинки
+                return []
+
+        self.turrets = []
+        for turret_class in (building_classes.CopperTurret, building_classes.BronzeTurret,
+                             building_classes.LongRangeTurret):
+            self.turrets += build(turret_class, sizes["turrets"])
+
+        self.producers = []
+        drills, furnaces = [], []
+        for producer_class in (building_classes.CoalDrill, building_classes.ElectricDrill,
+                               building_classes.BronzeFurnace, building_classes.SiliconFurnace,
+                               building_classes.AmmoFactory):
+            built = build(producer_class, sizes["production"])
+            self.producers += built
+            (drills if issubclass(producer_class, building_classes.MineDrill) else furnaces).extend(built)
+
+        # Жуки - между турелями, в радиусе стрельбы
+        self.bugs = []
+        bug_classes = [enemies.Beetle, enemies.ArmoredBeetle, enemies.SpittingBeetle,
+                       enemies.DominicTorettoBeetle, enemies.HarkerBeetle]
+        spots = [turret.position for turret in self.turrets] or [core.position]
+        for bug_class in bug_classes:
+            try:
+                spawned = [bug_class(x + T_SIZE / 2, y + T_SIZE / 3, core)
+                           for x, y in (spots[(i * 7 + len(self.bugs)) % len(spots)]
+                                        for i in range(sizes["bugs"]))]
+            except FileNotFoundError:
+                self.skipped.append(bug_class.__name__)  # нет картинки
+                continue
+            bugs.extend(spawned)
+            self.bugs += spawned
+
+        self.drones = []
+        from drones import Drone
+        from constants import SPRITE_SCALE
+        for i in range(sizes["drones"] if drills and furnaces else 0):
+            source = drills[i % len(drills)]
+            destination = furnaces[i % len(furnaces)]
+            drone = Drone(SPRITE_SCALE, source.center_x, source.center_y)
+            drone.set_route(source, destination)
+            players.append(drone)
+            self.drones.append(drone)
+
+        # Камера на ядре: все здания в загруженных чанках
+        view.world_camera.position = core.position
+
+    def refill(self):
+        """Вне замера: патроны, сырьё и здоровье, чтобы мир не вырождался"""
+        for building in self.turrets + self.producers:
+            for resource, capacity in building.capacity.items():
+                if resource not in getattr(building, "output", ()) and \
+                        resource != getattr(building, "resource_type", None):
+                    building.resources[resource] = capacity
+            building.hp = ENDLESS_HP
+        for bug in self.bugs:
+            bug.hp = bug.max_hp
+        self.view.core.hp = ENDLESS_HP
+        for drone in self.drones:
+            drone.hp = drone.max_hp
+
+    def counts(self) -> Dict[str, int]:
+        return {"bugs": len(self.bugs), "turrets": len(self.turrets), "drones": len(self.drones),
+                "production": len(self.producers), "skipped": self.skipped}
+
+    # === ФАЗЫ ===
+
+    # Здания сценария обходятся напрямую: чанки подгружаются только в
+    # on_update, а фазы должны видеть весь мир с первого тика
+
+    def production(self, delta_time: float):
+        for building in self.producers:
+            if not building.is_destroyed:
+                building._update_production(delta_time)
+
+    def drone_service(self, delta_time: float):
+        for building in self.producers:
+            if not building.is_destroyed:
+                building._process_drones()
+
+    def targeting(self, delta_time: float):
+        self.view.turrets.update(delta_time)
+
+    def movement(self, delta_time: float):
+        from sprite_list import bad_bullet, good_bullet
+        for bug in self.bugs:
+            bug.update(delta_time)
+        for drone in self.drones:
+            drone.update(delta_time)
+        good_bullet.update(delta_time)
+        bad_bullet.update(delta_time)
+
+    def collisions(self, delta_time: float):
+        self.view.bullet_g()
+        self.view.bullet_b()
+
+
+def run_scenario(window, name: str, sizes: Dict[str, int], ticks: int, warmup: int) -> Dict[str, object]:
+    """Построить мир сценария и замерить фазы и полный тик"""
+    from game import GameView
+    view = GameView.for_window(window, BENCH_LEVEL, offline=True)
+    window.show_view(view)
+    scenario = Scenario(view, sizes)
+    phases = [(phase, getattr(scenario, phase)) for phase in PHASES]
+
+    times: Dict[str, List[float]] = {phase: [] for phase in PHASES + ("step", "game_update")}
+    for tick in range(warmup + ticks):
+        scenario.refill()
+        step_start = time.perf_counter()
+        for phase, run in phases:
+            start = time.perf_counter()
+            run(DELTA_TIME)
+            if tick >= warmup:
+                times[phase].append(time.perf_counter() - start)
+        if tick >= warmup:
+            times["step"].append(time.perf_counter() - step_start)
+
+    for tick in range(warmup + ticks):
+        scenario.refill()
+        start = time.perf_counter()
+        view.on_update(DELTA_TIME)
+        if tick >= warmup:
+            times["game_update"].append(time.perf_counter() - start)
+
+    return {"entities": scenario.counts(), "sizes": sizes,
+            "phases": {phase: summarize(values) for phase, values in times.items()}}
+
+
+def run_all(window, names: List[str], ticks: int, warmup: int) -> Dict[str, object]:
+    """Прогнать сценарии names и напечатать сводку"""
+    results = {"machine": machine_info(),
+               "config": {"ticks": ticks, "warmup": warmup, "delta_time": DELTA_TIME,
+                          "map_size": MAP_SIZE},
+               "scenarios": {}}
+    for name in names:
+        result = run_scenario(window, name, SCENARIOS[name], ticks, warmup)
+        results["scenarios"][name] = result
+        print(f"\n{name}: {result['entities']}")
+        for phase, stats in result["phases"].items():
+            print(f"  {phase:<15}p50 {stats['p50_ms']:>8.3f} мс   p95 {stats['p95_ms']:>8.3f} мс")
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Регрессии: фазы, у которых медиана выросла больше порога"""
+    regressions = []
+    print(f"\n{'сценарий':<10}{'фаза':<15}{'база, мс':>10}{'сейчас, мс':>12}{'изменение':>11}")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for phase, stats in result["phases"].items():
+            if phase not in base["phases"]:
+                continue
+            old, new = base["phases"][phase]["p50_ms"], stats["p50_ms"]
+            change = (new - old) / old if old else 0.0
+            regressed = new - old > NOISE_FLOOR_MS and change > threshold
+            mark = "  !" if regressed else ""
+            print(f"{name:<10}{phase:<15}{old:>10.3f}{new:>12.3f}{change:>+10.0%}{mark}")
+            if regressed:
+                regressions.append(f"{name}/{phase}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="сценарий (можно несколько; по умолчанию все)")
+    parser.add_argument("--ticks", type=int, default=TICKS, help="тиков на замер")
+    parser.add_argument("--warmup", type=int, default=WARMUP_TICKS, help="тиков разогрева")
+    parser.add_argument("-o", "--output", help="записать результат в JSON")
+    parser.add_argument("--compare", help="сравнить с сохранённым результатом (JSON)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="допустимый рост медианы (доля, по умолчанию 0.15)")
+    args = parser.parse_args(argv)
+
+    # Окно не нужно показывать
+    import headless
+    headless.prepare()
+    import arcade
+    import database
+    import level_catalog
+    from constants import LEVELS
+    from map_generator import generate_level_file
+
+    # Карта и базы - во временной папке, настоящие сохранения и рекорды не трогаются
+    scratch = tempfile.mkdtemp(prefix="bench_simulation_")
+    try:
+        database.DB_NAME = os.path.join(scratch, "game_database.db")
+        level_catalog.LEVEL_DB = os.path.join(scratch, "level.sqlite")
+        window = arcade.Window(800, 600, "bench", visible=False)
+        map_path = generate_level_file(os.path.join(scratch, f"stress_bench_{MAP_SIZE}x{MAP_SIZE}.json"),
+                                       MAP_SIZE, MAP_SIZE, seed=MAP_SEED, core=(MAP_SIZE // 2, MAP_SIZE // 2))
+        # Одна пустая волна: уровень не заканчивается победой во время замера
+        LEVELS[BENCH_LEVEL] = {"waves": [[]], "map": map_path}
+        results = run_all(window, args.scenario or list(SCENARIOS), args.ticks, args.warmup)
+    finally:
+        database.GameDatabase.close_shared()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультат записан в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nРегрессии (больше {args.threshold:.0%}): {', '.join(regressions)}")
+            return 1
+        print("\nРегрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# bench_startup.py
+"""
+Замер холодного старта игры.
+
+Меряются две вещи, каждая в отдельном свежем процессе (несколько прогонов,
+берётся медиана):
+1. import_main_ms - время "import main" по python -X importtime;
+2. first_menu_frame_ms - от запуска процесса до первого нарисованного
+   кадра стартового меню.
+
+Заодно проверяется, что при показе меню не загружены тяжёлые модули
+игрового мира (список lazy_modules в бюджете), а голый "import constants"
+не тянет за собой arcade и PIL (список constants_lazy_modules).
+
+Бюджет хранится в startup_budget.json рядом со скриптом. Если замер
+выходит за бюджет, скрипт завершается с кодом 1.
+
+Запуск:
+    python bench_startup.py                 # замер и сверка с бюджетом
+    python bench_startup.py --runs 10       # больше прогонов
+    python bench_startup.py --update-budget # записать текущие значения (+ запас) в бюджет
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# Запас, с которым --update-budget записывает замеры в бюджет
+BUDGET_HEADROOM = 1.5
+
+# Сколько самых медленных модулей показывать
+TOP_MODULES = 10
+
+FIRST_FRAME_MARK = "FIRST_FRAME"
+
+
+def measure_import(runs: int):
+    """Медиана времени import main и самые медленные модули последнего прогона"""
+    totals = []
+    modules = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            capture_output=True, text=True, cwd=os.path.dirname(BUDGET_FILE)
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import main завершился с ошибкой:\n{result.stderr[-2000:]}")
+        modules = parse_importtime(result.stderr)
+        totals.append(next(us for name, _, us in modules if name == "main") / 1000)
+    slowest = sorted(modules, key=lambda item: item[2], reverse=True)[:TOP_MODULES]
+    return statistics.median(totals), slowest
+
+
+def parse_importtime(stderr: str):
+    """Строки "import time: self | cumulative | name" -> [(имя, self мкс, cumulative мкс)]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def constants_imports():
+    """Пакеты верхнего уровня, загруженные голым "import constants" (в свежем процессе)"""
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import json, sys, constants; print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))"],
+        capture_output=True, text=True, cwd=os.path.dirname(BUDGET_FILE)
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import constants завершился с ошибкой:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout)
+
+
+def measure_first_frame(runs: int):
+    """Медиана времени до первого кадра меню и модули, загруженные к этому моменту"""
+    times = []
+    loaded = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            cwd=os.path.dirname(BUDGET_FILE)
+        )
+        elapsed = None
+        for line in process.stdout:
+            if line.startswith(FIRST_FRAME_MARK):
+                elapsed = (time.perf_counter() - start) * 1000
+                loaded = json.loads(line[len(FIRST_FRAME_MARK):])
+                break
+        _, stderr = process.communicate()
+        if elapsed is None:
+            raise RuntimeError(f"Меню не нарисовало первый кадр:\n{stderr[-2000:]}")
+        times.append(elapsed)
+    return statistics.median(times), loaded
+
+
+def child():
+    """Дочерний процесс: открыть окно с меню, нарисовать один кадр и выйти"""
+    import arcade
+    import main
+    from menu import StartMenuView
+
+    window = arcade.Window(main.SCREEN_WIDTH, main.SCREEN_HEIGHT, main.SCREEN_TITLE)
+    window.show_view(StartMenuView())
+    window.dispatch_events()
+    window.dispatch_event("on_draw")
+    window.flip()
+    window.ctx.finish()
+
+    local = {name[:-3] for name in os.listdir(os.path.dirname(BUDGET_FILE)) if name.endswith(".py")}
+    print(FIRST_FRAME_MARK + json.dumps(sorted(local & set(sys.modules))), flush=True)
+    window.close()
+
+
+def load_budget():
+    if not os.path.exists(BUDGET_FILE):
+        return {}
+    with open(BUDGET_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер холодного старта игры")
+    parser.add_argument("--runs", type=int, default=5, help="число прогонов (берётся медиана)")
+    parser.add_argument("--update-budget", action="store_true",
+                        help="записать текущие замеры с запасом в бюджет")
+    parser.add_argument("--skip-frame", action="store_true",
+                        help="не мерить первый кадр (например, без дисплея)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return 0
+
+    budget = load_budget()
+    results = {}
+    failed = []
+
+    import_ms, slowest = measure_import(args.runs)
+    results["import_main_ms"] = round(import_ms, 1)
+    print(f"import main: {import_ms:.1f} мс (медиана из {args.runs})")
+    print("Самые медленные модули (cumulative):")
+    for name, self_us, cumulative_us in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} мс  {name}")
+
+    heavy = sorted(set(constants_imports()) & set(budget.get("constants_lazy_modules", [])))
+    if heavy:
+        failed.append(f"import constants загружает: {', '.join(heavy)}")
+
+    if not args.skip_frame:
+        frame_ms, loaded = measure_first_frame(args.runs)
+        results["first_menu_frame_ms"] = round(frame_ms, 1)
+        print(f"Первый кадр меню: {frame_ms:.1f} мс (медиана из {args.runs})")
+        print(f"Модули игры к первому кадру: {', '.join(loaded)}")
+        early = sorted(set(loaded) & set(budget.get("lazy_modules", [])))
+        if early:
+            failed.append(f"модули загружены до старта уровня: {', '.join(early)}")
+
+    for key, value in results.items():
+        limit = budget.get(key)
+        if limit is not None and value > limit:
+            failed.append(f"{key} = {value} мс, бюджет {limit} мс")
+
+    if args.update_budget:
+        for key, value in results.items():
+            budget[key] = round(value * BUDGET_HEADROOM)
+        with open(BUDGET_FILE, "w", encoding="utf-8") as f:
+            json.dump(budget, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"Бюджет обновлён: {BUDGET_FILE}")
+        return 0
+
+    if failed:
+        print("\nБюджет превышен:")
+        for message in failed:
+            print(f"  - {message}")
+        return 1
+    print("\nВ пределах бюджета")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
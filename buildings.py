@@ -4,7 +4,10 @@ from collections import deque
 from resources import ResourceTransaction, ResourceStorage
 from enemies import Bug
 import math
-from sprite_list import good_bullet, bugs
+import numpy as np
+import telemetry
+import heatmap
+from sprite_list import good_bullet, bugs, turret_bases, turret_towers
 # from enemies import Bug
 
 # Константы здоровья (из constants.py)
@@ -48,6 +51,13 @@ RESOURCES_SHOOTS = {
     'Длинноствольная турель': ('Боеприпасы', 'Бронза')
 }
 
+# Башня на картинке смотрит стволами вверх
+TOWER_IMAGE_ANGLE = 90
+# Поворот башни меньше этого (в градусах) не записываем в SpriteList
+TOWER_ANGLE_EPSILON = 0.5
+# Начальная ёмкость массивов углов TurretSystem (дальше растёт удвоением)
+TURRET_CAPACITY = 64
+
 BUILDINGS_TYPE = {
     'Угольный бур': 'Бур',
     'Электрический бур': 'Бур',
@@ -151,6 +161,24 @@ class Building(arcade.Sprite, ResourceStorage):
         # 2. Обслуживание дронов
         self._process_drones()
 
+    def fast_forward(self, elapsed: float):
+        """
+        Сводная симуляция за elapsed секунд, пока здание стояло в выгруженном
+        чанке: сразу все циклы производства, без покадрового обновления.
+        Останавливается, как только цикл ничего не меняет (склад полон или
+        кончилось сырьё) - дальше результат был бы тем же.
+        """
+        if self.is_destroyed or self.production_time <= 0:
+            return
+        total = self.production_timer + elapsed
+        cycles = int(total // self.production_time)
+        self.production_timer = total - cycles * self.production_time
+        for _ in range(cycles):
+            before = self.get_all()
+            self._produce()
+            if self.resources == before:
+                break
+
     # === ВНУТРЕННИЕ МЕТОДЫ ===
 
     def _update_production(self, delta_time: float):
@@ -310,9 +338,11 @@ class MineDrill(Building):
                 return
             # Тратим Уголь
             self.remove("Уголь", 1)
+            telemetry.consumed("Уголь")
 
         # Добываем ресурс
-        self.add(self.resource_type, 1)
+        if self.add(self.resource_type, 1):
+            telemetry.produced(self.resource_type)
 
 
 class CoalDrill(MineDrill):
@@ -387,9 +417,11 @@ class ProductionBuilding(Building):
         # 3. Забираем ингредиенты
         for ingredient in self.input:
             self.remove(ingredient, 1)
+            telemetry.consumed(ingredient)
 
         # 4. Добавляем продукт
         self.add(self.output, 1)
+        telemetry.produced(self.output)
 
 
 class BronzeFurnace(ProductionBuilding):
@@ -439,6 +471,8 @@ class AmmoFactory(ProductionBuilding):
 class Turret(Building):
     """Базовый класс для турелей"""
 
+    shot_sound = "turret_copper"  # ключ звуков выстрела в манифесте ассетов
+
     def __init__(
             self,
             base_image: str,
@@ -463,7 +497,9 @@ class Turret(Building):
             capacity=capacity
         )
 
-        # Дополнительные спрайты
+        # Дополнительные спрайты: рисуются через turret_bases/turret_towers
+        # (см. TurretSystem), поэтому сам спрайт здания в buildings скрыт
+        self.visible = False
         self.base_sprite = arcade.Sprite(base_image, scale)
         self.base_sprite.center_x = x
         self.base_sprite.center_y = y
@@ -473,8 +509,6 @@ class Turret(Building):
         self.tower_sprite.center_y = y
         self.tower_angle = 0.0
 
-
-
         # Параметры стрельбы
         self.damage = damage
         self.attack_range = attack_range
@@ -488,11 +522,13 @@ class Turret(Building):
         # Для поиска цели
         self.target = None
         self.velocity = (0, 0)
+        self.fired = False  # стреляла ли турель в этом кадре
 
 
     def update(self, delta_time: float):
         """Переопределяем для стрельбы"""
         super().update(delta_time)  # Базовая логика (дроны и т.д.)
+        self.fired = False
 
         if self.is_destroyed:
             return
@@ -505,16 +541,10 @@ class Turret(Building):
         # self.bullets.update() # update в игре через единый список для всех пуль
 
         # Если перезарядились и есть патроны - ищем цель
-        if self.current_cooldown <= 0 and self.has(self.ammo_type, self.ammo_per_shot):
+        if self.current_cooldown <= 0 and self.has_all(self.resources_for_shoot):
             if self._find_target():
                 self._shoot()
 
-    def on_draw(self):
-        self.base_sprite.clear()
-        self.tower_sprite.clear()
-        self.base_sprite.draw()
-        self.tower_sprite.draw()
-
     def _find_target(self) -> bool:
         """
         Ищет цель в радиусе
@@ -528,23 +558,27 @@ class Turret(Building):
         for enem in self.potential_enemies[1:]:
             if self.calculate_range(enem.center_x, enem.center_y) < ml:
                 m = enem
-                ml = enem.calculate_range(m.center_x, m.center_y)
+                ml = self.calculate_range(m.center_x, m.center_y)
         self.target = m
         return True
 
     def _shoot(self):
         """Производит выстрел"""
         # Тратим патроны
-        if not self.remove_all(self.resources_for_shoot):
+        if not self.has_all(self.resources_for_shoot):
             return
+        self.remove_all(self.resources_for_shoot)
+        for resource, amount in self.resources_for_shoot.items():
+            telemetry.consumed(resource, amount)
+        telemetry.count(telemetry.SHOTS)
 
         self.current_cooldown = self.cooldown_time
 
         self.set_velocity()
-        self.calculate_angle()
-        #TODO: make a rotate tower
+        self.calculate_angle()  # башню поворачивает TurretSystem (update -> sync_towers)
 
         good_bullet.append(ShotBullet(self, target=self.target, velocity=self.velocity))
+        self.fired = True
 
     def set_enemies(self, enemies_list = bugs):
         """для поиска цели"""
@@ -554,21 +588,21 @@ class Turret(Building):
                 self.potential_enemies.append(bug)
 
     def calculate_range(self, x, y) -> float:
-        return (x ** 2 + y ** 2) / self.radius ** 2
+        """Квадрат расстояния до точки в долях радиуса атаки (< 1 - в радиусе)"""
+        return ((x - self.center_x) ** 2 + (y - self.center_y) ** 2) / self.attack_range ** 2
 
     def set_velocity(self):
         """устанавливает вектор движения пули"""
         x_t, y_t = self.target.get_coords()
-        x, y = x_t - self.source.center, y_t - self.source.center_y
-        s = math.sqrt(x**2 + y**2)
-        self.velocity = (x / s, y / s)
+        x, y = x_t - self.center_x, y_t - self.center_y
+        s = math.sqrt(x**2 + y**2) or 1
+        self.velocity = (x / s * self.bullet_speed, y / s * self.bullet_speed)
 
     def calculate_angle(self):
+        """Угол башни в сторону выстрела (по часовой стрелке, как у arcade)"""
         x, y = self.velocity
-        if x < 0 and y < 0: self.tower_angle = math.asin(self.velocity[1]) * 180 / math.pi - 180
-        elif x < 0 and y > 0: self.tower_angle = math.acos(self.velocity[0]) * 180 / math.pi
-        elif x > 0 and y < 0: self.tower_angle = math.asin(self.velocity[1]) * 180 / math.pi
-        elif x > 0 and y > 0: self.tower_angle = math.acos(self.velocity[0]) * 180 / math.pi
+        if x or y:
+            self.tower_angle = TOWER_IMAGE_ANGLE - math.degrees(math.atan2(y, x))
 
 
 class CopperTurret(Turret):
@@ -593,6 +627,8 @@ class CopperTurret(Turret):
 class BronzeTurret(Turret):
     """Бронзовая турель"""
 
+    shot_sound = "turret_bronze"
+
     def __init__(self, x: float, y: float):
         super().__init__(
             base_image="Изображения/Здания/Турели/РГ турель основание.png",
@@ -612,6 +648,8 @@ class BronzeTurret(Turret):
 class LongRangeTurret(Turret):
     """Дальняя турель"""
 
+    shot_sound = "turret_long"
+
     def __init__(self, x: float, y: float):
         super().__init__(
             base_image="Изображения/Здания/Турели/РГ турель основание.png",
@@ -628,6 +666,98 @@ class LongRangeTurret(Turret):
         )
 
 
+class TurretSystem:
+    """
+    Все турели уровня: стрельба и поворот башен.
+
+    Основания и башни лежат в двух SpriteList (turret_bases, turret_towers),
+    поэтому любая стена турелей рисуется за два вызова. Углы башен лежат
+    в массивах angles (куда башня должна смотреть) и shown (что записано
+    в SpriteList) в порядке self.turrets: повернувшиеся башни находятся
+    одним сравнением массивов, и в SpriteList пишутся только их углы
+    (массово записать углы через публичный API SpriteList нельзя).
+    Массивы растут удвоением ёмкости, angles и shown - срезы занятой части.
+    """
+
+    def __init__(self):
+        self.turrets = []
+        self.shots = []  # турели, выстрелившие в последнем update()
+        self._angles = np.zeros(TURRET_CAPACITY, dtype=np.float64)
+        self._shown = np.zeros(TURRET_CAPACITY, dtype=np.float64)
+
+    @property
+    def angles(self) -> np.ndarray:
+        return self._angles[:len(self.turrets)]
+
+    @property
+    def shown(self) -> np.ndarray:
+        return self._shown[:len(self.turrets)]
+
+    def add(self, turret: Turret):
+        """Зарегистрировать построенную турель"""
+        count = len(self.turrets)
+        if count == len(self._angles):
+            self._angles = np.resize(self._angles, count * 2)
+            self._shown = np.resize(self._shown, count * 2)
+        self._angles[count] = turret.tower_angle
+        self._shown[count] = turret.tower_sprite.angle
+        self.turrets.append(turret)
+        turret_bases.append(turret.base_sprite)
+        turret_towers.append(turret.tower_sprite)
+
+    def remove(self, turret: Turret):
+        """Убрать разрушенную или снесённую турель"""
+        if turret in self.turrets:
+            index = self.turrets.index(turret)
+            count = len(self.turrets)
+            # Порядок турелей сохраняется: хвост массивов сдвигается на место удалённой
+            self._angles[index:count - 1] = self._angles[index + 1:count]
+            self._shown[index:count - 1] = self._shown[index + 1:count]
+            del self.turrets[index]
+            turret.base_sprite.remove_from_sprite_lists()
+            turret.tower_sprite.remove_from_sprite_lists()
+
+    def update(self, delta_time: float):
+        """Обновить все турели и повернуть их башни"""
+        self.shots.clear()
+        fired = []
+        for index, turret in enumerate(self.turrets):
+            turret.update(delta_time)
+            if turret.fired:
+                self.shots.append(turret)
+                fired.append(index)
+        # Угол башни меняется только при выстреле
+        if fired:
+            self.angles[fired] = [self.turrets[index].tower_angle for index in fired]
+        self.sync_towers()
+
+    def sync_towers(self, reload: bool = False):
+        """
+        Перенести в SpriteList углы повернувшихся башен.
+        reload - сначала перечитать углы всех турелей (после загрузки мира)
+        """
+        if reload:
+            self.angles[:] = [turret.tower_angle for turret in self.turrets]
+        changed = np.flatnonzero(np.abs(self.angles - self.shown) > TOWER_ANGLE_EPSILON)
+        if not len(changed):
+            return
+        for index, angle in zip(changed.tolist(), self.angles[changed].tolist()):
+            self.turrets[index].tower_sprite.angle = angle
+        self.shown[changed] = self.angles[changed]
+
+    def clear(self):
+        """Убрать все турели (при смене уровня)"""
+        self.turrets.clear()
+        self.shots.clear()
+        turret_bases.clear()
+        turret_towers.clear()
+
+    def draw(self):
+        """Два вызова на все турели: основания, потом башни"""
+        turret_bases.draw()
+        turret_towers.draw()
+
+
 class ShotBullet(arcade.Sprite):
     """временный класс для выстрелов"""
     def __init__(self, source: 'Turret', target: 'Bug', velocity: tuple):
@@ -646,8 +776,10 @@ class ShotBullet(arcade.Sprite):
         """двигаем пулю к цели"""
         self.lifetime -= delta_time
         if self.lifetime <= 0:
+            # Пуля истекла, ни в кого не попав
+            heatmap.add_event(heatmap.MISSES, self.center_x, self.center_y)
             self.remove_from_sprite_lists()
 
-        self.center_x += int(self.velocity[0] * delta_time)
-        self.center_y += int(self.velocity[1] * delta_time)
+        self.center_x += self.velocity[0] * delta_time
+        self.center_y += self.velocity[1] * delta_time
 
@@ -0,0 +1,314 @@
+# chunks.py
+"""
+Потоковая подгрузка больших карт по чанкам.
+
+Карта делится на квадратные чанки по CHUNK_SIZE клеток. В памяти
+распакованными держатся только чанки вокруг камеры и активных объектов
+(игрок, дроны, жуки) - на CHUNK_VIEW_DISTANCE чанков дальше видимой
+области. Остальные чанки хранятся сжатыми (zlib), так что расход памяти
+зависит от дальности обзора, а не от площади карты.
+
+Чтение и распаковка чанков идут в отдельном фоновом потоке ввода-вывода;
+кадр забирает только уже прочитанные чанки и никогда их не ждёт. Если
+клетка нужна прямо сейчас (например, бур ставится на ещё не
+подгруженный чанк), чанк читается сразу.
+
+Здания тоже живут по чанкам, но их сон зависит не от клеток, а от того,
+нужен ли чанк (awake):
+- в нужных чанках они обновляются каждый кадр (active_buildings);
+- в ненужных «спят», а при пробуждении чанка догоняют пропущенное
+  время одним вызовом Building.fast_forward.
+Так момент пробуждения зданий зависит только от хода игры, а не от
+скорости диска - мир детерминирован, что нужно для повтора записей.
+
+Сжатые копии давно не нужных чанков (дольше CHUNK_EVICT_DELAY)
+выбрасываются - при следующем визите чанк снова читается из кэша
+уровня; пустые чанки без зданий забываются совсем. Так память не растёт
+с пройденной площадью.
+"""
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from level_compiler import ORE_TYPES, CompiledLevel
+
+# Сторона чанка в клетках
+CHUNK_SIZE = 32
+
+# Сколько чанков за краем видимой области держать загруженными
+CHUNK_VIEW_DISTANCE = 1
+
+# Чанк выгружается, только если не нужен дольше этого (секунд),
+# чтобы не гонять его туда-обратно на границе
+CHUNK_UNLOAD_DELAY = 2.0
+
+# Уровень сжатия неактивных чанков (быстрое сжатие - данных мало)
+CHUNK_COMPRESSION = 1
+
+# Сжатая копия чанка выбрасывается, если он не нужен дольше этого (секунд)
+CHUNK_EVICT_DELAY = 30.0
+
+ChunkKey = Tuple[int, int]  # (столбец чанка, строка чанка)
+
+
+class Chunk:
+    """Чанк карты: клетки (распакованные или сжатые) и здания в нём"""
+
+    __slots__ = ("key", "shape", "tiles", "compressed", "loading", "awake",
+                 "last_needed", "sleep_started", "buildings")
+
+    def __init__(self, key: ChunkKey, shape: Tuple[int, ...]):
+        self.key = key
+        self.shape = shape  # форма массива клеток чанка (2, строки, столбцы)
+        self.tiles: Optional[np.ndarray] = None  # None - чанк выгружен
+        self.compressed: Optional[bytes] = None  # сжатая копия (после первой загрузки)
+        self.loading: Optional[Future] = None
+        self.awake = False  # нужен ли чанк сейчас (здания обновляются покадрово)
+        self.last_needed = 0.0
+        self.sleep_started = 0.0  # когда здания чанка уснули
+        self.buildings: List = []
+
+    @property
+    def loaded(self) -> bool:
+        return self.tiles is not None
+
+
+class ChunkStreamer:
+    """Подгрузка и выгрузка чанков карты вокруг камеры и активных объектов"""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, view_distance: int = CHUNK_VIEW_DISTANCE,
+                 unload_delay: float = CHUNK_UNLOAD_DELAY, evict_delay: float = CHUNK_EVICT_DELAY):
+        self.chunk_size = chunk_size
+        self.view_distance = view_distance
+        self.unload_delay = unload_delay
+        self.evict_delay = evict_delay
+        self.level: Optional[CompiledLevel] = None
+        self.chunks: Dict[ChunkKey, Chunk] = {}
+        self.executor: Optional[ThreadPoolExecutor] = None  # поток ввода-вывода
+        self.time = 0.0
+
+        # Счётчики для отладки
+        self.loads = 0
+        self.sync_loads = 0  # чанк понадобился раньше, чем подгрузился
+        self.unloads = 0
+        self.evictions = 0  # выброшено сжатых копий
+
+    def set_level(self, level: CompiledLevel):
+        """Начать работу с новой картой (все чанки выгружены)"""
+        self.clear()
+        self.level = level
+
+    def clear(self):
+        """Забыть все чанки и здания (при смене уровня)"""
+        for chunk in self.chunks.values():
+            if chunk.loading is not None:
+                chunk.loading.cancel()
+        self.chunks.clear()
+        self.level = None
+        self.time = 0.0
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    # === КООРДИНАТЫ ===
+
+    def key_of(self, x: float, y: float) -> ChunkKey:
+        """Чанк, в котором лежит точка мира"""
+        span = self.chunk_size * self.level.tile_size
+        return int(x // span), int(y // span)
+
+    def chunk(self, key: ChunkKey) -> Chunk:
+        """Чанк по ключу (создаётся при первом обращении)"""
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            column, row = key
+            rows = min(self.chunk_size, self.level.height - row * self.chunk_size)
+            columns = min(self.chunk_size, self.level.width - column * self.chunk_size)
+            chunk = Chunk(key, (self.level.tiles.shape[0], rows, columns))
+            self.chunks[key] = chunk
+        return chunk
+
+    def keys_in_rect(self, left: float, bottom: float, right: float, top: float) -> Iterable[ChunkKey]:
+        """Чанки карты, пересекающие прямоугольник мира"""
+        span = self.chunk_size * self.level.tile_size
+        last_column = (self.level.width - 1) // self.chunk_size
+        last_row = (self.level.height - 1) // self.chunk_size
+        first_x = max(0, int(left // span))
+        last_x = min(last_column, int(right // span))
+        first_y = max(0, int(bottom // span))
+        last_y = min(last_row, int(top // span))
+        for row in range(first_y, last_y + 1):
+            for column in range(first_x, last_x + 1):
+                yield column, row
+
+    # === ПОДГРУЗКА ===
+
+    def update(self, delta_time: float, view: Tuple[float, float, float, float],
+               points: Iterable[Tuple[float, float]] = ()):
+        """
+        Раз в кадр: подгрузить чанки вокруг видимой области view
+        (left, bottom, right, top) и точек points, выгрузить ненужные
+        """
+        if self.level is None:
+            return
+        self.time += delta_time
+        margin = self.view_distance * self.chunk_size * self.level.tile_size
+
+        needed: Set[ChunkKey] = set(self.keys_in_rect(
+            view[0] - margin, view[1] - margin, view[2] + margin, view[3] + margin
+        ))
+        for x, y in points:
+            needed.add(self.key_of(x, y))
+
+        # Забираем только то, что поток уже прочитал
+        for chunk in self.chunks.values():
+            if chunk.loading is not None and chunk.loading.done():
+                self._finish(chunk)
+
+        for key in needed:
+            if key not in self.chunks and not self._on_map(key):
+                continue
+            chunk = self.chunk(key)
+            chunk.last_needed = self.time
+            if not chunk.awake:
+                chunk.awake = True
+                self._wake(chunk)
+            if not chunk.loaded and chunk.loading is None:
+                self._request(chunk)
+
+        forgotten = []
+        for chunk in self.chunks.values():
+            idle = self.time - chunk.last_needed
+            if (chunk.awake or chunk.loaded) and idle > self.unload_delay:
+                self._unload(chunk)
+            elif idle > self.evict_delay and not chunk.awake and chunk.loading is None:
+                if chunk.compressed is not None:
+                    chunk.compressed = None
+                    self.evictions += 1
+                if not chunk.buildings:
+                    forgotten.append(chunk.key)
+        for key in forgotten:
+            del self.chunks[key]
+
+    def _on_map(self, key: ChunkKey) -> bool:
+        column, row = key
+        return (0 <= column * self.chunk_size < self.level.width and
+                0 <= row * self.chunk_size < self.level.height)
+
+    def _request(self, chunk: Chunk):
+        """Поставить чанк в очередь потока ввода-вывода"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunks")
+        chunk.loading = self.executor.submit(self._read, self.level, chunk.key, chunk.shape,
+                                             chunk.compressed)
+
+    def _read(self, level: CompiledLevel, key: ChunkKey, shape: Tuple[int, ...],
+              compressed: Optional[bytes]) -> Tuple[np.ndarray, bytes]:
+        """
+        Чтение чанка (в потоке ввода-вывода): из сжатой копии или,
+        в первый раз, из отображённого в память кэша уровня
+        """
+        if compressed is not None:
+            tiles = np.frombuffer(zlib.decompress(compressed), dtype=level.tiles.dtype).reshape(shape)
+            return tiles, compressed
+        column, row = key
+        rows = slice(row * self.chunk_size, row * self.chunk_size + shape[1])
+        columns = slice(column * self.chunk_size, column * self.chunk_size + shape[2])
+        tiles = np.array(level.tiles[:, rows, columns])
+        return tiles, zlib.compress(tiles.tobytes(), CHUNK_COMPRESSION)
+
+    def _finish(self, chunk: Chunk):
+        """Забрать прочитанный чанк (future уже готов)"""
+        future, chunk.loading = chunk.loading, None
+        if future.cancelled():
+            return
+        tiles, chunk.compressed = future.result()
+        if chunk.awake:  # пока читался, мог стать ненужным
+            chunk.tiles = tiles
+            self.loads += 1
+
+    def _load_now(self, chunk: Chunk):
+        """Клетки чанка нужны в этом кадре: дочитать без ожидания очереди"""
+        if chunk.loading is not None:
+            chunk.tiles, chunk.compressed = chunk.loading.result()
+            chunk.loading = None
+        else:
+            chunk.tiles, chunk.compressed = self._read(self.level, chunk.key, chunk.shape,
+                                                       chunk.compressed)
+        chunk.last_needed = self.time
+        self.loads += 1
+        self.sync_loads += 1
+
+    def _unload(self, chunk: Chunk):
+        """Выгрузить чанк: остаётся только сжатая копия, здания засыпают"""
+        chunk.tiles = None
+        if chunk.awake:
+            chunk.awake = False
+            chunk.sleep_started = self.time
+        if chunk.loading is not None and chunk.loading.cancel():
+            chunk.loading = None
+        self.unloads += 1
+
+    def _wake(self, chunk: Chunk):
+        """Здания чанка догоняют время, пока чанк был выгружен"""
+        elapsed = self.time - chunk.sleep_started
+        if elapsed > 0:
+            for building in chunk.buildings:
+                building.fast_forward(elapsed)
+
+    # === КЛЕТКИ ===
+
+    def ore_at(self, x: float, y: float) -> Optional[str]:
+        """Руда под точкой мира (название ресурса) или None"""
+        tile = self.level.tile_of(x, y)
+        if tile is None:
+            return None
+        chunk = self.chunk(self.key_of(x, y))
+        if not chunk.loaded:
+            self._load_now(chunk)
+        ore = int(chunk.tiles[1, tile[1] % self.chunk_size, tile[0] % self.chunk_size])
+        return ORE_TYPES[ore] if ore else None
+
+    # === ЗДАНИЯ ===
+
+    def add_building(self, building):
+        """Зарегистрировать здание в его чанке"""
+        chunk = self.chunk(self.key_of(building.center_x, building.center_y))
+        if not chunk.awake:
+            chunk.sleep_started = self.time
+        chunk.buildings.append(building)
+
+    def remove_building(self, building):
+        chunk = self.chunks.get(self.key_of(building.center_x, building.center_y))
+        if chunk is not None and building in chunk.buildings:
+            chunk.buildings.remove(building)
+
+    def active_buildings(self) -> Iterable:
+        """Здания в нужных чанках (их обновляем покадрово)"""
+        for chunk in self.chunks.values():
+            if chunk.awake:
+                yield from chunk.buildings
+
+    # === ОТЛАДКА ===
+
+    def resident_bytes(self) -> int:
+        """Сколько памяти занимают клетки чанков (распакованные и сжатые)"""
+        return sum((chunk.tiles.nbytes if chunk.loaded else 0) +
+                   (len(chunk.compressed) if chunk.compressed is not None else 0)
+                   for chunk in self.chunks.values())
+
+    def get_info(self) -> Dict[str, int]:
+        return {
+            "loaded": sum(1 for chunk in self.chunks.values() if chunk.loaded),
+            "awake": sum(1 for chunk in self.chunks.values() if chunk.awake),
+            "known": len(self.chunks),
+            "loads": self.loads,
+            "sync_loads": self.sync_loads,
+            "unloads": self.unloads,
+            "evictions": self.evictions,
+            "bytes": self.resident_bytes(),
+        }
@@ -1,17 +1,12 @@
 # constants.py
 """
 Константы игры с данными уровней.
+
+Импорт этого модуля не делает никакого ввода-вывода: звуки грузятся
+в фоне (assets.py), а таблицы с классами зданий и жуков (BUILDING_KEYS, BAGS)
+собираются при первом обращении, чтобы меню не тянуло за собой
+модули игрового мира.
 """
-import sqlite3
-import os
-import zipfile
-import shutil
-import json
-from buildings import Building, ElectricDrill, BronzeFurnace, SiliconFurnace, AmmoFactory, CopperTurret,\
-    BronzeTurret, LongRangeTurret
-from enemies import (Bug, Beetle, ArmoredBeetle, SpittingBeetle,
-                     DominicTorettoBeetle, HarkerBeetle)
-import arcade
 
 # --- Данные уровней ---
 LEVELS = {
@@ -87,104 +82,104 @@ TEXTYRE = {
 DRONE_RECOVERY_COST = "all_resources"
 CAMERA_LERP = 0.12
 
-BUILDING_KEYS = {
-    arcade.key.KEY_1: ElectricDrill,
-    arcade.key.KEY_2: BronzeFurnace,
-    arcade.key.KEY_3: SiliconFurnace,
-    arcade.key.KEY_4: AmmoFactory,
-    arcade.key.KEY_5: CopperTurret,
-    arcade.key.KEY_6: BronzeTurret,
-    arcade.key.KEY_7: LongRangeTurret
+# Сколько слотов сохранения показывать в меню паузы
+SAVE_SLOTS_SHOWN = 8
+
+# Автосохранение: раз в столько секунд игры, в слот с этим именем
+AUTOSAVE_INTERVAL = 60.0
+AUTOSAVE_SLOT = "Автосохранение"
+# Сколько секунд загрузка сохранения ждёт незаконченной записи снимка
+SNAPSHOT_WAIT_TIMEOUT = 2.0
+
+# Очки уровня: за убитого жука, пройденную волну и выработанную единицу ресурса
+SCORE_PER_KILL = 100
+SCORE_PER_WAVE = 500
+SCORE_PER_RESOURCE = 1
+
+
+def _building_keys():
+    """Клавиша -> класс здания"""
+    import arcade
+    from buildings import ElectricDrill, BronzeFurnace, SiliconFurnace, AmmoFactory, CopperTurret, \
+        BronzeTurret, LongRangeTurret
+    return {
+        arcade.key.KEY_1: ElectricDrill,
+        arcade.key.KEY_2: BronzeFurnace,
+        arcade.key.KEY_3: SiliconFurnace,
+        arcade.key.KEY_4: AmmoFactory,
+        arcade.key.KEY_5: CopperTurret,
+        arcade.key.KEY_6: BronzeTurret,
+        arcade.key.KEY_7: LongRangeTurret
+    }
+
+
+def _bags():
+    """Название жука из волны -> класс жука"""
+    from enemies import Beetle, ArmoredBeetle, SpittingBeetle, DominicTorettoBeetle, HarkerBeetle
+    return {
+        "Обычный жук": Beetle,
+        "Броненосец": ArmoredBeetle,
+        "Жук-плевок": SpittingBeetle,
+        "Жук Доминико Торетто": DominicTorettoBeetle,
+        "Жук-харкатель": HarkerBeetle
+    }
+
+
+# Таблицы, которые собираются при первом обращении (см. __getattr__)
+LAZY_TABLES = {
+    "BUILDING_KEYS": _building_keys,
+    "BAGS": _bags,
 }
 
-BAGS = {
-    "Обычный жук": Beetle,
-    "Броненосец": ArmoredBeetle,
-    "Жук-плевок": SpittingBeetle,
-    "Жук Доминико Торетто": DominicTorettoBeetle,
-    "Жук-харкатель": HarkerBeetle
+# --- Звуки из архива mp.zip (читаются прямо из архива, без распаковки) ---
+# Сами звуки загружаются в фоне загрузчиком ассетов (assets.py) по группам.
+# assets тянет arcade, PIL и pyglet, поэтому импортируется только при
+# обращении к звукам: "import constants" остаётся лёгким
+
+
+def load_sound_from_mp(relative_path, streaming=False):
+    """Звук из mp.zip: музыка - потоково, эффекты - через кэш декодированного PCM"""
+    from assets import ASSETS
+    if streaming:
+        return ASSETS.audio.load_music(relative_path)
+    return ASSETS.audio.load_effect(relative_path)
+
+
+# Старые имена звуков -> (ключ манифеста, номер трека или None для всего списка)
+SOUND_NAMES = {
+    "MUSIC_MENU": ("music_menu", None),
+    "MUSIC_UNITED1": ("music_calm", 0),
+    "MUSIC_UNITED2": ("music_calm", 1),
+    "MUSIC_UNITED3": ("music_calm", 2),
+    "MUSIC_ATTACKS1": ("music_attack", 0),
+    "MUSIC_ATTACKS2": ("music_attack", 1),
+    "MUSIC_ATTACKS3": ("music_attack", 2),
+    "HIT": ("hit", None),
+    "SOUND_COPPER_TURRET": ("turret_copper", None),
+    "SOUND_BRONZE_TURRET": ("turret_bronze", None),
+    "SOUND_LONG_BARRELED_TURRET": ("turret_long", None),
 }
 
-# --- Работа с ZIP архивом звуков (без изменений) ---
-ZIP_FILENAME = "mp.zip"
-EXTRACTED_DIR = "extracted_sounds"
-
-def cleanup_directory():
-    if os.path.exists(EXTRACTED_DIR):
-        try:
-            shutil.rmtree(EXTRACTED_DIR)
-            print(f"Директория {EXTRACTED_DIR} очищена")
-        except Exception as e:
-            print(f"Ошибка при очистке директории: {e}")
-
-cleanup_directory()
-os.makedirs(EXTRACTED_DIR, exist_ok=True)
-
-if not os.path.exists(ZIP_FILENAME):
-    print(f"Ошибка: Файл {ZIP_FILENAME} не найден!")
-    print(f"Текущая директория: {os.getcwd()}")
-    exit(1)
-
-try:
-    with zipfile.ZipFile(ZIP_FILENAME, 'r') as zip_ref:
-        zip_ref.extractall(EXTRACTED_DIR)
-    print(f"Файлы успешно распакованы в: {EXTRACTED_DIR}")
-except Exception as e:
-    print(f"Ошибка при распаковке {ZIP_FILENAME}: {e}")
-    exit(1)
-
-MP_FOLDER = os.path.join(EXTRACTED_DIR, "mp")
-
-def load_sound_from_mp(relative_path):
-    full_path = os.path.join(MP_FOLDER, relative_path)
-    full_path = os.path.normpath(full_path)
-    if os.path.exists(full_path):
-        try:
-            return arcade.load_sound(full_path)
-        except Exception as e:
-            print(f"Ошибка при загрузке звука {full_path}: {e}")
-            return None
-    else:
-        print(f"Файл не найден: {full_path}")
-        return None
-
-print("\nЗагрузка звуков с реальными именами файлов...")
-MUSIC_MENU = load_sound_from_mp('OST/îÑ¡ε/ä½∩îÑ¡ε.mp3')
-MUSIC_ATTACKS1 = load_sound_from_mp('OST/ÇΓá¬á/ÇΓá¬á1.mp3')
-MUSIC_ATTACKS2 = load_sound_from_mp('OST/ÇΓá¬á/ÇΓá¬á2.mp3')
-MUSIC_ATTACKS3 = load_sound_from_mp('OST/ÇΓá¬á/ÇΓá¬á3.mp3')
-MUSIC_UNITED1 = load_sound_from_mp('OST/Äíδτ¡á∩/Äíδτ¡á∩1.mp3')
-MUSIC_UNITED2 = load_sound_from_mp('OST/Äíδτ¡á∩/Äíδτ¡á∩2.mp3')
-MUSIC_UNITED3 = load_sound_from_mp('OST/Äíδτ¡á∩/Äíδτ¡á∩3.mp3')
-
-HIT = [
-    load_sound_from_mp('æΓαÑ½∞íá/Å«»«ñá¡¿Ñ/»1.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/Å«»«ñá¡¿Ñ/»2.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/Å«»«ñá¡¿Ñ/»3.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/Å«»«ñá¡¿Ñ/»4.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/Å«»«ñá¡¿Ñ/»5.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/Å«»«ñá¡¿Ñ/»6.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/Å«»«ñá¡¿Ñ/»7.mp3')
-]
-
-SOUND_COPPER_TURRET = [
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/îÑñ¡á∩/Γ1.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/îÑñ¡á∩/Γ2.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/îÑñ¡á∩/Γ3.mp3')
-]
-
-SOUND_BRONZE_TURRET = [
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/üα«¡ºáóá∩/Γ1.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/üα«¡ºáóá∩/Γ2.mp3')
-]
-
-SOUND_LONG_BARRELED_TURRET = [
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/ä½¿¡¡«ßΓó«½∞¡á∩/Γ1.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/ä½¿¡¡«ßΓó«½∞¡á∩/Γ2.mp3'),
-    load_sound_from_mp('æΓαÑ½∞íá/ÆπαÑ½∞/ä½¿¡¡«ßΓó«½∞¡á∩/Γ3.mp3')
-]
-
-print("\nЗагрузка звуков завершена!")
-
-import atexit
-atexit.register(cleanup_directory)
\ No newline at end of file
+
+def __getattr__(name):
+    """
+    Ленивые константы модуля.
+    BUILDING_KEYS и BAGS собираются один раз и дальше лежат в модуле как обычно.
+    Звуки по старым именам (MUSIC_MENU, HIT, ...) берутся из загрузчика ассетов;
+    если ещё не загружены - ждём только их. SOUND_ARCHIVE - архив звуков загрузчика.
+    """
+    if name in LAZY_TABLES:
+        value = LAZY_TABLES[name]()
+        globals()[name] = value
+        return value
+    if name == "SOUND_ARCHIVE":
+        from assets import ASSETS
+        return ASSETS.audio
+    if name not in SOUND_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from assets import ASSETS
+    key, index = SOUND_NAMES[name]
+    sound = ASSETS.require(key)
+    if index is None:
+        return sound
+    return sound[index] if sound and index < len(sound) else None
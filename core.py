@@ -2,7 +2,8 @@ import arcade
 from typing import List, Dict, Union, Optional
 from buildings import Building
 from resources import *
-from random import randint
+import telemetry
+from rng import RNG
 
 # ----------- ЯДРО (немного изменённое) -----------
 class Core(Building):
@@ -28,8 +29,12 @@ class Core(Building):
     # Ядро не производит ничего
     def _produce(self):
         """производит уголь, медь, олово и кремний(последний с шансом в 10%)"""
-        self.add('уголь')
-        self.add('медь')
-        self.add('олово')
-        if randint(1, 10) == 1:
-            self.add('кремний')
\ No newline at end of file
+        self.add('Уголь')
+        self.add('Медь')
+        self.add('Олово')
+        telemetry.produced('Уголь')
+        telemetry.produced('Медь')
+        telemetry.produced('Олово')
+        if RNG.core.randint(1, 10) == 1:
+            self.add('Кремний')
+            telemetry.produced('Кремний')
\ No newline at end of file
@@ -1,13 +1,143 @@
+import atexit
+import queue
 import sqlite3
 import json
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Callable
+
+import leaderboard
+
+DB_NAME = "game_database.db"
+
+# Версия схемы (PRAGMA user_version): таблицы и индексы создаются,
+# только если файл старее этой версии, а не при каждом открытии
+SCHEMA_VERSION = 4
+
+# Сколько подготовленных запросов держит каждое соединение
+STATEMENT_CACHE_SIZE = 64
+
+# Сколько записей поток записи объединяет в одну транзакцию
+WRITE_BATCH_MAX = 64
+
+
+def connect(db_name: str) -> sqlite3.Connection:
+    """Соединение в режиме WAL: чтение не ждёт записи, fsync - только при checkpoint"""
+    connection = sqlite3.connect(db_name, check_same_thread=False,
+                                 cached_statements=STATEMENT_CACHE_SIZE)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("PRAGMA foreign_keys = ON")
+    return connection
+
+
+def report_errors(message: str) -> Callable[[Future], None]:
+    """Колбэк для Future записи: ошибку печатаем, как раньше печатали методы записи"""
+    def callback(future: Future):
+        error = future.exception()
+        if error is not None:
+            print(f"{message}: {error}")
+    return callback
+
+
+class DatabaseWriter:
+    """
+    Фоновый поток записи в базу.
+
+    Запись ставится в очередь и сразу возвращает Future. Поток забирает
+    из очереди всё накопившееся (до WRITE_BATCH_MAX) и выполняет одной
+    транзакцией; каждая запись - в своей точке сохранения, так что ошибка
+    одной не откатывает остальные. Future завершается после COMMIT.
+    """
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self.jobs: "queue.Queue" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def submit(self, job: Callable, *args) -> Future:
+        """Поставить запись job(cursor, *args) в очередь"""
+        future = Future()
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self.thread.start()
+            self.jobs.put((future, job, args))
+        return future
+
+    def _run(self):
+        connection = connect(self.db_name)
+        connection.isolation_level = None  # транзакциями управляем сами
+        cursor = connection.cursor()
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < WRITE_BATCH_MAX:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            stop = [future for future, job, _ in batch if job is None]
+            self._write(connection, cursor, [item for item in batch if item[1] is not None])
+            if stop:
+                connection.close()
+                for future in stop:
+                    future.set_result(None)
+                return
+
+    def _write(self, connection: sqlite3.Connection, cursor: sqlite3.Cursor, batch: List):
+        """Выполнить пачку записей одной транзакцией"""
+        if not batch:
+            return
+        results = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for future, job, args in batch:
+                cursor.execute("SAVEPOINT job")
+                try:
+                    result = job(cursor, *args)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO job")
+                    results.append((future, None, e))
+                else:
+                    results.append((future, result, None))
+                cursor.execute("RELEASE job")
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                cursor.execute("ROLLBACK")
+            results = [(future, None, e) for future, _, _ in batch]
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def flush(self):
+        """Дождаться всех записей, поставленных до этого вызова"""
+        if self.thread is not None:
+            self.submit(lambda cursor: None).result()
+
+    def stop(self):
+        """Дописать очередь и остановить поток"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is None:
+                return
+            future = Future()
+            self.jobs.put((future, None, ()))
+        future.result()
+        thread.join()
 
 
 class GameDatabase:
     """База данных для хранения пользователей и рекордов"""
 
-    def __init__(self, db_name: str = "game_database.db"):
+    # Общие экземпляры на процесс (по имени файла), см. shared()
+    _shared: Dict[str, "GameDatabase"] = {}
+
+    def __init__(self, db_name: Optional[str] = None):
         """
         Инициализация базы данных
 
@@ -16,15 +146,66 @@ class GameDatabase:
         2. level_records - рекорды по уровням
         3. global_records - глобальные рекорды
         4. player_progress - прогресс игроков
+
+        Чтение идёт через соединение этого экземпляра, запись - через
+        фоновый поток (DatabaseWriter) со своим соединением: методы записи
+        возвращают Future и не ждут диска. Обычно нужен не новый экземпляр,
+        а общий на процесс: GameDatabase.shared().
+
+        Без db_name берётся DB_NAME на момент вызова (замеры и тесты
+        подставляют временный файл).
         """
+        db_name = db_name or DB_NAME
         self.db_name = db_name
-        self.connection = sqlite3.connect(db_name)
+        self.connection = connect(db_name)
         self.cursor = self.connection.cursor()
+        self.writer = DatabaseWriter(db_name)
+        # Кэш профилей: user_id -> статистика, прогресс и рекорды по уровням.
+        # Сбрасывается методами записи после COMMIT (см. invalidate_profile)
+        self.profiles: Dict[int, Dict[str, Any]] = {}
+        self.profile_generation = 0
         self.create_tables()
+        # Чтение рейтингов: топ, место игрока, страницы (leaderboard.py)
+        self.leaderboard = leaderboard.Leaderboard(self.connection)
+
+    @classmethod
+    def shared(cls, db_name: Optional[str] = None) -> "GameDatabase":
+        """Один долгоживущий экземпляр на процесс (закрывается при выходе)"""
+        db_name = db_name or DB_NAME
+        db = cls._shared.get(db_name)
+        if db is None:
+            db = cls(db_name)
+            cls._shared[db_name] = db
+        return db
+
+    @classmethod
+    def close_shared(cls):
+        for db in list(cls._shared.values()):
+            db.close()
 
     def create_tables(self):
-        """Создание таблиц базы данных"""
+        """Создание таблиц и индексов (один раз на файл, см. SCHEMA_VERSION)"""
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        if version < 1:
+            self.create_base_tables()
+        if version < 2:
+            # Рейтинги (leaderboard.py) - собираются из уже сохранённых рекордов
+            leaderboard.create_tables(self.cursor)
+            leaderboard.rebuild(self.cursor)
+        if version < 3:
+            # Телеметрия уровней (telemetry.py тянет numpy - импортируем только здесь)
+            import telemetry
+            telemetry.create_tables(self.cursor)
+        if 2 <= version < 4:
+            # Второй уровень гистограммы рейтингов (блоки корзин) по уже собранным рейтингам
+            leaderboard.create_tables(self.cursor)
+            leaderboard.rebuild_buckets(self.cursor)
+        self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.commit()
 
+    def create_base_tables(self):
         # Таблица пользователей
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -86,7 +267,9 @@ class GameDatabase:
             )
         ''')
 
-        self.connection.commit()
+        create_indexes(self, commit=False)
+
+    # === ЗАПИСЬ (в фоновом потоке) ===
 
     def register_user(self, username: str) -> int:
         """
@@ -94,25 +277,38 @@ class GameDatabase:
 
         Возвращает:
         int - ID нового пользователя или -1 при ошибке
+        (ID нужен сразу, поэтому здесь запись ждёт своей транзакции)
         """
+        future = self.writer.submit(self._register_user, username)
+        try:
+            return future.result()
+        except sqlite3.Error as e:
+            print(f"Ошибка регистрации: {e}")
+            return -1
+
+    @staticmethod
+    def _register_user(cursor: sqlite3.Cursor, username: str) -> int:
         try:
-            self.cursor.execute(
+            cursor.execute(
                 "INSERT INTO users (username) VALUES (?)",
                 (username,)
             )
-            user_id = self.cursor.lastrowid
-
-            # Создаем запись прогресса для нового пользователя
-            self.cursor.execute(
-                "INSERT INTO player_progress (user_id) VALUES (?)",
-                (user_id,)
-            )
-
-            self.connection.commit()
-            return user_id
         except sqlite3.IntegrityError:
             # Пользователь уже существует
-            return self.get_user_id(username)
+            cursor.execute(
+                "SELECT user_id FROM users WHERE username = ?",
+                (username,)
+            )
+            result = cursor.fetchone()
+            return result[0] if result else -1
+        user_id = cursor.lastrowid
+
+        # Создаем запись прогресса для нового пользователя
+        cursor.execute(
+            "INSERT INTO player_progress (user_id) VALUES (?)",
+            (user_id,)
+        )
+        return user_id
 
     def get_user_id(self, username: str) -> int:
         """Получение ID пользователя по имени"""
@@ -123,7 +319,7 @@ class GameDatabase:
         result = self.cursor.fetchone()
         return result[0] if result else -1
 
-    def save_level_record(self, user_id: int, level_data: Dict[str, Any]):
+    def save_level_record(self, user_id: int, level_data: Dict[str, Any]) -> Optional[Future]:
         """
         Сохранение рекорда уровня
 
@@ -139,50 +335,58 @@ class GameDatabase:
             - buildings_built: int
             - drones_used: int
             - difficulty: str
-        """
-        try:
-            # Проверяем, что уровень в диапазоне 1-3
-            level_number = level_data['level_number']
-            if not 1 <= level_number <= 3:
-                print(f"Ошибка: уровень {level_number} вне диапазона 1-3")
-                return
 
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO level_records 
-                (user_id, level_number, score, enemies_killed, time_spent, 
-                 waves_completed, resources_collected, buildings_built, drones_used, difficulty)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id,
-                level_number,
-                level_data['score'],
-                level_data['enemies_killed'],
-                level_data['time_spent'],
-                level_data['waves_completed'],
-                level_data['resources_collected'],
-                level_data['buildings_built'],
-                level_data['drones_used'],
-                level_data.get('difficulty', 'normal')
-            ))
-
-            # Обновляем общую статистику пользователя
-            self.cursor.execute('''
-                UPDATE users 
-                SET total_games_played = total_games_played + 1,
-                    total_enemies_killed = total_enemies_killed + ?,
-                    total_play_time = total_play_time + ?
-                WHERE user_id = ?
-            ''', (
-                level_data['enemies_killed'],
-                level_data['time_spent'],
-                user_id
-            ))
+        Возвращает Future записи (None, если данные неверные)
+        """
+        # Проверяем, что уровень в диапазоне 1-3
+        level_number = level_data['level_number']
+        if not 1 <= level_number <= 3:
+            print(f"Ошибка: уровень {level_number} вне диапазона 1-3")
+            return None
+
+        future = self.writer.submit(self._save_level_record, user_id, dict(level_data))
+        future.add_done_callback(report_errors("Ошибка сохранения рекорда"))
+        future.add_done_callback(lambda f: self.invalidate_profile(user_id))
+        return future
+
+    @staticmethod
+    def _save_level_record(cursor: sqlite3.Cursor, user_id: int, level_data: Dict[str, Any]):
+        cursor.execute('''
+            INSERT OR REPLACE INTO level_records
+            (user_id, level_number, score, enemies_killed, time_spent,
+             waves_completed, resources_collected, buildings_built, drones_used, difficulty)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            user_id,
+            level_data['level_number'],
+            level_data['score'],
+            level_data['enemies_killed'],
+            level_data['time_spent'],
+            level_data['waves_completed'],
+            level_data['resources_collected'],
+            level_data['buildings_built'],
+            level_data['drones_used'],
+            level_data.get('difficulty', 'normal')
+        ))
+
+        # Обновляем общую статистику пользователя
+        cursor.execute('''
+            UPDATE users
+            SET total_games_played = total_games_played + 1,
+                total_enemies_killed = total_enemies_killed + ?,
+                total_play_time = total_play_time + ?
+            WHERE user_id = ?
+        ''', (
+            level_data['enemies_killed'],
+            level_data['time_spent'],
+            user_id
+        ))
 
-            self.connection.commit()
-        except Exception as e:
-            print(f"Ошибка сохранения рекорда: {e}")
+        # Рейтинг уровня: при равных очках выше тот, кто быстрее
+        leaderboard.submit_score(cursor, level_data['level_number'], user_id, level_data['score'],
+                                 tiebreak=level_data['time_spent'], extra=level_data['time_spent'])
 
-    def save_global_record(self, user_id: int, total_stats: Dict[str, Any]):
+    def save_global_record(self, user_id: int, total_stats: Dict[str, Any]) -> Future:
         """
         Сохранение глобального рекорда
 
@@ -194,171 +398,206 @@ class GameDatabase:
             - total_enemies_killed: int
             - total_play_time: float
         """
-        try:
-            self.cursor.execute('''
-                INSERT INTO global_records 
-                (user_id, total_score, levels_completed, total_enemies_killed, total_play_time)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                user_id,
-                total_stats['total_score'],
-                total_stats['levels_completed'],
-                total_stats['total_enemies_killed'],
-                total_stats['total_play_time']
-            ))
-            self.connection.commit()
-        except Exception as e:
-            print(f"Ошибка сохранения глобального рекорда: {e}")
+        future = self.writer.submit(self._save_global_record, user_id, dict(total_stats))
+        future.add_done_callback(report_errors("Ошибка сохранения глобального рекорда"))
+        future.add_done_callback(lambda f: self.invalidate_profile(user_id))
+        return future
+
+    @staticmethod
+    def _save_global_record(cursor: sqlite3.Cursor, user_id: int, total_stats: Dict[str, Any]):
+        cursor.execute('''
+            INSERT INTO global_records
+            (user_id, total_score, levels_completed, total_enemies_killed, total_play_time)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            user_id,
+            total_stats['total_score'],
+            total_stats['levels_completed'],
+            total_stats['total_enemies_killed'],
+            total_stats['total_play_time']
+        ))
+
+        # Общий рейтинг: при равных очках выше тот, кто набрал их раньше
+        leaderboard.submit_score(cursor, leaderboard.GLOBAL_BOARD, user_id, total_stats['total_score'],
+                                 tiebreak=leaderboard.julian_now(), extra=total_stats['levels_completed'])
+
+    def update_player_progress(self, user_id: int, current_level: int,
+                               unlocked_levels: int = None) -> Future:
+        """
+        Обновление прогресса игрока
+
+        Параметры:
+        user_id: int - ID пользователя
+        current_level: int - текущий уровень
+        unlocked_levels: int - открытые уровни (если None, то max(current_level, unlocked_levels))
+        """
+        future = self.writer.submit(self._update_player_progress, user_id, current_level, unlocked_levels)
+        future.add_done_callback(report_errors("Ошибка обновления прогресса"))
+        future.add_done_callback(lambda f: self.invalidate_profile(user_id))
+        return future
+
+    @staticmethod
+    def _update_player_progress(cursor: sqlite3.Cursor, user_id: int, current_level: int,
+                                unlocked_levels: Optional[int]):
+        if unlocked_levels is None:
+            # max() считается в том же запросе - без отдельного чтения
+            cursor.execute('''
+                UPDATE player_progress
+                SET current_level = ?,
+                    unlocked_levels = MAX(COALESCE(unlocked_levels, 1), ?),
+                    last_played = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            ''', (current_level, current_level, user_id))
+        else:
+            cursor.execute('''
+                UPDATE player_progress
+                SET current_level = ?,
+                    unlocked_levels = ?,
+                    last_played = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            ''', (current_level, unlocked_levels, user_id))
+
+    def save_game_state(self, user_id: int, game_state: Dict[str, Any]) -> Future:
+        """
+        Сохранение состояния игры для продолжения
+
+        Параметры:
+        user_id: int - ID пользователя
+        game_state: Dict - состояние игры в формате JSON
+        """
+        future = self.writer.submit(self._save_game_state, user_id, json.dumps(game_state))
+        future.add_done_callback(report_errors("Ошибка сохранения состояния"))
+        future.add_done_callback(lambda f: self.invalidate_profile(user_id))
+        return future
+
+    @staticmethod
+    def _save_game_state(cursor: sqlite3.Cursor, user_id: int, game_state: str):
+        cursor.execute('''
+            UPDATE player_progress
+            SET saved_game_state = ?
+            WHERE user_id = ?
+        ''', (game_state, user_id))
+
+    def flush(self):
+        """Дождаться всех поставленных записей (например, перед чтением своих же данных)"""
+        self.writer.flush()
+
+    # === ЧТЕНИЕ ===
 
     def get_top_level_records(self, level_number: int, limit: int = 10) -> List[Tuple]:
         """
-        Получение топ рекордов для конкретного уровня
+        Получение топ рекордов для конкретного уровня (лучший результат каждого игрока)
 
         Возвращает:
         List[Tuple] - список кортежей (username, score, time_spent, date_achieved)
         """
-        self.cursor.execute('''
-            SELECT u.username, lr.score, lr.time_spent, lr.date_achieved
-            FROM level_records lr
-            JOIN users u ON lr.user_id = u.user_id
-            WHERE lr.level_number = ?
-            ORDER BY lr.score DESC, lr.time_spent ASC
-            LIMIT ?
-        ''', (level_number, limit))
-
-        return self.cursor.fetchall()
+        return [(entry.username, entry.score, entry.extra, entry.date_achieved)
+                for entry in self.leaderboard.top(level_number, limit)]
 
     def get_top_global_records(self, limit: int = 10) -> List[Tuple]:
         """
-        Получение топ глобальных рекордов
+        Получение топ глобальных рекордов (лучший результат каждого игрока)
 
         Возвращает:
         List[Tuple] - список кортежей (username, total_score, levels_completed, date_achieved)
         """
-        self.cursor.execute('''
-            SELECT u.username, gr.total_score, gr.levels_completed, gr.date_achieved
-            FROM global_records gr
-            JOIN users u ON gr.user_id = u.user_id
-            ORDER BY gr.total_score DESC, gr.date_achieved ASC
-            LIMIT ?
-        ''', (limit,))
+        return [(entry.username, entry.score, int(entry.extra), entry.date_achieved)
+                for entry in self.leaderboard.top(leaderboard.GLOBAL_BOARD, limit)]
 
-        return self.cursor.fetchall()
+    def get_rank(self, user_id: int, board: int = leaderboard.GLOBAL_BOARD) -> Optional[int]:
+        """Место игрока в рейтинге (board: 0 - общий, 1-3 - уровень), None - нет результата"""
+        return self.leaderboard.rank_of(board, user_id)
 
-    def get_user_stats(self, user_id: int) -> Dict[str, Any]:
-        """Получение статистики пользователя"""
+    # === ПРОФИЛЬ ИГРОКА (кэш чтения) ===
+
+    def get_profile(self, user_id: int) -> Dict[str, Any]:
+        """
+        Профиль игрока: {'stats': ..., 'records': ..., 'saved_game_state': ...}.
+
+        Читается из базы одним запросом при первом обращении, дальше -
+        из кэша, пока его не сбросит запись (меню спрашивают профиль
+        каждый кадр). Словари профиля общие - их нельзя изменять.
+        """
+        profile = self.profiles.get(user_id)
+        if profile is None:
+            # Если запись завершилась, пока шёл запрос, результат мог
+            # устареть - тогда он не кэшируется
+            generation = self.profile_generation
+            profile = self._load_profile(user_id)
+            if generation == self.profile_generation:
+                self.profiles[user_id] = profile
+        return profile
+
+    def invalidate_profile(self, user_id: int):
+        """Сбросить кэш профиля (вызывается после записи, в т.ч. из потока записи)"""
+        self.profile_generation += 1
+        self.profiles.pop(user_id, None)
+
+    def _load_profile(self, user_id: int) -> Dict[str, Any]:
+        """Статистика, прогресс и рекорды по уровням одним запросом"""
         self.cursor.execute('''
-            SELECT u.username, u.registration_date, u.total_play_time, 
+            SELECT u.username, u.registration_date, u.total_play_time,
                    u.total_games_played, u.total_enemies_killed, u.favorite_turret,
-                   pp.current_level, pp.unlocked_levels
+                   pp.current_level, pp.unlocked_levels, pp.saved_game_state,
+                   (SELECT MAX(gr.total_score) FROM global_records gr
+                    WHERE gr.user_id = u.user_id),
+                   lr.level_number, lr.score, lr.enemies_killed, lr.time_spent,
+                   lr.waves_completed, lr.date_achieved
             FROM users u
             LEFT JOIN player_progress pp ON u.user_id = pp.user_id
+            LEFT JOIN level_records lr ON u.user_id = lr.user_id
             WHERE u.user_id = ?
+            ORDER BY lr.level_number
         ''', (user_id,))
-
-        result = self.cursor.fetchone()
-        if result:
-            return {
-                'username': result[0],
-                'registration_date': result[1],
-                'total_play_time': result[2],
-                'total_games_played': result[3],
-                'total_enemies_killed': result[4],
-                'favorite_turret': result[5],
-                'current_level': result[6] or 1,
-                'unlocked_levels': result[7] or 1
-            }
-        return {}
-
-    def get_user_level_records(self, user_id: int) -> Dict[int, Dict]:
-        """Получение всех рекордов пользователя по уровням"""
-        self.cursor.execute('''
-            SELECT level_number, score, enemies_killed, time_spent, 
-                   waves_completed, date_achieved
-            FROM level_records
-            WHERE user_id = ?
-            ORDER BY level_number
-        ''', (user_id,))
-
+        rows = self.cursor.fetchall()
+        if not rows:
+            return {'stats': {}, 'records': {}, 'saved_game_state': None}
+
+        first = rows[0]
+        stats = {
+            'username': first[0],
+            'registration_date': first[1],
+            'total_play_time': first[2],
+            'total_games_played': first[3],
+            'total_enemies_killed': first[4],
+            'favorite_turret': first[5],
+            'current_level': first[6] or 1,
+            'unlocked_levels': first[7] or 1,
+            'best_total_score': first[9] or 0
+        }
         records = {}
-        for row in self.cursor.fetchall():
-            records[row[0]] = {
-                'score': row[1],
-                'enemies_killed': row[2],
-                'time_spent': row[3],
-                'waves_completed': row[4],
-                'date_achieved': row[5]
-            }
-
-        return records
-
-    def update_player_progress(self, user_id: int, current_level: int, unlocked_levels: int = None):
-        """
-        Обновление прогресса игрока
-
-        Параметры:
-        user_id: int - ID пользователя
-        current_level: int - текущий уровень
-        unlocked_levels: int - открытые уровни (если None, то max(current_level, unlocked_levels))
-        """
-        if unlocked_levels is None:
-            # Получаем текущий прогресс
-            self.cursor.execute(
-                "SELECT unlocked_levels FROM player_progress WHERE user_id = ?",
-                (user_id,)
-            )
-            current = self.cursor.fetchone()
-            current_unlocked = current[0] if current else 1
-
-            unlocked_levels = max(current_unlocked, current_level)
+        for row in rows:
+            if row[10] is not None:
+                records[row[10]] = {
+                    'score': row[11],
+                    'enemies_killed': row[12],
+                    'time_spent': row[13],
+                    'waves_completed': row[14],
+                    'date_achieved': row[15]
+                }
+        return {'stats': stats, 'records': records, 'saved_game_state': first[8]}
 
-        try:
-            self.cursor.execute('''
-                UPDATE player_progress 
-                SET current_level = ?, 
-                    unlocked_levels = ?,
-                    last_played = CURRENT_TIMESTAMP
-                WHERE user_id = ?
-            ''', (current_level, unlocked_levels, user_id))
-
-            self.connection.commit()
-        except Exception as e:
-            print(f"Ошибка обновления прогресса: {e}")
-
-    def save_game_state(self, user_id: int, game_state: Dict[str, Any]):
-        """
-        Сохранение состояния игры для продолжения
-
-        Параметры:
-        user_id: int - ID пользователя
-        game_state: Dict - состояние игры в формате JSON
-        """
-        try:
-            self.cursor.execute('''
-                UPDATE player_progress 
-                SET saved_game_state = ?
-                WHERE user_id = ?
-            ''', (json.dumps(game_state), user_id))
+    def get_user_stats(self, user_id: int) -> Dict[str, Any]:
+        """Получение статистики пользователя (из кэша профиля)"""
+        return self.get_profile(user_id)['stats']
 
-            self.connection.commit()
-        except Exception as e:
-            print(f"Ошибка сохранения состояния: {e}")
+    def get_user_level_records(self, user_id: int) -> Dict[int, Dict]:
+        """Получение всех рекордов пользователя по уровням (из кэша профиля)"""
+        return self.get_profile(user_id)['records']
 
     def load_game_state(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Загрузка сохраненного состояния игры"""
-        self.cursor.execute(
-            "SELECT saved_game_state FROM player_progress WHERE user_id = ?",
-            (user_id,)
-        )
-
-        result = self.cursor.fetchone()
-        if result and result[0]:
-            return json.loads(result[0])
+        saved_game_state = self.get_profile(user_id)['saved_game_state']
+        if saved_game_state:
+            return json.loads(saved_game_state)
         return None
 
     def close(self):
-        """Закрытие соединения с БД"""
+        """Закрытие соединения с БД (очередь записи сначала дописывается)"""
+        self.writer.stop()
         self.connection.close()
+        if GameDatabase._shared.get(self.db_name) is self:
+            del GameDatabase._shared[self.db_name]
 
     def __enter__(self):
         return self
@@ -367,8 +606,12 @@ class GameDatabase:
         self.close()
 
 
+# Общие соединения закрываются при выходе - поток записи успевает дописать очередь
+atexit.register(GameDatabase.close_shared)
+
+
 # Создание индексов для оптимизации запросов
-def create_indexes(db: GameDatabase):
+def create_indexes(db: GameDatabase, commit: bool = True):
     """Создание индексов для ускорения запросов"""
     indexes = [
         "CREATE INDEX IF NOT EXISTS idx_level_records_level ON level_records(level_number)",
@@ -381,7 +624,8 @@ def create_indexes(db: GameDatabase):
     for index_sql in indexes:
         db.cursor.execute(index_sql)
 
-    db.connection.commit()
+    if commit:
+        db.connection.commit()
 
 
 # Инициализация базы данных при импорте
@@ -414,11 +658,11 @@ if __name__ == "__main__":
         'difficulty': 'normal'
     }
 
-    db.save_level_record(user_id, test_record)
+    db.save_level_record(user_id, test_record).result()
     print("Тестовый рекорд сохранен")
 
     # Получаем статистику
     stats = db.get_user_stats(user_id)
     print(f"Статистика пользователя: {stats}")
 
-    db.close()
\ No newline at end of file
+    db.close()
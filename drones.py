@@ -1,5 +1,6 @@
 import arcade
 import math
+import telemetry
 
 
 class Drone(arcade.Sprite):
@@ -94,6 +95,7 @@ class Drone(arcade.Sprite):
     def unload(self):
         """Разгрузить ресурс"""
         self.cargo = None
+        telemetry.count(telemetry.DRONE_TRIPS)
         self.state = "to_source"
         self.target_x = self.source.center_x
         self.target_y = self.source.center_y
@@ -109,7 +111,7 @@ class Drone(arcade.Sprite):
             return None
 
         # Запрашиваем первый доступный ресурс из источника
-        for res, amt in self.source.storage.get_all().items():
+        for res, amt in self.source.get_all().items():
             if amt > 0:
                 return res
         return None
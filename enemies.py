@@ -2,6 +2,7 @@ import arcade
 import math
 from typing import Any
 from sprite_list import bad_bullet, buildings  # добавлен buildings
+import heatmap
 # from core import Core  # для проверки типа
 
 
@@ -191,6 +192,7 @@ class Bug(arcade.Sprite):
         else:
             if hasattr(target, 'take_damage'):
                 target.take_damage(self.damage)
+                heatmap.add_event(heatmap.DAMAGE_TAKEN, target.center_x, target.center_y, self.damage)
 
         self.attack_cooldown = self.attack_cooldown_time
 
@@ -219,7 +221,7 @@ class Beetle(Bug):
 class ArmoredBeetle(Bug):
     def __init__(self, x: float, y: float, core: Any):
         super().__init__(
-            filename="Изображения/Жуки/Крепкий/Жук брониосиц.png",
+            filename="Изображения/Жуки/Крепкий/Жук брониносиц.png",
             scale=SPRITE_SCALE, x=x, y=y, core=core,
             hp=3, damage=1, speed=1.0, is_ranged=False,
             attack_cooldown_time=0.5, name="Броненосец",
@@ -3,28 +3,52 @@ import arcade
 from arcade.camera import Camera2D
 from arcade.gui import UIManager
 import math
-import random
+import time
+from typing import Optional
 
-from arcade.math import rand_in_circle, rand_on_circle
-from arcade.particles import Emitter, EmitBurst, LifetimeParticle
-
-from constants import T_SIZE, SPRITE_SCALE, WAVES, BUILDING_HP, BUILDING_KEYS, BAGS, \
-    CAMERA_LERP, RESOURCES, TEXTYRE, MUSIC_MENU, MUSIC_UNITED2, MUSIC_UNITED1, MUSIC_ATTACKS1, MUSIC_UNITED3, \
-    MUSIC_ATTACKS2, MUSIC_ATTACKS3, HIT, JSON
+from constants import T_SIZE, SPRITE_SCALE, LEVELS, BUILDING_HP, BUILDING_KEYS, BAGS, \
+    CAMERA_LERP, RESOURCES, TEXTYRE, SAVE_SLOTS_SHOWN, AUTOSAVE_INTERVAL, AUTOSAVE_SLOT, \
+    SNAPSHOT_WAIT_TIMEOUT, SCORE_PER_KILL, SCORE_PER_WAVE, SCORE_PER_RESOURCE
+from assets import ASSETS, LEVEL_LOAD_TIMEOUT
 from sprite_list import good_bullet, bad_bullet, players, buildings, bugs
+from particles import ParticleSystem
+from quality import QualityController
+from mixer import Mixer
+from render_scale import WorldRenderTarget
+from overlay import OverlayLayer
+from chunks import ChunkStreamer
+from rewind import RewindBuffer, REWIND_STEP
+from rng import RNG
+import telemetry
+from telemetry import TelemetryRecorder
+import heatmap
+from heatmap import HeatmapRecorder
+from replay import InputRecorder
+from profiler import FrameProfiler, TOGGLE_KEY, TRACE_KEY
 from core import Core
 from player import Player
-from buildings import (Building, ElectricDrill,
+from buildings import (Building, MineDrill, ElectricDrill,
                        BronzeFurnace, SiliconFurnace, AmmoFactory,
-                       CopperTurret, BronzeTurret, LongRangeTurret, Drone)
+                       CopperTurret, BronzeTurret, LongRangeTurret,
+                       Turret, TurretSystem)
+from drones import Drone
 from enemies import (Bug, Beetle, ArmoredBeetle, SpittingBeetle,
                      DominicTorettoBeetle, HarkerBeetle)
 
-class MyGame(arcade.Window):
-    """Основной класс игры - управляет всем игровым процессом"""
+class GameView(arcade.View):
+    """
+    Основной класс игры - управляет всем игровым процессом.
+
+    Один экземпляр живёт всё время работы окна: камеры, пулы частиц,
+    оверлей, турели, буфер мира и микшер создаются один раз, а при смене
+    уровня мир сбрасывается на месте (start_level). Окна результатов -
+    это отдельные View на том же окне, пока они показаны, карта
+    и ассеты следующего уровня грузятся в фоне.
+    """
 
-    def __init__(self, width: int, height: int, title: str):
-        super().__init__(width, height, title)
+    def __init__(self, level_number: int = 1, user_id: Optional[int] = None,
+                 username: Optional[str] = None, offline: bool = False):
+        super().__init__()
 
         # Инициализация камер и т.п.
         self.txtt = None
@@ -32,8 +56,8 @@ class MyGame(arcade.Window):
         self.gui_camera = arcade.camera.Camera2D()
         self.cam_target = (0, 0)
 
-        # Система волн (загружается из константы WAVES)
-        self.waves = WAVES
+        # Система волн (из данных уровня в LEVELS, заполняется в start_level)
+        self.waves = []
         self.current_wave_index = 0
         self.wave_timer = 100
 
@@ -46,43 +70,176 @@ class MyGame(arcade.Window):
         self.core = None
         self.rote_dron = False
         self.information_about_the_building = {}
+        self.ost_UNITED = True
 
-        # Загрузка карты и настройка
+        # Карта (загружается в start_level)
         self.map_height_pixels = None
         self.map_width_pixels = None
         self.map_height = None
         self.map_width = None
-        self.map = None
-        self.setup()
-        self.load_map()
-        self.buildings = arcade.SpriteList()
-        self.bullets = arcade.SpriteList()
-        self.bugs = arcade.SpriteList()
-        self.drones = arcade.SpriteList()
-        self.grid = None
+        self.map = None  # скомпилированный уровень (level_compiler.CompiledLevel)
+        self.catalog = None  # каталог сохранений level.sqlite (открывается при первой паузе)
+        self.snapshot_writer = None  # фоновая запись снимков мира (создаётся при первом сохранении)
+        self.autosave_timer = 0.0
+        # Клетки карты и здания по чанкам: в памяти только то, что рядом
+        self.chunks = ChunkStreamer()
+        # Последние секунды игры для перемотки назад (Backspace)
+        self.rewind = RewindBuffer()
+        # Посекундные счётчики уровня (ресурсы, выстрелы, жуки, время кадра) в базу
+        self.telemetry = TelemetryRecorder()
+        # Тепловые карты уровня (где ходили жуки, где урон, промахи, дроны)
+        self.heatmap = HeatmapRecorder()
+        # Запись ввода и шагов времени для точного повтора уровня (replay.py)
+        self.recorder = InputRecorder()
+        self.seed = 0  # зерно генераторов текущего уровня
+        # Время систем по кадрам: оверлей (F9) и трасса Chrome (F10)
+        self.profiler = FrameProfiler()
+        # Все звуки уровня идут через микшер с ограниченным числом голосов
+        self.mixer = Mixer()
         self.resource_icons = arcade.SpriteList()
-        self.emitters = []
-        self.star_texture = arcade.load_texture("Изображения\Остальное\Пуля.png")
-        self.orb_texture = arcade.load_texture("Изображения\Остальное\Камень.png")
+        self.star_texture = ASSETS.require("bullet")
+        self.orb_texture = ASSETS.require("stone")
+        # Все взрывы живут в одном пуле частиц
+        self.particles = ParticleSystem({"hit": self.star_texture, "ring": self.orb_texture})
+        # Турели: стрельба и поворот башен, отрисовка двумя SpriteList
+        self.turrets = TurretSystem()
+        # Полоски здоровья и маршруты дронов (один SpriteList)
+        self.overlay = OverlayLayer()
+        # Слой мира можно рисовать в уменьшенном разрешении
+        self.world_target = WorldRenderTarget(self.window)
+        # Адаптивное качество по времени кадра
+        self.quality = QualityController()
+        self.frame_start = None  # начало текущего кадра (perf_counter)
+        self.apply_quality()
+        self.setup_ui()
         self.pausa_dui()
         self.game_time = 0.0  # время текущего уровня
         self.game_stats = GameStats()  # общая статистика за все уровни
-        self.current_level = 1  # будет переопределено из меню
-        self.current_user_id = None  # ID пользователя из БД
-        self.current_user = None  # имя пользователя
+        self.current_level = level_number
+        self.current_user_id = user_id  # ID пользователя из БД
+        self.current_user = username  # имя пользователя
         self.enemies_killed = 0  # убито на текущем уровне
         self.buildings_built = 0  # построено на уровне
         self.drones_used = 0  # создано дронов на уровне
+        # Мир без следов на диске (повтор записи, замеры), см. set_offline
+        self.offline = False
+        self.set_offline(offline)
+
+        self.start_level(level_number)
+
+    @classmethod
+    def for_window(cls, window: arcade.Window, level_number: int,
+                   user_id: Optional[int] = None, username: Optional[str] = None,
+                   offline: bool = False) -> "GameView":
+        """
+        Игровой View окна: создаётся один раз, дальше переиспользуется
+        (при повторном входе из меню мир просто сбрасывается на новый уровень)
+        """
+        view = getattr(window, "game_view", None)
+        if view is None:
+            view = cls(level_number, user_id, username, offline)
+            window.game_view = view
+        else:
+            view.set_offline(offline)
+            view.current_user_id = user_id
+            view.current_user = username
+            view.game_stats = GameStats()
+            view.start_level(level_number)
+        return view
+
+    def set_offline(self, offline: bool) -> bool:
+        """
+        Включить/выключить режим без записи: нет автосохранений, снимков
+        перемотки, записи ввода, телеметрии в базе, тепловых карт и
+        рекордов уровня. Возвращает прежнее значение (чтобы вернуть его после)
+        """
+        previous = self.offline
+        self.offline = offline
+        self.rewind.enabled = not offline
+        self.recorder.enabled = not offline
+        self.telemetry.persist = not offline
+        self.heatmap.persist = not offline
+        return previous
+
+    def on_show_view(self):
+        arcade.set_background_color(arcade.color.BLACK)
+        self.ui_manager.enable()
+        self.frame_start = None
+        self.play_music("music_calm")
+        self.ost_UNITED = True
+
+    def on_hide_view(self):
+        self.ui_manager.disable()
+        self.pressed_keys.clear()
+        self.mixer.stop_all()
+
+    # === СМЕНА УРОВНЕЙ ===
+
+    def start_level(self, level: int, seed: Optional[int] = None):
+        """Сбросить мир на месте и загрузить уровень level (seed - зерно генераторов, None - случайное)"""
+        # Ассеты уровня нужны сразу (ждём не дольше LEVEL_LOAD_TIMEOUT),
+        # ассеты боя догружаются в фоне до первой волны
+        self.preload_level(level)
+        ASSETS.wait("level", LEVEL_LOAD_TIMEOUT)
+
+        self.current_level = level
+        self.seed = RNG.seed(seed)
+        self.reset_world()
+        self.telemetry.start(level, self.current_user_id)
+        self.waves = [list(wave) for wave in LEVELS[level]["waves"]]
+        self.load_map()
+        session = f"level{level}_{self.telemetry.session_id}"
+        self.heatmap.start(self.map_width, self.map_height, session)
+        self.setup()
+        self.recorder.start(session, level, self.seed, self.window.get_size())
+
+    def preload_level(self, level: int):
+        """Начать фоновую загрузку карты и ассетов уровня"""
+        ASSETS.load_groups("level", "combat")
+        if level in LEVELS:
+            ASSETS.preload_level(LEVELS[level]["map"], T_SIZE)
+
+    def reset_world(self):
+        """Очистить мир, сохранив все пулы и буферы"""
+        for sprite_list in (players, buildings, bugs, good_bullet, bad_bullet):
+            sprite_list.clear()
+        self.turrets.clear()
+        self.chunks.clear()
+        self.rewind.clear()
+        self.overlay.clear()
+        self.particles.clear()
+        self.mixer.stop_all()
+
+        self.current_wave_index = 0
+        self.wave_timer = 100
+        self.game_state = "game"
+        self.pressed_keys.clear()
+        self.rote_dron = False
+        self.information_about_the_building = {}
+        self.game_time = 0.0
+        self.autosave_timer = 0.0
+        self.enemies_killed = 0
+        self.buildings_built = 0
+        self.drones_used = 0
+        self.world_camera.position = (0, 0)
+
+    def calculate_score(self) -> int:
+        """Очки уровня: жуки, волны и выработанные ресурсы (по телеметрии)"""
+        return (self.enemies_killed * SCORE_PER_KILL
+                + self.current_wave_index * SCORE_PER_WAVE
+                + self.telemetry.resources_produced() * SCORE_PER_RESOURCE)
 
     def calculate_level_stats(self):
-        # Пока score и resources_collected можно оставить заглушками
+        self.telemetry.flush()
+        self.heatmap.export()
+        self.recorder.save()
         return {
             'level_number': self.current_level,
-            'score': 0,  # можно добавить позже
+            'score': self.calculate_score(),
             'enemies_killed': self.enemies_killed,
             'time_spent': self.game_time,
             'waves_completed': self.current_wave_index,
-            'resources_collected': 0,  # заглушка
+            'resources_collected': self.telemetry.resources_produced(),
             'buildings_built': self.buildings_built,
             'drones_used': self.drones_used
         }
@@ -92,40 +249,45 @@ class MyGame(arcade.Window):
         self.game_stats.add_level_result(level_stats)
 
         # Сохраняем прогресс в БД (если есть пользователь)
-        if self.current_user_id:
+        if self.current_user_id and not self.offline:
+            # Запись идёт в фоновом потоке базы: кадр не ждёт диска
             from database import GameDatabase
-            with GameDatabase() as db:
-                db.save_level_record(self.current_user_id, level_stats)
-                db.update_player_progress(self.current_user_id, self.current_level)
-
-        # Проверяем, все ли уровни пройдены (всего 3)
-        if self.current_level < 3:
-            from menu import LevelCompleteWindow
-            win = LevelCompleteWindow(
+            db = GameDatabase.shared()
+            db.save_level_record(self.current_user_id, level_stats)
+            db.update_player_progress(self.current_user_id, self.current_level)
+
+        # Проверяем, все ли уровни пройдены
+        if self.current_level < len(LEVELS):
+            from menu import LevelCompleteView
+            # Пока игрок смотрит результаты, следующий уровень грузится в фоне
+            self.preload_level(self.current_level + 1)
+            view = LevelCompleteView(
                 level_data=level_stats,
                 user_id=self.current_user_id,
                 username=self.current_user,
                 callback=self.handle_level_complete
             )
-            win.show()
         else:
-            from menu import FinalResultsWindow
-            win = FinalResultsWindow(
+            from menu import FinalResultsView
+            view = FinalResultsView(
                 total_stats=self.game_stats.get_total_stats(),
                 user_id=self.current_user_id,
                 username=self.current_user,
                 callback=self.handle_game_complete
             )
-            win.show()
-        self.close()
+        self.window.show_view(view)
 
     def defeat(self, reason="Ядро разрушено"):
-        from menu import GameOverWindow
-        win = GameOverWindow(
+        from menu import GameOverView
+        self.preload_level(self.current_level)
+        self.telemetry.flush()
+        self.heatmap.export()
+        self.recorder.save()
+        view = GameOverView(
             level_number=self.current_level,
             reason=reason,
             stats={
-                'score': 0,
+                'score': self.calculate_score(),
                 'enemies_killed': self.enemies_killed,
                 'time_survived': self.game_time,
                 'waves_completed': self.current_wave_index
@@ -133,8 +295,7 @@ class MyGame(arcade.Window):
             user_id=self.current_user_id,
             callback=self.handle_game_over
         )
-        win.show()
-        self.close()
+        self.window.show_view(view)
 
     def handle_level_complete(self, action):
         if action == 'next_level':
@@ -142,51 +303,46 @@ class MyGame(arcade.Window):
         elif action == 'retry_level':
             self.start_new_level(self.current_level)
         elif action == 'to_menu':
-            from menu import StartMenuWindow
-            StartMenuWindow(self.width, self.height, "Заводы и Тауэр Дефенс").show()
+            self.show_menu()
 
     def handle_game_over(self, action):
         if action == 'retry_level':
             self.start_new_level(self.current_level)
         elif action == 'to_menu':
-            from menu import StartMenuWindow
-            StartMenuWindow(self.width, self.height, "Заводы и Тауэр Дефенс").show()
+            self.show_menu()
 
     def handle_game_complete(self, action):
         if action == 'new_game':
+            self.game_stats = GameStats()
             self.start_new_level(1)
         elif action == 'to_menu':
-            from menu import StartMenuWindow
-            StartMenuWindow(self.width, self.height, "Заводы и Тауэр Дефенс").show()
+            self.show_menu()
 
     def start_new_level(self, level):
-        from game import MyGame
-        game = MyGame(self.width, self.height, f"Уровень {level}")
-        game.current_level = level
-        game.current_user_id = self.current_user_id
-        game.current_user = self.current_user
-        game.setup()
-        arcade.run()
+        """Перейти на уровень level в том же окне"""
+        self.start_level(level)
+        self.window.show_view(self)
+
+    def show_menu(self):
+        from menu import StartMenuView
+        self.reset_world()
+        self.window.show_view(StartMenuView())
 
     def load_map(self):
         """
-        Загрузка карты из данных константы JSON
-
-        Логика:
-        - Использует глобальную константу JSON, загруженную из БД
-        - Создает сетку карты на основе ширины и высоты
-        - Размещает ядро в указанной позиции
-        - Устанавливает точку спавна врагов
-        - Инициализирует месторождения руд для буров
-        - Устанавливает начальные ресурсы ядра
-        """
+        Загрузка карты текущего уровня (файл из LEVELS[уровень]["map"]).
 
-        # Создаем сетку карты
-        self.map = arcade.load_tilemap(":resources:/tiled_maps/level_1.json")
+        Карта берётся из кэша компилятора уровней (level_compiler) -
+        массивы земли и руды, отображённые в память. Загрузка запускается
+        в фоне (preload_level), здесь только забираем готовый результат.
+        Клетка карты - T_SIZE пикселей.
+        """
+        self.map = ASSETS.preload_level(LEVELS[self.current_level]["map"], T_SIZE).result()
         self.map_width = self.map.width
         self.map_height = self.map.height
         self.map_width_pixels = self.map_width * T_SIZE
         self.map_height_pixels = self.map_height * T_SIZE
+        self.chunks.set_level(self.map)
 
     def setup_ui(self):
         """Создание UI элементов при инициализации"""
@@ -211,25 +367,19 @@ class MyGame(arcade.Window):
 
     def setup(self):
         """
-        Полная инициализация игры после создания окна
+        Расстановка объектов уровня после загрузки карты
 
         Порядок инициализации:
-        1. Создание игрока
-        2. Добавление ядра в список зданий
-        3. Инициализация таймеров
-        4. Установка начального состояния
-        5. Загрузка ресурсов спрайтов
-
-        Этот метод вызывается после создания окна и загрузки карты,
-        готовит игру к запуску.
+        1. Создание ядра и добавление в список зданий
+        2. Создание игрока
+
+        Вызывается из start_level после reset_world и load_map.
         """
-        self.core = Core(SPRITE_SCALE, 200, 200)
+        self.core = Core(SPRITE_SCALE, *self.map.core_position)
         buildings.append(self.core)
-        self.player = Player("Изображения\Остальное\Нгг.png", SPRITE_SCALE, self.core)
+        self.chunks.add_building(self.core)
+        self.player = Player("Изображения/Остальное/Нгг.png", SPRITE_SCALE, self.core)
         players.append(self.player)
-        self.ost = arcade.play_sound(random.choice([MUSIC_UNITED2, MUSIC_UNITED1, MUSIC_UNITED3]))
-        self.ost_UNITED = True
-        self.setup_ui()
 
     def cam(self):
         cam_x, cam_y = self.world_camera.position
@@ -288,12 +438,19 @@ class MyGame(arcade.Window):
         - Система столкновений: проверяет столкновения пуль с целями
         - Система ресурсов: управляет производством и передачей ресурсов
         """
+        self.frame_start = time.perf_counter()
+        profiler = self.profiler
+        profiler.frame()
+        profiler.begin("update")
+        self.recorder.update(self, delta_time)
+        profiler.lap("recorder")
         if self.game_state == 'game':
             self.game_time += delta_time
             self.cam()
                 # Обновление игрока
             if players:
-                self.player.update(delta_time, self.pressed_keys)
+                self.player.handle_movement(delta_time, self.pressed_keys)
+                self.player.update(delta_time)
 
             position = (
                 self.player.center_x,
@@ -304,16 +461,54 @@ class MyGame(arcade.Window):
                 position,
                 0.5,  # Плавность следования камеры
             )
-            for emitter in self.emitters:
-                emitter.update()
-            # Удаляем пустые эмиттеры
-            self.emitters = [e for e in self.emitters if e.get_count() > 0]
+            profiler.lap("player")
+            self.mixer.set_listener(*self.world_camera.position)
+            self.mixer.update(delta_time)
+            profiler.lap("audio")
+            self.update_chunks(delta_time)
+            self.turrets.update(delta_time)
+            self.play_turret_sounds()
+            profiler.lap("turrets")
+            good_bullet.update(delta_time)
+            bad_bullet.update(delta_time)
+            profiler.lap("bullets")
+            self.particles.update(delta_time)
+            profiler.lap("particles")
             self.update_waves(delta_time)
+            profiler.lap("waves")
             self.destroy_building()
             self.drone_destruction()
+            profiler.lap("destruction")
             self.bullet_b()
             self.bullet_g()
+            profiler.lap("collisions")
+            self.overlay.sync(buildings, bugs, players)
+            profiler.lap("overlay")
             self.check_game_state()
+            if not self.offline:
+                self.update_autosave(delta_time)
+            self.rewind.update(self, delta_time)
+            profiler.lap("saves")
+            self.telemetry.update(self.game_time, delta_time, len(bugs))
+            self.heatmap.update(delta_time, bugs, (sprite for sprite in players if isinstance(sprite, Drone)))
+            profiler.lap("stats")
+        profiler.end()
+
+    def update_chunks(self, delta_time: float):
+        """
+        Подгрузка чанков вокруг камеры, игрока, дронов и жуков
+        и обновление зданий в загруженных чанках (остальные спят)
+        """
+        left, bottom = self.world_camera.bottom_left
+        view = (left, bottom,
+                left + self.world_camera.viewport_width, bottom + self.world_camera.viewport_height)
+        points = [(sprite.center_x, sprite.center_y) for sprite_list in (players, bugs)
+                  for sprite in sprite_list]
+        self.chunks.update(delta_time, view, points)
+        self.profiler.lap("chunks")
+        for building in self.chunks.active_buildings():
+            building.update(delta_time)
+        self.profiler.lap("buildings")
 
     def update_waves(self, delta_time: float):
         """
@@ -338,25 +533,20 @@ class MyGame(arcade.Window):
             if bug.hp <= 0:
                 bugs.remove(bug)
 
-        if self.wave_timer <= 0:
+        if self.wave_timer <= 0 and self.current_wave_index < len(self.waves):
+            spawn_tiles = self.map.spawn_tiles
             for bug in self.waves[self.current_wave_index]:
-                if random.randint(0, 1):
-                    x = random.randint(0, self.map_width_pixels)
-                    y = 0
-                else:
-                    y = random.randint(0, self.map_height_pixels)
-                    x = 0
-                bugs.append(BAGS[bug](x, y))
-                WAVES.remove(self.current_wave_index)
+                # Клетка появления на краю карты
+                x, y = self.map.spawn_point(*RNG.waves.choice(spawn_tiles))
+                bugs.append(BAGS[bug](x, y, self.core))
+            self.current_wave_index += 1
             self.wave_timer = 100
-            arcade.stop_sound(self.ost)
-            self.ost = arcade.play_sound(random.choice([MUSIC_ATTACKS2, MUSIC_ATTACKS1, MUSIC_ATTACKS3]), volume=True)
+            self.play_music("music_attack")
             self.ost_UNITED = False
 
         if len(bugs) <= 5:
             if not self.ost_UNITED:
-                arcade.stop_sound(self.ost)
-                self.ost = arcade.play_sound(random.choice([MUSIC_UNITED2, MUSIC_UNITED1, MUSIC_UNITED3]), volume=True)
+                self.play_music("music_calm")
                 self.ost_UNITED = True
 
     def bullet_g(self):
@@ -368,10 +558,15 @@ class MyGame(arcade.Window):
                 if hit_list:
                     for i in hit_list:
                         self.create_explosion(b.center_x, b.center_y)
-                        i.take_damage(b.damage)
-                        self.enemies_killed += 1
+                        telemetry.count(telemetry.HITS)
+                        heatmap.add_event(heatmap.DAMAGE_DEALT, i.center_x, i.center_y, b.damage)
+                        # Убитым жук считается, только если попадание его добило
+                        if i.hp > 0 and i.take_damage(b.damage):
+                            self.enemies_killed += 1
+                            telemetry.count(telemetry.KILLS)
                         good_bullet.remove(b)
-                        arcade.play_sound(random.choice(HIT))
+                        self.play_hit_sound(b.center_x, b.center_y)
+                        break  # пуля попадает только в одного жука
 
 
 
@@ -385,8 +580,10 @@ class MyGame(arcade.Window):
                     for i in hit_list:
                         self.create_explosion(b.center_x, b.center_y)
                         i.take_damage(b.damage)
+                        heatmap.add_event(heatmap.DAMAGE_TAKEN, i.center_x, i.center_y, b.damage)
                         bad_bullet.remove(b)
-                        arcade.play_sound(random.choice(HIT))
+                        self.play_hit_sound(b.center_x, b.center_y)
+                        break  # пуля попадает только в одну цель
         for b in bad_bullet:
             if b.lifetime <= 0:
                 bad_bullet.remove(b)
@@ -396,24 +593,58 @@ class MyGame(arcade.Window):
                     for i in hit_list:
                         self.create_explosion(b.center_x, b.center_y)
                         i.take_damage(b.damage)
+                        heatmap.add_event(heatmap.DAMAGE_TAKEN, i.center_x, i.center_y, b.damage)
                         bad_bullet.remove(b)
-                        arcade.play_sound(random.choice(HIT))
+                        self.play_hit_sound(b.center_x, b.center_y)
+                        break  # пуля попадает только в одну цель
+
+
+    def play_music(self, key):
+        """Сменить музыку на случайный трек из группы (если она уже загружена)"""
+        tracks = ASSETS.get(key)
+        if tracks:
+            self.mixer.play_music(RNG.audio.choice(tracks))
+
+    def play_hit_sound(self, x, y):
+        """Звук попадания в точке мира (лимиты и затухание - в микшере)"""
+        sounds = ASSETS.get("hit")
+        if sounds:
+            self.mixer.play("hit", RNG.audio.choice(sounds), x, y)
+
+    def play_turret_sounds(self):
+        """Звуки выстрелов турелей, стрелявших в этом кадре"""
+        for turret in self.turrets.shots:
+            sounds = ASSETS.get(turret.shot_sound)
+            if sounds:
+                self.mixer.play("turret", RNG.audio.choice(sounds), turret.center_x, turret.center_y)
+
+    def apply_quality(self):
+        """Применение текущей ступени качества к подсистемам"""
+        settings = self.quality.settings
+        self.particles.set_limits(
+            settings["particle_burst_scale"],
+            settings["max_particles"],
+            settings["max_bursts_per_frame"]
+        )
+        self.world_target.set_scale(settings["render_scale"])
+        self.mixer.set_voice_limit(settings["sound_voices"])
 
+    def on_resize(self, width: int, height: int):
+        """Пересоздание буфера мира под новый размер окна"""
+        super().on_resize(width, height)
+        self.world_target.on_resize()
+
+    def is_on_screen(self, x, y, margin=T_SIZE):
+        """Попадает ли точка мира в область, видимую world_camera"""
+        left, bottom = self.world_camera.bottom_left
+        return (left - margin <= x <= left + self.world_camera.viewport_width + margin and
+                bottom - margin <= y <= bottom + self.world_camera.viewport_height + margin)
 
     def create_explosion(self, x, y):
-        # Основной эмиттер со звездами
-        explosion_emitter = Emitter(
-            center_xy=(x, y),
-            emit_controller=EmitBurst(30),
-            particle_factory=lambda emitter: LifetimeParticle(
-                filename_or_texture=self.star_texture,
-                change_xy=rand_in_circle((0, 0), 8.0),
-                lifetime=random.uniform(0.01, 0.2),
-                scale=random.uniform(0.1, 0.15),
-                alpha=random.randint(25, 50)
-            )
-        )
-        self.emitters.append(explosion_emitter)
+        """Взрыв от попадания пули (через общий пул частиц)"""
+        if not self.quality.settings["draw_offscreen"] and not self.is_on_screen(x, y):
+            return
+        self.particles.burst("hit", x, y)
 
 
     def on_draw(self):
@@ -445,16 +676,28 @@ class MyGame(arcade.Window):
         • batch drawing для SpriteList
         • минимальное количество draw calls
         """
+        profiler = self.profiler
+        profiler.begin("draw")
         self.clear()
-        self.world_camera.use()
-        self.ui_dr()
+        self.world_target.use(self.world_camera)
         bugs.draw()
         buildings.draw()
+        self.turrets.draw()
         if players:
             players.draw()
-        for emitter in self.emitters:
-            emitter.draw()
+        profiler.lap("draw sprites")
+        self.overlay.draw()
+        if self.quality.settings["bullet_visuals"]:
+            good_bullet.draw()
+            bad_bullet.draw()
+        self.particles.draw()
+        profiler.lap("draw effects")
+        self.world_target.finish()
+        profiler.lap("draw scale")
+        # HUD - в экранных координатах, в полном разрешении окна
         self.gui_camera.use()
+        self.ui_dr()
+        profiler.lap("draw hud")
         if self.game_state == 'pause':
             screen_width = self.world_camera.width
             screen_height = self.world_camera.height
@@ -463,9 +706,20 @@ class MyGame(arcade.Window):
                 (0, 0, 0, 180)
             )
             self.ui_manager.draw()
+        profiler.lap("draw ui")
+        profiler.draw()
+        profiler.lap("profiler")
+        profiler.end()
+
+        # Время кадра (обновление + отрисовка) для контроллера качества
+        if self.frame_start is not None:
+            frame_ms = (time.perf_counter() - self.frame_start) * 1000
+            self.telemetry.frame(frame_ms)
+            if self.quality.record(frame_ms):
+                self.apply_quality()
 
     def ui_dr(self):
-        """Обновление и отрисовки UI каждый кадр с учетом камеры"""
+        """Обновление и отрисовка UI каждый кадр (под gui_camera, в экранных координатах)"""
         # Получаем размеры окна
         window = arcade.get_window()
         screen_width = window.width
@@ -474,13 +728,9 @@ class MyGame(arcade.Window):
         # Очистка SpriteList перед обновлением
         self.resource_icons.clear()
 
-        # Вычисляем позиции относительно камеры
-        camera_left = self.world_camera.bottom_left[0]
-        camera_bottom = self.world_camera.bottom_left[1]
-
         # 1. Позиционирование таймера волны (по центру сверху экрана)
-        self.wave_timer_text.x = camera_left + screen_width // 2
-        self.wave_timer_text.y = camera_bottom + screen_height - 20
+        self.wave_timer_text.x = screen_width // 2
+        self.wave_timer_text.y = screen_height - 20
         self.wave_timer_text.text = str(int(self.wave_timer))
         self.wave_timer_text.draw()
 
@@ -494,17 +744,15 @@ class MyGame(arcade.Window):
             resources = self.information_about_the_building
 
             for i, (resource_name, amount) in enumerate(resources.items()):
-                # Вычисляем позицию в мировых координатах с учетом камеры
                 screen_y = screen_height - 60 - i * vertical_spacing
-                world_y = camera_bottom + screen_y
 
                 # Позиция для иконки (справа)
-                icon_x = camera_left + screen_width - right_margin
-                icon_y = world_y
+                icon_x = screen_width - right_margin
+                icon_y = screen_y
 
                 # Позиция для текста количества (слева от иконки)
-                text_x = camera_left + screen_width - right_margin - 40
-                text_y = world_y
+                text_x = screen_width - right_margin - 40
+                text_y = screen_y
 
                 # 1. Создание иконки ресурса
                 if resource_name in TEXTYRE:
@@ -541,9 +789,8 @@ class MyGame(arcade.Window):
         window = arcade.get_window()
         screen_width = self.world_camera.width
         screen_height = self.world_camera.height
-        # 3. Создаем менеджер UI (если еще не создан)
+        # 3. Создаем менеджер UI (включается в on_show_view)
         self.ui_manager = arcade.gui.UIManager()
-        self.ui_manager.enable()
 
         # 4. Поле для ввода (чуть выше центра)
         input_field = arcade.gui.UIInputText(
@@ -552,10 +799,11 @@ class MyGame(arcade.Window):
             text="Имя сохранения",
             font_size=18
         )
-        input_field.on_change = lambda t: self.txt(t)
+        input_field.on_change = lambda event: self.txt(event.new_value)
         input_field.center_x = screen_width // 2
         input_field.center_y = screen_height // 2 + 150
         self.ui_manager.add(input_field)
+        self.save_name_field = input_field
 
         # 5. Кнопка "Сохранить и выйти" (по центру)
         save_button = arcade.gui.UIFlatButton(
@@ -565,10 +813,20 @@ class MyGame(arcade.Window):
         )
         save_button.center_x = screen_width // 2
         save_button.center_y = screen_height // 2
-        # save_button.on_click = lambda е: save_level_to_db(self.txtt, JSON, WAVES, [players, buildings,
-        #                                                                  bugs, good_bullet, bad_bullet])
+        save_button.on_click = lambda e: self.save_and_exit()
         self.ui_manager.add(save_button)
 
+        # Кнопка "Загрузить" (справа): загружает слот с именем из поля ввода
+        load_button = arcade.gui.UIFlatButton(
+            text="ЗАГРУЗИТЬ",
+            width=180,
+            height=70
+        )
+        load_button.center_x = screen_width - 100
+        load_button.center_y = screen_height // 2
+        load_button.on_click = lambda e: self.load_game(self.txtt)
+        self.ui_manager.add(load_button)
+
         # 6. Кнопка "Вернуться" (чуть ниже)
         back_button = arcade.gui.UIFlatButton(
             text="ВЕРНУТЬСЯ",
@@ -580,9 +838,94 @@ class MyGame(arcade.Window):
         back_button.on_click = lambda e: self.check_game_state()
         self.ui_manager.add(back_button)
 
+        # 7. Слоты сохранения (слева): кнопки создаются один раз,
+        # при входе в паузу им только меняются подписи (refresh_save_slots)
+        self.save_slot_buttons = []
+        for i in range(SAVE_SLOTS_SHOWN):
+            slot_button = arcade.gui.UIFlatButton(text="", width=180, height=36)
+            slot_button.center_x = 100
+            slot_button.center_y = screen_height - 40 - i * 44
+            slot_button.visible = False
+            slot_button.on_click = lambda e, b=slot_button: self.pick_save_slot(b.text)
+            self.ui_manager.add(slot_button)
+            self.save_slot_buttons.append(slot_button)
+
+    def get_catalog(self):
+        """Каталог уровней и сохранений (level.sqlite), открывается один раз"""
+        if self.catalog is None:
+            from level_catalog import LevelCatalog
+            self.catalog = LevelCatalog()
+        return self.catalog
+
+    def refresh_save_slots(self):
+        """Подписать кнопки слотов: только метаданные из каталога, без блобов"""
+        saves = self.get_catalog().list_saves()
+        for i, slot_button in enumerate(self.save_slot_buttons):
+            slot_button.visible = i < len(saves)
+            slot_button.text = saves[i].name if i < len(saves) else ""
+
+    def pick_save_slot(self, name):
+        """Клик по слоту подставляет его имя в поле ввода"""
+        self.txtt = name
+        self.save_name_field.text = name
+
     def txt(self, t):
         self.txtt = t
 
+    # === СОХРАНЕНИЯ ===
+
+    def save_game(self, name: str):
+        """
+        Сохранить мир в слот name. В кадре делается только снимок
+        (копия значений в массивы), кодирование и запись идут в фоне.
+        Возвращает future записи.
+        """
+        from snapshot import SnapshotWriter, capture_world
+        if self.snapshot_writer is None:
+            self.snapshot_writer = SnapshotWriter()
+        return self.snapshot_writer.save(name, capture_world(self))
+
+    def save_and_exit(self):
+        name = self.txtt or AUTOSAVE_SLOT
+        self.save_game(name)
+        # Меню не ждёт записи: поток записи закончит её сам
+        self.show_menu()
+
+    def update_autosave(self, delta_time: float):
+        """Автосохранение раз в AUTOSAVE_INTERVAL секунд игры"""
+        self.autosave_timer += delta_time
+        if self.autosave_timer < AUTOSAVE_INTERVAL:
+            return
+        # Предыдущая запись ещё идёт - попробуем в следующем кадре
+        if self.snapshot_writer is not None and self.snapshot_writer.busy:
+            return
+        self.autosave_timer = 0.0
+        self.save_game(AUTOSAVE_SLOT)
+
+    def load_game(self, name: Optional[str]) -> bool:
+        """Загрузить слот name: уровень слота и мир из снимка"""
+        if not name:
+            return False
+        from snapshot import decode, restore_world
+        # Слот мог ещё записываться; кадр не ждёт дольше SNAPSHOT_WAIT_TIMEOUT
+        if self.snapshot_writer is not None and not self.snapshot_writer.wait(SNAPSHOT_WAIT_TIMEOUT):
+            print(f"Сохранение ещё записывается, попробуйте позже: {name}")
+            return False
+        data = self.get_catalog().load_slot(name)
+        if not data:
+            print(f"Сохранение не найдено: {name}")
+            return False
+        try:
+            snapshot = decode(data)
+        except ValueError as e:
+            print(f"Сохранение {name} не читается: {e}")
+            return False
+        self.start_level(snapshot.meta["level"])
+        restore_world(self, snapshot)
+        self.recorder.set_snapshot(data)
+        self.window.show_view(self)
+        return True
+
     def on_mouse_motion(self, x, y, dx, dy):
         if self.game_state == 'game':
             x1, y1 = self.world_camera.bottom_left
@@ -602,6 +945,7 @@ class MyGame(arcade.Window):
         Обработка постройки зданий, сноса зданий, создания дронов с маршрутами
         и уничтожение дронов кликом.
         """
+        self.recorder.event("mouse_press", x, y, button, modifiers)
         if self.game_state == 'game':
             #Постройка зданий
             if arcade.MOUSE_BUTTON_LEFT == button:
@@ -627,7 +971,20 @@ class MyGame(arcade.Window):
                 if e.center_x == x3 and e.center_y == y3:
                     return
             if building:
-                buildings.append(building(x3, y3))
+                if issubclass(building, MineDrill):
+                    # Бур ставится только на руду и добывает именно её
+                    ore = self.chunks.ore_at(x3, y3)
+                    if ore is None:
+                        return
+                    new_building = building(x3, y3, resource_type=ore)
+                else:
+                    new_building = building(x3, y3)
+                buildings.append(new_building)
+                if isinstance(new_building, Turret):
+                    self.turrets.add(new_building)
+                else:
+                    # Турели обновляет TurretSystem, остальные здания - чанки
+                    self.chunks.add_building(new_building)
                 self.buildings_built += 1
                 return
 
@@ -638,6 +995,10 @@ class MyGame(arcade.Window):
                     if u.max_hp != 20:
                         if u.center_x == x3 and u.center_y == y3:
                             buildings.remove(u)
+                            if isinstance(u, Turret):
+                                self.turrets.remove(u)
+                            else:
+                                self.chunks.remove_building(u)
                             for res in u.cost:
                                 u.cost[res] = int(u.cost[res] / 2)
                             return
@@ -674,9 +1035,29 @@ class MyGame(arcade.Window):
                     break
 
     def on_key_press(self, key: int, modifiers: int):
+        self.recorder.event("key_press", key, modifiers)
         self.pressed_keys.add(key)
+        if key == arcade.key.BACKSPACE and self.game_state == "game":
+            self.rewind_world(REWIND_STEP)
+        elif key == TOGGLE_KEY:
+            self.profiler.toggle()
+        elif key == TRACE_KEY:
+            path = self.profiler.dump()
+            if path:
+                print(f"Трасса кадров сохранена: {path}")
+
+    def rewind_world(self, seconds: float) -> bool:
+        """Отмотать мир на seconds секунд назад (пули и взрывы просто убираются)"""
+        if not self.rewind.rewind(self, seconds):
+            return False
+        good_bullet.clear()
+        bad_bullet.clear()
+        self.particles.clear()
+        self.rote_dron = False
+        return True
 
     def on_key_release(self, key: int, modifiers: int):
+        self.recorder.event("key_release", key, modifiers)
         if key in self.pressed_keys:
             self.pressed_keys.remove(key)
 
@@ -686,6 +1067,8 @@ class MyGame(arcade.Window):
         elif self.current_wave_index >= len(self.waves) and len(bugs) == 0:
             self.victory()
         elif arcade.key.ESCAPE in self.pressed_keys:
+            if self.game_state != "pause":
+                self.refresh_save_slots()
             self.game_state = "pause"
         else:
             self.game_state = "game"
@@ -695,6 +1078,10 @@ class MyGame(arcade.Window):
             if b.hp <= 0:
                 self.create_explosion_del(b.center_x, b.center_y)
                 buildings.remove(b)
+                if isinstance(b, Turret):
+                    self.turrets.remove(b)
+                else:
+                    self.chunks.remove_building(b)
 
     def drone_destruction(self):
         for b in players:
@@ -705,28 +1092,11 @@ class MyGame(arcade.Window):
                     b.start_respawn()
 
     def create_explosion_del(self, x, y):
-        ring_emitter = Emitter(
-            center_xy=(x, y),
-            emit_controller=EmitBurst(30),
-            particle_factory=lambda emitter: LifetimeParticle(
-                filename_or_texture=self.orb_texture,
-                change_xy=rand_on_circle((0, 0), random.uniform(0.2, 4)),
-                lifetime=random.uniform(0.1, 0.4),
-                scale=random.uniform(0.02, 0.1),
-                alpha=80
-            )
-        )
-
-
-
-
-#Тест
-def main():
-    window = MyGame(555, 555, "Заводы и Тауэр Дефенс")
-    arcade.run()
+        """Взрыв при разрушении здания (через общий пул частиц)"""
+        if not self.quality.settings["draw_offscreen"] and not self.is_on_screen(x, y):
+            return
+        self.particles.burst("ring", x, y)
 
-if __name__ == "__main__":
-    main()
 
 
 
@@ -758,4 +1128,15 @@ class GameStats:
             'total_buildings': self.total_buildings,
             'total_drones': self.total_drones,
             'level_results': self.level_results
-        }
\ No newline at end of file
+        }
+
+
+#Тест
+def main():
+    window = arcade.Window(555, 555, "Заводы и Тауэр Дефенс")
+    window.show_view(GameView.for_window(window, 1))
+    arcade.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# headless.py
+"""
+Запуск игры без дисплея: замеры (bench_simulation.py), повторы записей
+(run_replay.py) и тесты.
+
+С ARCADE_HEADLESS arcade не подключает контроллеры и не объявляет
+arcade.ControllerManager, а arcade.gui всё равно импортирует его (через
+arcade.experimental), и pyglet.input на Linux при импорте тянет
+pyglet.window.xlib, которого без дисплея нет. prepare() подгружает
+pyglet.input без платформенных бэкендов (так его импортирует сборка
+документации pyglet) и возвращает ControllerManager на место: игра
+импортируется и работает, контроллеров просто нет.
+
+Вызывать до импорта arcade.gui и game.
+"""
+import os
+import sys
+
+
+def prepare():
+    """Включить ARCADE_HEADLESS и подготовить arcade к импорту без дисплея"""
+    os.environ.setdefault("ARCADE_HEADLESS", "1")
+    import arcade
+    if not arcade.headless or hasattr(arcade, "ControllerManager"):
+        return
+    sys.is_pyglet_doc_run = True
+    try:
+        import pyglet.input
+    finally:
+        del sys.is_pyglet_doc_run
+    from arcade.controller import ControllerManager
+    arcade.ControllerManager = ControllerManager
@@ -0,0 +1,141 @@
+# heatmap.py
+"""
+Тепловые карты уровня: что и где происходило на сетке клеток.
+
+Слои (LAYERS) - массивы numpy размером с карту (строка 0 - нижний ряд):
+- bug_walk      - сколько секунд жуки провели на клетке;
+- damage_dealt  - урон, нанесённый жукам (по клетке жука);
+- damage_taken  - урон, полученный зданиями и игроком;
+- misses        - где пули турелей истекли, ни в кого не попав;
+- drone_traffic - сколько секунд дроны пролетали над клеткой.
+
+События (попадания, промахи) из боя просто дописываются в списки
+EVENTS - координаты и вес, без numpy. HeatmapRecorder раз в кадр
+разбирает их и позиции жуков и дронов пачкой: координаты -> номера
+клеток -> np.add.at по слою, по одному вызову на слой.
+
+В конце уровня карты сохраняются в HEATMAP_DIR: все слои одним .npy
+(LAYERS x высота x ширина) и по картинке .png на слой (логарифмическая
+шкала, север сверху).
+"""
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from constants import T_SIZE
+
+LAYERS = ("bug_walk", "damage_dealt", "damage_taken", "misses", "drone_traffic")
+BUG_WALK, DAMAGE_DEALT, DAMAGE_TAKEN, MISSES, DRONE_TRAFFIC = range(len(LAYERS))
+
+# Куда сохранять карты и в каких форматах
+HEATMAP_DIR = "heatmaps"
+HEATMAP_FORMATS = ("npy", "png")
+
+# Цвета картинки: от нуля к максимуму (чёрный -> красный -> жёлтый -> белый)
+HEATMAP_PALETTE = np.array([[0, 0, 0], [180, 0, 0], [255, 200, 0], [255, 255, 255]], dtype=np.float32)
+
+# События кадра по слоям: x, y, вес (см. add_event)
+EVENTS: Tuple[List[float], ...] = tuple([] for _ in LAYERS)
+
+
+def add_event(layer: int, x: float, y: float, weight: float = 1.0):
+    """Событие в точке мира (попадание, промах); разбирается в HeatmapRecorder.update"""
+    EVENTS[layer].extend((x, y, weight))
+
+
+def colorize(layer: np.ndarray) -> np.ndarray:
+    """Слой -> RGB-картинка (uint8, север сверху) в логарифмической шкале"""
+    values = np.log1p(np.maximum(layer, 0))
+    peak = values.max()
+    if peak > 0:
+        values = values / peak
+    position = values * (len(HEATMAP_PALETTE) - 1)
+    low = np.minimum(position.astype(np.int32), len(HEATMAP_PALETTE) - 2)
+    mix = (position - low)[..., None]
+    rgb = HEATMAP_PALETTE[low] * (1 - mix) + HEATMAP_PALETTE[low + 1] * mix
+    return rgb[::-1].astype(np.uint8)
+
+
+class HeatmapRecorder:
+    """Накопители по клеткам карты для одного захода на уровень"""
+
+    def __init__(self):
+        self.grid = np.zeros((len(LAYERS), 0, 0), dtype=np.float32)
+        self.session: Optional[str] = None
+        self.dirty = False  # есть ли что сохранять
+        self.persist = True  # выгружать ли карты на диск (False - только накопление)
+
+    def start(self, width: int, height: int, session: str):
+        """Новая сессия на карте width x height клеток (прошлая сохраняется, если не была)"""
+        if self.dirty:
+            self.export()
+        if self.grid.shape[1:] == (height, width):
+            self.grid.fill(0)
+        else:
+            self.grid = np.zeros((len(LAYERS), height, width), dtype=np.float32)
+        for events in EVENTS:
+            events.clear()
+        self.session = session
+        self.dirty = False
+
+    # === ЗАПИСЬ ===
+
+    def add_points(self, layer: int, xy: np.ndarray, weights):
+        """Прибавить веса в клетки точек xy (N x 2, пиксели мира); точки вне карты отбрасываются"""
+        if not len(xy):
+            return
+        _, height, width = self.grid.shape
+        tiles = np.floor_divide(xy, T_SIZE).astype(np.intp)
+        inside = ((tiles[:, 0] >= 0) & (tiles[:, 0] < width)
+                  & (tiles[:, 1] >= 0) & (tiles[:, 1] < height))
+        if not inside.all():
+            tiles = tiles[inside]
+            if np.ndim(weights):
+                weights = weights[inside]
+        np.add.at(self.grid[layer], (tiles[:, 1], tiles[:, 0]), weights)
+        self.dirty = True
+
+    def add_sprites(self, layer: int, sprites: Iterable, weight: float):
+        """Прибавить weight в клетки, где стоят спрайты"""
+        xy = np.array([sprite.position for sprite in sprites], dtype=np.float32).reshape(-1, 2)
+        self.add_points(layer, xy, weight)
+
+    def update(self, delta_time: float, bugs: Iterable, drones: Iterable):
+        """Раз в кадр: позиции жуков и дронов и накопившиеся события"""
+        if not self.grid.size:
+            return
+        self.add_sprites(BUG_WALK, bugs, delta_time)
+        self.add_sprites(DRONE_TRAFFIC, drones, delta_time)
+        for layer, events in enumerate(EVENTS):
+            if events:
+                table = np.array(events, dtype=np.float32).reshape(-1, 3)
+                events.clear()
+                self.add_points(layer, table[:, :2], table[:, 2])
+
+    # === ВЫГРУЗКА ===
+
+    def layers(self) -> Dict[str, np.ndarray]:
+        return {name: self.grid[i] for i, name in enumerate(LAYERS)}
+
+    def export(self, directory: str = HEATMAP_DIR, formats: Tuple[str, ...] = HEATMAP_FORMATS) -> List[str]:
+        """Сохранить карты сессии; возвращает пути файлов"""
+        if self.session is None or not self.grid.size:
+            return []
+        if not self.persist:
+            self.dirty = False
+            return []
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.session)
+        paths = []
+        if "npy" in formats:
+            np.save(base + ".npy", self.grid)
+            paths.append(base + ".npy")
+        if "png" in formats:
+            from PIL import Image
+            for name, layer in self.layers().items():
+                path = f"{base}_{name}.png"
+                Image.fromarray(colorize(layer), "RGB").save(path)
+                paths.append(path)
+        self.dirty = False
+        return paths
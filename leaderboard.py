@@ -0,0 +1,368 @@
+# leaderboard.py
+"""
+Таблицы рекордов (лидерборды) в game_database.db.
+
+Раньше топ строился запросом ORDER BY score DESC, time_spent ASC по
+таблицам рекордов, а «какое у меня место» без полной сортировки узнать
+было нельзя. Теперь лидерборд - отдельная таблица, которая обновляется
+при каждой записи рекорда (submit_score, в потоке записи базы):
+- leaderboard - по строке на игрока в каждом рейтинге (0 - общий,
+  1..3 - уровни), только лучший результат. Первичный ключ
+  (board, neg_score, tiebreak, user_id) - это и есть порядок мест,
+  таблица WITHOUT ROWID хранится прямо в этом порядке, поэтому топ
+  и страницы читаются подряд, без сортировки;
+- leaderboard_buckets - гистограмма: сколько записей в каждой корзине
+  по LEADERBOARD_BUCKET очков. Место игрока = записи в лучших корзинах
+  (сумма по гистограмме) + записи выше него в его корзине (короткий
+  проход по индексу);
+- leaderboard_blocks - второй уровень гистограммы: сумма по блокам из
+  LEADERBOARD_BLOCK корзин. Суммы и поиск места идут по блокам и по
+  корзинам одного блока, а не по всем корзинам рейтинга.
+
+neg_score = -очки: чем больше очков, тем меньше ключ и выше место.
+tiebreak - кто выше при равных очках (меньше - выше): время прохождения
+уровня или момент рекорда в общем рейтинге.
+
+Страницы - по ключу (keyset): следующая страница начинается строго после
+последней строки предыдущей, без OFFSET по всей таблице.
+"""
+import sqlite3
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+# Рейтинг 0 - общий (global_records), 1..N - по уровням
+GLOBAL_BOARD = 0
+
+# Ширина корзины гистограммы (очков)
+LEADERBOARD_BUCKET = 16
+
+# Корзин в блоке второго уровня гистограммы
+LEADERBOARD_BLOCK = 64
+
+# Размер страницы по умолчанию
+PAGE_SIZE = 10
+
+# Ключ места: (neg_score, tiebreak, user_id)
+RankKey = Tuple[int, float, int]
+
+
+class LeaderboardEntry(NamedTuple):
+    """Строка рейтинга"""
+    rank: int
+    user_id: int
+    username: Optional[str]
+    score: int
+    tiebreak: float
+    extra: float  # уровень: время прохождения, общий рейтинг: пройдено уровней
+    date_achieved: str
+
+    @property
+    def key(self) -> RankKey:
+        return -self.score, self.tiebreak, self.user_id
+
+
+def bucket_of(neg_score: int) -> int:
+    # Деление с округлением вниз (в SQL целое деление отрицательных округляет к нулю)
+    return neg_score // LEADERBOARD_BUCKET
+
+
+def block_of(bucket: int) -> int:
+    return bucket // LEADERBOARD_BLOCK
+
+
+def julian_now() -> float:
+    """Текущий момент в юлианских днях - как julianday() в SQLite (tiebreak общего рейтинга)"""
+    return time.time() / 86400.0 + 2440587.5
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS leaderboard (
+            board INTEGER NOT NULL,
+            neg_score INTEGER NOT NULL,
+            tiebreak REAL NOT NULL,
+            user_id INTEGER NOT NULL,
+            extra REAL NOT NULL DEFAULT 0,
+            date_achieved TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (board, neg_score, tiebreak, user_id)
+        ) WITHOUT ROWID
+    ''')
+    # Запись игрока в рейтинге; в таблице WITHOUT ROWID индекс хранит
+    # и весь первичный ключ, так что место игрока читается только из индекса
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_leaderboard_user
+        ON leaderboard(board, user_id)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS leaderboard_buckets (
+            board INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            entries INTEGER NOT NULL,
+            PRIMARY KEY (board, bucket)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS leaderboard_blocks (
+            board INTEGER NOT NULL,
+            block INTEGER NOT NULL,
+            entries INTEGER NOT NULL,
+            PRIMARY KEY (board, block)
+        ) WITHOUT ROWID
+    ''')
+
+
+def rebuild(cursor: sqlite3.Cursor):
+    """Собрать рейтинги заново из level_records и global_records (при переходе схемы)"""
+    cursor.execute("DELETE FROM leaderboard")
+    cursor.execute("DELETE FROM leaderboard_buckets")
+    # Лучший результат игрока: меньший ключ (больше очков, потом меньше tiebreak)
+    cursor.execute('''
+        INSERT INTO leaderboard (board, neg_score, tiebreak, user_id, extra, date_achieved)
+        SELECT level_number, -score, time_spent, user_id, time_spent, date_achieved
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY user_id, level_number ORDER BY score DESC, time_spent ASC
+            ) AS place
+            FROM level_records WHERE user_id IS NOT NULL
+        ) WHERE place = 1
+    ''')
+    cursor.execute('''
+        INSERT INTO leaderboard (board, neg_score, tiebreak, user_id, extra, date_achieved)
+        SELECT ?, -total_score, julianday(date_achieved), user_id, levels_completed, date_achieved
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY total_score DESC, date_achieved ASC
+            ) AS place
+            FROM global_records WHERE user_id IS NOT NULL
+        ) WHERE place = 1
+    ''', (GLOBAL_BOARD,))
+    rebuild_buckets(cursor)
+
+
+def rebuild_buckets(cursor: sqlite3.Cursor):
+    """Пересчитать гистограмму (оба уровня) по таблице рейтингов"""
+    cursor.execute("DELETE FROM leaderboard_buckets")
+    cursor.execute("DELETE FROM leaderboard_blocks")
+    # Округление вниз для отрицательных: (x - (W - 1)) / W
+    cursor.execute('''
+        INSERT INTO leaderboard_buckets (board, bucket, entries)
+        SELECT board, bucket, COUNT(*) FROM (
+            SELECT board,
+                   CASE WHEN neg_score >= 0 THEN neg_score / :width
+                        ELSE (neg_score - (:width - 1)) / :width END AS bucket
+            FROM leaderboard
+        ) GROUP BY board, bucket
+    ''', {"width": LEADERBOARD_BUCKET})
+    cursor.execute('''
+        INSERT INTO leaderboard_blocks (board, block, entries)
+        SELECT board,
+               CASE WHEN bucket >= 0 THEN bucket / :width
+                    ELSE (bucket - (:width - 1)) / :width END AS block,
+               SUM(entries)
+        FROM leaderboard_buckets GROUP BY board, block
+    ''', {"width": LEADERBOARD_BLOCK})
+
+
+def count_entry(cursor: sqlite3.Cursor, board: int, neg_score: int, delta: int):
+    """Учесть в обоих уровнях гистограммы новую запись (delta=1) или удалённую (-1)"""
+    bucket = bucket_of(neg_score)
+    cursor.execute('''
+        INSERT INTO leaderboard_buckets (board, bucket, entries) VALUES (?, ?, ?)
+        ON CONFLICT(board, bucket) DO UPDATE SET entries = entries + excluded.entries
+    ''', (board, bucket, delta))
+    cursor.execute('''
+        INSERT INTO leaderboard_blocks (board, block, entries) VALUES (?, ?, ?)
+        ON CONFLICT(board, block) DO UPDATE SET entries = entries + excluded.entries
+    ''', (board, block_of(bucket), delta))
+
+
+def submit_score(cursor: sqlite3.Cursor, board: int, user_id: int, score: int,
+                 tiebreak: float, extra: float = 0) -> bool:
+    """
+    Учесть результат игрока (в транзакции записи).
+    Рейтинг меняется, только если результат лучше прежнего. Возвращает, изменился ли.
+    """
+    new_key = (-int(score), float(tiebreak))
+    old = cursor.execute(
+        "SELECT neg_score, tiebreak FROM leaderboard WHERE board = ? AND user_id = ?",
+        (board, user_id)
+    ).fetchone()
+    if old is not None:
+        if tuple(old) <= new_key:
+            return False
+        cursor.execute("DELETE FROM leaderboard WHERE board = ? AND user_id = ?", (board, user_id))
+        count_entry(cursor, board, old[0], -1)
+
+    cursor.execute('''
+        INSERT INTO leaderboard (board, neg_score, tiebreak, user_id, extra)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (board, new_key[0], new_key[1], user_id, extra))
+    count_entry(cursor, board, new_key[0], 1)
+    return True
+
+
+def reach(counts: List[Tuple[int, int]], rank: int, passed: int) -> Tuple[Optional[int], int]:
+    """
+    counts - (номер, записей) по порядку мест, passed - записей до первого.
+    Первый номер, на котором накопленное число записей доходит до rank,
+    и сколько записей до него (None - rank дальше конца)
+    """
+    for number, entries in counts:
+        if passed + entries >= rank:
+            return number, passed
+        passed += entries
+    return None, passed
+
+
+class Leaderboard:
+    """Чтение рейтингов: топ, место игрока, страницы"""
+
+    ENTRY_COLUMNS = '''
+        lb.user_id, u.username, -lb.neg_score, lb.tiebreak, lb.extra, lb.date_achieved
+        FROM leaderboard lb
+        LEFT JOIN users u ON u.user_id = lb.user_id
+    '''
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.cursor = connection.cursor()
+
+    def _entries(self, rows, first_rank: int) -> List[LeaderboardEntry]:
+        return [LeaderboardEntry(first_rank + i, *row) for i, row in enumerate(rows)]
+
+    def top(self, board: int, limit: int = PAGE_SIZE) -> List[LeaderboardEntry]:
+        """Первые limit мест"""
+        self.cursor.execute(f'''
+            SELECT {self.ENTRY_COLUMNS}
+            WHERE lb.board = ?
+            ORDER BY lb.neg_score, lb.tiebreak, lb.user_id
+            LIMIT ?
+        ''', (board, limit))
+        return self._entries(self.cursor.fetchall(), 1)
+
+    def key_of(self, board: int, user_id: int) -> Optional[RankKey]:
+        row = self.cursor.execute(
+            "SELECT neg_score, tiebreak, user_id FROM leaderboard WHERE board = ? AND user_id = ?",
+            (board, user_id)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def rank_of_key(self, board: int, key: RankKey) -> int:
+        """
+        Место записи с ключом key: блоки выше, корзины выше в своём блоке
+        и записи выше в своей корзине
+        """
+        bucket = bucket_of(key[0])
+        block = block_of(bucket)
+        better = self.cursor.execute('''
+            SELECT (SELECT COALESCE(SUM(entries), 0) FROM leaderboard_blocks
+                    WHERE board = :board AND block < :block)
+                 + (SELECT COALESCE(SUM(entries), 0) FROM leaderboard_buckets
+                    WHERE board = :board AND bucket >= :first AND bucket < :bucket)
+        ''', {"board": board, "block": block, "first": block * LEADERBOARD_BLOCK,
+              "bucket": bucket}).fetchone()[0]
+        in_bucket = self.cursor.execute('''
+            SELECT COUNT(*) FROM leaderboard
+            WHERE board = ? AND neg_score >= ?
+              AND (neg_score, tiebreak, user_id) < (?, ?, ?)
+        ''', (board, bucket * LEADERBOARD_BUCKET, *key)).fetchone()[0]
+        return better + in_bucket + 1
+
+    def rank_of(self, board: int, user_id: int) -> Optional[int]:
+        """Место игрока в рейтинге (None - результата нет)"""
+        key = self.key_of(board, user_id)
+        return None if key is None else self.rank_of_key(board, key)
+
+    def size(self, board: int) -> int:
+        return self.cursor.execute(
+            "SELECT COALESCE(SUM(entries), 0) FROM leaderboard_blocks WHERE board = ?", (board,)
+        ).fetchone()[0]
+
+    def page_after(self, board: int, key: Optional[RankKey], limit: int = PAGE_SIZE,
+                   first_rank: Optional[int] = None) -> List[LeaderboardEntry]:
+        """
+        Страница после записи с ключом key (None - с первого места).
+        first_rank - место первой строки, если известно (например, key последней
+        строки прошлой страницы и её место + 1), иначе считается по гистограмме.
+        """
+        if key is None:
+            return self.top(board, limit)
+        self.cursor.execute(f'''
+            SELECT {self.ENTRY_COLUMNS}
+            WHERE lb.board = ? AND (lb.neg_score, lb.tiebreak, lb.user_id) > (?, ?, ?)
+            ORDER BY lb.neg_score, lb.tiebreak, lb.user_id
+            LIMIT ?
+        ''', (board, *key, limit))
+        rows = self.cursor.fetchall()
+        if first_rank is None:
+            first_rank = self.rank_of_key(board, key) + 1
+        return self._entries(rows, first_rank)
+
+    def page_before(self, board: int, key: RankKey, limit: int = PAGE_SIZE,
+                    key_rank: Optional[int] = None) -> List[LeaderboardEntry]:
+        """Страница перед записью с ключом key (по возрастанию мест); key_rank - её место, если известно"""
+        self.cursor.execute(f'''
+            SELECT {self.ENTRY_COLUMNS}
+            WHERE lb.board = ? AND (lb.neg_score, lb.tiebreak, lb.user_id) < (?, ?, ?)
+            ORDER BY lb.neg_score DESC, lb.tiebreak DESC, lb.user_id DESC
+            LIMIT ?
+        ''', (board, *key, limit))
+        rows = self.cursor.fetchall()[::-1]
+        if key_rank is None:
+            key_rank = self.rank_of_key(board, key)
+        return self._entries(rows, key_rank - len(rows))
+
+    def around(self, board: int, user_id: int, before: int = 4, after: int = 5) -> List[LeaderboardEntry]:
+        """Игрок и соседи по рейтингу"""
+        key = self.key_of(board, user_id)
+        if key is None:
+            return []
+        rank = self.rank_of_key(board, key)
+        upper = self.page_before(board, key, before, rank) if before else []
+        # Сам игрок и after строк после него
+        self.cursor.execute(f'''
+            SELECT {self.ENTRY_COLUMNS}
+            WHERE lb.board = ? AND (lb.neg_score, lb.tiebreak, lb.user_id) >= (?, ?, ?)
+            ORDER BY lb.neg_score, lb.tiebreak, lb.user_id
+            LIMIT ?
+        ''', (board, *key, after + 1))
+        return upper + self._entries(self.cursor.fetchall(), rank)
+
+    def page_at_rank(self, board: int, rank: int, limit: int = PAGE_SIZE) -> List[LeaderboardEntry]:
+        """
+        Страница, начиная с места rank: блок и корзина находятся по
+        гистограмме, OFFSET - только внутри корзины
+        """
+        if rank <= 1:
+            return self.top(board, limit)
+        # Первый блок, в котором накопленное число записей доходит до rank,
+        # затем такая же корзина внутри него
+        blocks = self.cursor.execute(
+            "SELECT block, entries FROM leaderboard_blocks WHERE board = ? ORDER BY block", (board,)
+        ).fetchall()
+        start_block, skipped = reach(blocks, rank, 0)
+        if start_block is None:
+            return []
+        first = start_block * LEADERBOARD_BLOCK
+        buckets = self.cursor.execute('''
+            SELECT bucket, entries FROM leaderboard_buckets
+            WHERE board = ? AND bucket >= ? AND bucket < ? ORDER BY bucket
+        ''', (board, first, first + LEADERBOARD_BLOCK)).fetchall()
+        start_bucket, skipped = reach(buckets, rank, skipped)
+        if start_bucket is None:
+            return []
+        # Пропуск OFFSET - по ключу места (только первичный ключ), имена - для строк страницы
+        start = self.cursor.execute('''
+            SELECT neg_score, tiebreak, user_id FROM leaderboard
+            WHERE board = ? AND neg_score >= ?
+            ORDER BY neg_score, tiebreak, user_id
+            LIMIT 1 OFFSET ?
+        ''', (board, start_bucket * LEADERBOARD_BUCKET, rank - 1 - skipped)).fetchone()
+        if start is None:
+            return []
+        self.cursor.execute(f'''
+            SELECT {self.ENTRY_COLUMNS}
+            WHERE lb.board = ? AND (lb.neg_score, lb.tiebreak, lb.user_id) >= (?, ?, ?)
+            ORDER BY lb.neg_score, lb.tiebreak, lb.user_id
+            LIMIT ?
+        ''', (board, *start, limit))
+        return self._entries(self.cursor.fetchall(), rank)
@@ -0,0 +1,267 @@
+# level_catalog.py
+"""
+Каталог уровней и сохранений в level.sqlite.
+
+Раньше в файле была одна таблица levels, где рядом с именем и волнами
+лежали BLOB с картой и состоянием мира - любой список уровней читал и
+блобы. Теперь метаданные и данные разделены:
+- catalog - одна строка на уровень или сохранение: вид ("level"/"save"),
+  имя, номер уровня, дата создания, размер и контрольная сумма данных,
+  волны уровня. Список слотов - это чтение по индексу, без блобов;
+- blobs - сами данные (карта, снимок мира), строка с тем же entry_id.
+
+Блобы читаются и пишутся по частям через sqlite3 blob I/O (blobopen) и
+только тогда, когда уровень или сохранение действительно открывают.
+
+База работает в режиме incremental auto-vacuum: после удаления слотов
+свободные страницы возвращаются файлу понемногу (compact), и файл не
+разрастается, как раньше (3 занятых страницы из 809).
+
+При первом открытии старая таблица levels переносится в каталог
+и удаляется, а файл один раз пересобирается (VACUUM).
+
+Запуск:
+    python level_catalog.py              # список уровней и сохранений
+    python level_catalog.py compact      # вернуть свободные страницы
+"""
+import hashlib
+import sqlite3
+import sys
+from typing import List, NamedTuple, Optional
+
+LEVEL_DB = "level.sqlite"
+
+# Блобы пишутся и читаются порциями такого размера
+BLOB_CHUNK = 64 * 1024
+
+# compact() освобождает страницы, только если их набралось столько
+COMPACT_MIN_FREE_PAGES = 16
+
+
+class CatalogEntry(NamedTuple):
+    """Строка каталога (без данных)"""
+    entry_id: int
+    kind: str
+    name: str
+    level_number: Optional[int]
+    created: str
+    size: int
+    checksum: str
+    waves: Optional[str]
+
+
+def checksum(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class LevelCatalog:
+    """Каталог уровней и слотов сохранения в level.sqlite"""
+
+    def __init__(self, db_name: Optional[str] = None):
+        # LEVEL_DB читается при вызове: замеры и тесты подставляют временный файл
+        db_name = db_name or LEVEL_DB
+        self.db_name = db_name
+        self.connection = sqlite3.connect(db_name)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.cursor = self.connection.cursor()
+        self.create_tables()
+
+    def create_tables(self):
+        """Схема каталога, перенос старой таблицы и включение auto-vacuum"""
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog (
+                entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                level_number INTEGER,
+                created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                size INTEGER NOT NULL DEFAULT 0,
+                checksum TEXT NOT NULL DEFAULT '',
+                waves TEXT,
+                UNIQUE(kind, name)
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_catalog_kind_created
+            ON catalog(kind, created DESC)
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                entry_id INTEGER PRIMARY KEY
+                    REFERENCES catalog(entry_id) ON DELETE CASCADE,
+                data BLOB NOT NULL
+            )
+        ''')
+        self.connection.commit()
+
+        migrated = self._migrate_legacy()
+        mode = self.cursor.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != 2 or migrated:
+            # Режим auto_vacuum меняется только вместе с пересборкой файла
+            self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.cursor.execute("VACUUM")
+
+    def _migrate_legacy(self) -> bool:
+        """Перенести старую таблицу levels (name, voln, json, players_bugs_buildings)"""
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'levels'"
+        ).fetchone()
+        if not exists:
+            return False
+        rows = self.cursor.execute(
+            "SELECT name, voln, json, players_bugs_buildings FROM levels"
+        ).fetchall()
+        for name, waves, map_data, world in rows:
+            number = int(name) if str(name).isdigit() else None
+            self.put("level", str(name), map_data or b"", level_number=number, waves=waves, commit=False)
+            if world:
+                self.put("save", str(name), world, level_number=number, commit=False)
+        self.cursor.execute("DROP TABLE levels")
+        self.connection.commit()
+        return True
+
+    # === СПИСКИ (только метаданные) ===
+
+    def list_entries(self, kind: str) -> List[CatalogEntry]:
+        """Уровни или сохранения, новые первыми (блобы не читаются)"""
+        self.cursor.execute('''
+            SELECT entry_id, kind, name, level_number, created, size, checksum, waves
+            FROM catalog WHERE kind = ?
+            ORDER BY created DESC, entry_id DESC
+        ''', (kind,))
+        return [CatalogEntry(*row) for row in self.cursor.fetchall()]
+
+    def list_levels(self) -> List[CatalogEntry]:
+        return self.list_entries("level")
+
+    def list_saves(self) -> List[CatalogEntry]:
+        return self.list_entries("save")
+
+    def find(self, kind: str, name: str) -> Optional[CatalogEntry]:
+        self.cursor.execute('''
+            SELECT entry_id, kind, name, level_number, created, size, checksum, waves
+            FROM catalog WHERE kind = ? AND name = ?
+        ''', (kind, name))
+        row = self.cursor.fetchone()
+        return CatalogEntry(*row) if row else None
+
+    # === ЗАПИСЬ ===
+
+    def put(self, kind: str, name: str, data: bytes, level_number: Optional[int] = None,
+            waves: Optional[str] = None, commit: bool = True) -> int:
+        """
+        Записать уровень или сохранение (существующее с тем же именем заменяется).
+        Данные пишутся в блоб по частям. Возвращает entry_id.
+        """
+        self.cursor.execute('''
+            INSERT INTO catalog (kind, name, level_number, size, checksum, waves)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(kind, name) DO UPDATE SET
+                level_number = excluded.level_number,
+                created = CURRENT_TIMESTAMP,
+                size = excluded.size,
+                checksum = excluded.checksum,
+                waves = excluded.waves
+        ''', (kind, name, level_number, len(data), checksum(data), waves))
+        entry_id = self.cursor.execute(
+            "SELECT entry_id FROM catalog WHERE kind = ? AND name = ?", (kind, name)
+        ).fetchone()[0]
+
+        # Место под блоб выделяется zeroblob, содержимое дописывается порциями
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO blobs (entry_id, data) VALUES (?, zeroblob(?))",
+            (entry_id, len(data))
+        )
+        if data:
+            with self.connection.blobopen("blobs", "data", entry_id) as blob:
+                view = memoryview(data)
+                for start in range(0, len(data), BLOB_CHUNK):
+                    blob.write(view[start:start + BLOB_CHUNK])
+        if commit:
+            self.connection.commit()
+        return entry_id
+
+    def save_slot(self, name: str, data: bytes, level_number: Optional[int] = None) -> int:
+        """Записать слот сохранения"""
+        return self.put("save", name, data, level_number=level_number)
+
+    def delete(self, kind: str, name: str) -> bool:
+        """Удалить уровень или сохранение (блоб удаляется каскадом)"""
+        self.cursor.execute("DELETE FROM catalog WHERE kind = ? AND name = ?", (kind, name))
+        self.connection.commit()
+        deleted = self.cursor.rowcount > 0
+        if deleted:
+            self.compact()
+        return deleted
+
+    def compact(self, min_free_pages: int = COMPACT_MIN_FREE_PAGES) -> int:
+        """Вернуть файлу свободные страницы (incremental vacuum). Возвращает их число"""
+        free = self.cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        if free < min_free_pages:
+            return 0
+        # execute() делает только один шаг прагмы (одна страница за шаг),
+        # executescript() выполняет её до конца
+        self.connection.executescript("PRAGMA incremental_vacuum;")
+        return free
+
+    # === ЧТЕНИЕ ДАННЫХ ===
+
+    def open_blob(self, entry_id: int):
+        """Блоб записи для чтения по частям (read/seek, как файл)"""
+        return self.connection.blobopen("blobs", "data", entry_id, readonly=True)
+
+    def read(self, kind: str, name: str) -> Optional[bytes]:
+        """Данные уровня или сохранения (с проверкой контрольной суммы)"""
+        entry = self.find(kind, name)
+        if entry is None:
+            return None
+        if entry.size == 0:
+            return b""
+        parts = []
+        with self.open_blob(entry.entry_id) as blob:
+            while True:
+                part = blob.read(BLOB_CHUNK)
+                if not part:
+                    break
+                parts.append(part)
+        data = b"".join(parts)
+        if checksum(data) != entry.checksum:
+            print(f"Контрольная сумма не совпала: {kind} {name}")
+            return None
+        return data
+
+    def load_slot(self, name: str) -> Optional[bytes]:
+        """Данные слота сохранения"""
+        return self.read("save", name)
+
+    # === ЗАКРЫТИЕ ===
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else "list"
+    with LevelCatalog() as catalog:
+        if command == "compact":
+            print(f"Освобождено страниц: {catalog.compact(min_free_pages=1)}")
+            return 0
+        if command != "list":
+            print(f"Неизвестная команда: {command} (list, compact)")
+            return 1
+        for kind in ("level", "save"):
+            for entry in catalog.list_entries(kind):
+                print(f"{entry.kind:5} {entry.name:20} уровень {entry.level_number}  "
+                      f"{entry.size:8} байт  {entry.created}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,313 @@
+# level_compiler.py
+"""
+Компилятор уровней: карта Tiled (level_N.json) -> компактные массивы NumPy.
+
+Слои карты хранятся в JSON как base64 + zlib, и разбирать их при каждой
+загрузке уровня незачем. Компилятор один раз декодирует карту в массив
+tiles формы (2, высота, ширина), uint16:
+- tiles[0] - тайл земли (gid из слоя "Земля", 0 - пусто);
+- tiles[1] - руда в клетке (индекс в ORE_TYPES, 0 - нет руды).
+Строка 0 массива - нижний ряд карты (как ось y в arcade).
+
+Свойства карты (необязательные, см. map_generator.py):
+- core_x, core_y - клетка ядра (core_y считается снизу);
+- spawn_edges - края появления жуков через запятую (left,right,bottom,top).
+
+Результат кладётся в level_cache/:
+- <имя>.npy  - массив tiles (читается через np.load(mmap_mode="r"));
+- <имя>.json - размеры, позиция ядра, клетки появления жуков и хэш
+  исходного файла. Если хэш не совпал (карту поменяли), уровень
+  компилируется заново. Хэш пересчитывается, только когда у исходного
+  файла изменились размер или время изменения.
+
+Загрузка уровня из кэша - это одно отображение файла в память и чтение
+маленького JSON, её время не зависит от размера исходной карты.
+
+Если уровни упакованы в пак ассетов (asset_pack.py), массив читается
+прямо из пака (np.frombuffer поверх mmap, без копирования). Пока исходная
+карта лежит рядом, пак проверяется по ней так же, как обычный кэш.
+
+Запуск из командной строки компилирует все уровни из LEVELS:
+    python level_compiler.py
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+LEVEL_CACHE_DIR = "level_cache"
+
+# Версия формата кэша: при изменении компилятора старый кэш пересобирается
+COMPILER_VERSION = 2
+
+# Слой земли и слои руды в картах Tiled
+GROUND_LAYER = "Земля"
+ORE_TYPES = ["", "Медь", "Олово", "Уголь"]  # индекс 0 - руды нет
+
+# Флаги отражения тайла в старших битах gid (их отбрасываем)
+GID_MASK = 0x1FFFFFFF
+
+# Клетка ядра по умолчанию (если в карте нет свойств core_x / core_y)
+DEFAULT_CORE_TILE = (2, 2)
+
+# Края, откуда появляются жуки (если в карте нет свойства spawn_edges)
+DEFAULT_SPAWN_EDGES = ["left", "bottom"]
+
+
+class CompiledLevel:
+    """Скомпилированный уровень: массивы клеток и метаданные"""
+
+    def __init__(self, tiles: np.ndarray, meta: Dict, tile_size: int):
+        """
+        tiles: массив (2, высота, ширина) - земля и руда
+        meta: метаданные из JSON кэша
+        tile_size: размер клетки в пикселях мира (T_SIZE)
+        """
+        self.tiles = tiles
+        self.ground = tiles[0]
+        self.ore = tiles[1]
+        self.meta = meta
+        self.tile_size = tile_size
+        self.height, self.width = self.ground.shape
+
+    @property
+    def width_pixels(self) -> int:
+        return self.width * self.tile_size
+
+    @property
+    def height_pixels(self) -> int:
+        return self.height * self.tile_size
+
+    def tile_of(self, x: float, y: float) -> Optional[Tuple[int, int]]:
+        """Клетка (столбец, строка) для точки мира или None за картой"""
+        column = int(x // self.tile_size)
+        row = int(y // self.tile_size)
+        if 0 <= column < self.width and 0 <= row < self.height:
+            return column, row
+        return None
+
+    def tile_center(self, column: int, row: int) -> Tuple[int, int]:
+        """Центр клетки в пикселях мира"""
+        return (column * self.tile_size + self.tile_size // 2,
+                row * self.tile_size + self.tile_size // 2)
+
+    def ore_at(self, x: float, y: float) -> Optional[str]:
+        """Руда под точкой мира (название ресурса) или None - за O(1)"""
+        tile = self.tile_of(x, y)
+        if tile is None:
+            return None
+        ore = int(self.ore[tile[1], tile[0]])
+        return ORE_TYPES[ore] if ore else None
+
+    @property
+    def core_position(self) -> Tuple[int, int]:
+        """Центр клетки ядра в пикселях мира"""
+        return self.tile_center(*self.meta["core"])
+
+    @property
+    def spawn_tiles(self) -> List[Tuple[int, int]]:
+        """Клетки на краях карты, откуда появляются жуки"""
+        return [tuple(tile) for tile in self.meta["spawn"]]
+
+    def spawn_point(self, column: int, row: int) -> Tuple[int, int]:
+        """Точка появления жука для краевой клетки: центр клетки, прижатый к краю карты"""
+        x, y = self.tile_center(column, row)
+        if column == 0:
+            x = 0
+        elif column == self.width - 1:
+            x = self.width_pixels
+        elif row == 0:
+            y = 0
+        elif row == self.height - 1:
+            y = self.height_pixels
+        return x, y
+
+
+# === КОМПИЛЯЦИЯ ===
+
+def source_stat(path: str) -> List[int]:
+    """Размер и время изменения исходного файла (быстрая проверка кэша)"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def source_hash(path: str) -> str:
+    """Хэш исходного файла карты (вместе с версией компилятора)"""
+    digest = hashlib.sha1(f"v{COMPILER_VERSION}".encode())
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def decode_layer(layer: Dict, width: int, height: int) -> np.ndarray:
+    """Данные слоя Tiled -> массив gid (высота, ширина), строка 0 - низ карты"""
+    data = layer["data"]
+    if layer.get("encoding") == "base64":
+        raw = base64.b64decode(data)
+        compression = layer.get("compression", "")
+        if compression == "zlib":
+            raw = zlib.decompress(raw)
+        elif compression == "gzip":
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f"Неподдерживаемое сжатие слоя: {compression}")
+        gids = np.frombuffer(raw, dtype="<u4")
+    else:
+        gids = np.asarray(data, dtype=np.uint32)
+    gids = (gids & GID_MASK).reshape(height, width)
+    # В Tiled строка 0 - верх карты, в arcade ось y направлена вверх
+    return np.flipud(gids)
+
+
+def find_spawn_tiles(ground: np.ndarray, edges: List[str] = DEFAULT_SPAWN_EDGES) -> List[List[int]]:
+    """Клетки земли на заданных краях карты (left, right, bottom, top)"""
+    height, width = ground.shape
+    tiles = set()
+    for edge in edges:
+        if edge in ("left", "right"):
+            column = 0 if edge == "left" else width - 1
+            tiles |= {(column, int(row)) for row in np.nonzero(ground[:, column])[0]}
+        elif edge in ("bottom", "top"):
+            row = 0 if edge == "bottom" else height - 1
+            tiles |= {(int(column), row) for column in np.nonzero(ground[row, :])[0]}
+        else:
+            raise ValueError(f"Неизвестный край карты: {edge}")
+    return [list(tile) for tile in sorted(tiles)]
+
+
+def compile_map(path: str) -> Tuple[np.ndarray, Dict]:
+    """Декодировать карту Tiled в массив tiles и метаданные"""
+    with open(path, encoding="utf-8") as f:
+        tiled = json.load(f)
+    width, height = tiled["width"], tiled["height"]
+
+    tiles = np.zeros((2, height, width), dtype=np.uint16)
+    for layer in tiled.get("layers", []):
+        if layer.get("type") != "tilelayer":
+            continue
+        gids = decode_layer(layer, width, height)
+        if layer["name"] == GROUND_LAYER:
+            tiles[0] = gids
+        elif layer["name"] in ORE_TYPES:
+            tiles[1][gids != 0] = ORE_TYPES.index(layer["name"])
+
+    properties = {prop["name"]: prop["value"] for prop in tiled.get("properties", [])}
+    core = [int(properties.get("core_x", DEFAULT_CORE_TILE[0])),
+            int(properties.get("core_y", DEFAULT_CORE_TILE[1]))]
+    spawn_edges = properties.get("spawn_edges")
+    spawn_edges = spawn_edges.split(",") if spawn_edges else DEFAULT_SPAWN_EDGES
+    meta = {
+        "source": path,
+        "source_hash": source_hash(path),
+        "source_stat": source_stat(path),
+        "version": COMPILER_VERSION,
+        "width": width,
+        "height": height,
+        "tiled_tile_size": tiled.get("tilewidth"),
+        "core": core,
+        "spawn": find_spawn_tiles(tiles[0], spawn_edges),
+        "ore_types": ORE_TYPES,
+    }
+    return tiles, meta
+
+
+def cache_paths(path: str, cache_dir: str = LEVEL_CACHE_DIR) -> Tuple[str, str]:
+    """Файлы кэша (.npy и .json) для карты"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, name + ".npy"), os.path.join(cache_dir, name + ".json")
+
+
+def compile_level(path: str, cache_dir: str = LEVEL_CACHE_DIR) -> Dict:
+    """Скомпилировать карту и записать кэш. Возвращает метаданные"""
+    tiles, meta = compile_map(path)
+    array_path, meta_path = cache_paths(path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Пишем во временные файлы и подменяем - кэш никогда не бывает «наполовину»
+    np.save(array_path + ".tmp.npy", tiles)
+    os.replace(array_path + ".tmp.npy", array_path)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    os.replace(meta_path + ".tmp", meta_path)
+    return meta
+
+
+def read_cached_meta(path: str, meta_path: str) -> Optional[Dict]:
+    """Метаданные кэша, если кэш соответствует исходной карте, иначе None"""
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != COMPILER_VERSION:
+            return None
+        stat = source_stat(path)
+        if meta.get("source_stat") == stat:
+            return meta
+        # Файл трогали: сверяем содержимое по хэшу
+        if meta.get("source_hash") != source_hash(path):
+            return None
+        meta["source_stat"] = stat
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+        return meta
+    except (OSError, ValueError):
+        return None
+
+
+def load_packed_level(path: str, tile_size: int, pack, cache_dir: str = LEVEL_CACHE_DIR) -> Optional[CompiledLevel]:
+    """Уровень из пака ассетов или None, если его там нет или он устарел"""
+    array_path, meta_path = cache_paths(path, cache_dir)
+    if array_path not in pack or meta_path not in pack:
+        return None
+    meta = json.loads(bytes(pack.view(meta_path)))
+    if meta.get("version") != COMPILER_VERSION:
+        return None
+    if os.path.exists(path) and meta.get("source_stat") != source_stat(path) \
+            and meta.get("source_hash") != source_hash(path):
+        return None  # карту поменяли после сборки пака
+
+    # Заголовок .npy читаем из пака, данные отдаём как вид на mmap
+    f = pack.open_file(array_path)
+    major, _ = np.lib.format.read_magic(f)
+    if major == 1:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    count = int(np.prod(shape))
+    tiles = np.frombuffer(pack.view(array_path), dtype=dtype, count=count, offset=f.tell())
+    tiles = tiles.reshape(shape, order="F" if fortran_order else "C")
+    return CompiledLevel(tiles, meta, tile_size)
+
+
+def load_level(path: str, tile_size: int = 80, cache_dir: str = LEVEL_CACHE_DIR,
+               pack=None) -> CompiledLevel:
+    """
+    Уровень из пака ассетов или из кэша (с отображением массива в память).
+    Если кэша нет или исходная карта изменилась - компилирует заново.
+    """
+    if pack is not None:
+        level = load_packed_level(path, tile_size, pack, cache_dir)
+        if level is not None:
+            return level
+    array_path, meta_path = cache_paths(path, cache_dir)
+    meta = read_cached_meta(path, meta_path)
+    if meta is None:
+        meta = compile_level(path, cache_dir)
+    tiles = np.load(array_path, mmap_mode="r")
+    return CompiledLevel(tiles, meta, tile_size)
+
+
+def main():
+    from constants import LEVELS
+    for number, level in LEVELS.items():
+        meta = compile_level(level["map"])
+        print(f"Уровень {number}: {level['map']} -> {cache_paths(level['map'])[0]} "
+              f"({meta['width']}x{meta['height']}, клеток появления: {len(meta['spawn'])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# map_generator.py
+"""
+Генератор больших карт для нагрузочных уровней.
+
+Карты в игре 15x15-20x20 клеток, на них движок никогда не работает
+«в полную силу». Генератор строит карту любого размера (например,
+512x512) в формате Tiled - с теми же слоями, что и карты из редактора:
+- "Земля" - камень и песок (5 видов основы тайлсета);
+- "Медь", "Олово", "Уголь" - залежи руды.
+Позиция ядра и края появления жуков пишутся в свойства карты
+(core_x, core_y, spawn_edges), их читает level_compiler.
+
+Всё считается массивами NumPy без циклов по клеткам: шум - это решётка
+случайных чисел, растянутая билинейной интерполяцией, несколько октав.
+Карта 512x512 генерируется за доли секунды, 4096x4096 - за несколько секунд.
+
+Запуск:
+    python map_generator.py 512 512                   # -> stress_512x512.json
+    python map_generator.py 1024 1024 --seed 7 -o big.json
+Из кода:
+    from map_generator import generate_level_file
+    path = generate_level_file("stress.json", 512, 512, seed=1)
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from level_compiler import GROUND_LAYER, ORE_TYPES
+
+TILESET_FILE = "Тайлы_для_карты.tsx"
+TILED_TILE_SIZE = 320  # размер тайла в картах Tiled
+
+# Первые gid основ тайлсета (камень 1, камень 2, песок 1-3).
+# Тайл с рудой = основа + индекс руды в ORE_TYPES (1 - медь, 2 - олово, 3 - уголь)
+GROUND_GIDS = [1, 5, 9, 13, 17]
+
+# Доля клеток под каждой рудой
+ORE_DENSITY = {"Медь": 0.06, "Олово": 0.04, "Уголь": 0.05}
+
+# Размер пятен шума в клетках (чем больше, тем крупнее участки)
+GROUND_FEATURE = 24
+ORE_FEATURE = 6
+NOISE_OCTAVES = 3
+
+# Сжатие слоёв: быстрое, большие карты иначе упираются в zlib
+LAYER_COMPRESSION = 1
+
+# Вокруг ядра руды нет (радиус в клетках)
+CORE_CLEAR_RADIUS = 3
+
+SPAWN_EDGES = ["left", "bottom"]
+
+
+def interpolate(grid: np.ndarray, size: int, feature: int, axis: int) -> np.ndarray:
+    """Растянуть решётку вдоль оси до size клеток (smoothstep между узлами)"""
+    position = np.arange(size, dtype=np.float32) / feature
+    index = position.astype(np.intp)
+    t = position - index
+    t = t * t * (3 - 2 * t)  # smoothstep убирает «ступеньки» на границах ячеек
+    if axis == 0:
+        t = t[:, None]
+    low = np.take(grid, index, axis=axis)
+    return low + (np.take(grid, index + 1, axis=axis) - low) * t
+
+
+def value_noise(rng: np.random.Generator, height: int, width: int, feature: int,
+                octaves: int = NOISE_OCTAVES, persistence: float = 0.5) -> np.ndarray:
+    """Гладкий шум (высота, ширина) со значениями 0..1"""
+    total = np.zeros((height, width), dtype=np.float32)
+    amplitude = 1.0
+    norm = 0.0
+    for _ in range(octaves):
+        feature = max(1, feature)
+        grid = rng.random((height // feature + 2, width // feature + 2), dtype=np.float32)
+        # Интерполяция раздельная: сначала вдоль x по маленькой решётке,
+        # потом вдоль y - так полноразмерных выборок две, а не четыре
+        rows = interpolate(grid, width, feature, axis=1)
+        total += interpolate(rows, height, feature, axis=0) * np.float32(amplitude)
+        norm += amplitude
+        amplitude *= persistence
+        feature //= 2
+    return total / norm
+
+
+def generate_tiles(width: int, height: int, seed: Optional[int] = None,
+                   ore_density: Optional[Dict[str, float]] = None,
+                   core: Optional[Sequence[int]] = None) -> Dict:
+    """
+    Клетки карты: земля (gid основы) и руда (индекс в ORE_TYPES).
+    Строка 0 - нижний ряд карты, как в level_compiler.
+    """
+    rng = np.random.default_rng(seed)
+    ore_density = ORE_DENSITY if ore_density is None else ore_density
+    if core is None:
+        core = (width // 2, height // 2)
+
+    # Земля: шум раскладывается на 5 основ поровну
+    noise = value_noise(rng, height, width, GROUND_FEATURE)
+    bounds = np.quantile(noise, np.linspace(0, 1, len(GROUND_GIDS) + 1)[1:-1])
+    ground = np.asarray(GROUND_GIDS, dtype=np.uint32)[np.digitize(noise, bounds)]
+
+    # Руда: у каждой свой шум, залежь там, где шум выше порога доли клеток.
+    # Там, где залежи пересекаются, побеждает руда с большим запасом над порогом
+    ore = np.zeros((height, width), dtype=np.uint16)
+    indices = [index for index, name in enumerate(ORE_TYPES) if name and ore_density.get(name, 0) > 0]
+    if indices:
+        scores = np.empty((len(indices), height, width), dtype=np.float32)
+        for score, index in zip(scores, indices):
+            noise = value_noise(rng, height, width, ORE_FEATURE)
+            np.subtract(noise, np.quantile(noise, 1.0 - ore_density[ORE_TYPES[index]]), out=score)
+        best = scores.argmax(axis=0)
+        deposit = np.take_along_axis(scores, best[None], axis=0)[0] > 0
+        ore[deposit] = np.asarray(indices, dtype=np.uint16)[best[deposit]]
+
+    # Около ядра руды нет: туда ставятся первые здания
+    rows, columns = np.ogrid[:height, :width]
+    near_core = (columns - core[0]) ** 2 + (rows - core[1]) ** 2 <= CORE_CLEAR_RADIUS ** 2
+    ore[near_core] = 0
+
+    return {"ground": ground, "ore": ore, "core": [int(core[0]), int(core[1])]}
+
+
+def encode_layer(gids: np.ndarray) -> str:
+    """Массив gid (строка 0 - низ) -> данные слоя Tiled (base64 + zlib)"""
+    raw = np.ascontiguousarray(np.flipud(gids), dtype="<u4").tobytes()
+    return base64.b64encode(zlib.compress(raw, LAYER_COMPRESSION)).decode("ascii")
+
+
+def tile_layer(layer_id: int, name: str, gids: np.ndarray) -> Dict:
+    height, width = gids.shape
+    return {
+        "compression": "zlib",
+        "data": encode_layer(gids),
+        "encoding": "base64",
+        "height": height,
+        "id": layer_id,
+        "name": name,
+        "opacity": 1,
+        "type": "tilelayer",
+        "visible": True,
+        "width": width,
+        "x": 0,
+        "y": 0,
+    }
+
+
+def generate_map(width: int, height: int, seed: Optional[int] = None,
+                 ore_density: Optional[Dict[str, float]] = None,
+                 core: Optional[Sequence[int]] = None,
+                 spawn_edges: Sequence[str] = SPAWN_EDGES,
+                 tileset: str = TILESET_FILE) -> Dict:
+    """Карта в формате Tiled JSON (словарь)"""
+    tiles = generate_tiles(width, height, seed, ore_density, core)
+    ground, ore = tiles["ground"], tiles["ore"]
+
+    layers = [tile_layer(1, GROUND_LAYER, ground)]
+    for index, name in enumerate(ORE_TYPES[1:], start=1):
+        # В слое руды - тайл «основа с рудой», как рисуют карты в редакторе
+        layers.append(tile_layer(index + 1, name, np.where(ore == index, ground + index, 0)))
+
+    core_x, core_y = tiles["core"]
+    return {
+        "compressionlevel": -1,
+        "height": height,
+        "infinite": False,
+        "layers": layers,
+        "nextlayerid": len(layers) + 1,
+        "nextobjectid": 1,
+        "orientation": "orthogonal",
+        "properties": [
+            {"name": "core_x", "type": "int", "value": core_x},
+            {"name": "core_y", "type": "int", "value": core_y},
+            {"name": "seed", "type": "string", "value": "" if seed is None else str(seed)},
+            {"name": "spawn_edges", "type": "string", "value": ",".join(spawn_edges)},
+        ],
+        "renderorder": "right-down",
+        "tiledversion": "1.11.2",
+        "tileheight": TILED_TILE_SIZE,
+        "tilesets": [{"firstgid": 1, "source": tileset}],
+        "tilewidth": TILED_TILE_SIZE,
+        "type": "map",
+        "version": "1.10",
+        "width": width,
+    }
+
+
+def generate_level_file(path: str, width: int, height: int, seed: Optional[int] = None,
+                        **options) -> str:
+    """Сгенерировать карту и записать её в файл. Возвращает путь"""
+    directory = os.path.dirname(os.path.abspath(path))
+    tileset = os.path.relpath(os.path.abspath(TILESET_FILE), directory).replace("\\", "/")
+    tiled = generate_map(width, height, seed, tileset=tileset, **options)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tiled, f, ensure_ascii=False)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Генератор больших карт в формате Tiled")
+    parser.add_argument("width", type=int, help="ширина карты в клетках")
+    parser.add_argument("height", type=int, help="высота карты в клетках")
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора")
+    parser.add_argument("-o", "--output", help="файл карты (по умолчанию stress_<ш>x<в>.json)")
+    for name, option in (("Медь", "copper"), ("Олово", "tin"), ("Уголь", "coal")):
+        parser.add_argument(f"--{option}", type=float, default=ORE_DENSITY[name],
+                            help=f"доля клеток с рудой «{name}»")
+    parser.add_argument("--spawn-edges", default=",".join(SPAWN_EDGES),
+                        help="края появления жуков: left,right,bottom,top")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"stress_{args.width}x{args.height}.json"
+    density = {"Медь": args.copper, "Олово": args.tin, "Уголь": args.coal}
+    start = time.perf_counter()
+    generate_level_file(output, args.width, args.height, args.seed, ore_density=density,
+                        spawn_edges=[edge.strip() for edge in args.spawn_edges.split(",") if edge.strip()])
+    elapsed = time.perf_counter() - start
+    print(f"Карта {output}: {args.width}x{args.height} клеток за {elapsed:.2f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,7 @@ from typing import Dict, List, Tuple, Optional, Any, Callable
 from datetime import datetime
 
 from database import GameDatabase
-from constants import MUSIC_MENU
+from assets import ASSETS
 
 
 class StartMenuView(arcade.View):
@@ -15,21 +15,34 @@ class StartMenuView(arcade.View):
     def __init__(self):
         super().__init__()
         self.ui_manager = UIManager()
-        self.db = GameDatabase()
+        self.db = GameDatabase.shared()
         self.current_user = None
         self.current_user_id = None
         self.ost = None
+        self.music_pending = False  # музыка меню ещё грузится
         self.stars = []
         self.setup_ui()
 
     def on_show_view(self):
         arcade.set_background_color(arcade.color.DARK_SLATE_BLUE)
         self.ui_manager.enable()
-        if MUSIC_MENU:
-            self.ost = arcade.play_sound(MUSIC_MENU, volume=True)
+        # Меню показывается сразу; музыка меню и ассеты уровня грузятся в фоне
+        ASSETS.load_groups("menu", "level", "combat")
+        self.music_pending = True
+        self.play_menu_music()
+
+    def play_menu_music(self):
+        """Включить музыку меню, как только она загрузится"""
+        if not ASSETS.is_ready("music_menu"):
+            return
+        self.music_pending = False
+        music = ASSETS.get("music_menu")
+        if music:
+            self.ost = arcade.play_sound(music, volume=True)
 
     def on_hide_view(self):
         self.ui_manager.disable()
+        self.music_pending = False
         if self.ost:
             arcade.stop_sound(self.ost)
 
@@ -126,7 +139,9 @@ class StartMenuView(arcade.View):
 
     def show_level_selection(self):
         self.level_container.clear()
+        # Статистика и рекорды берутся из кэша профиля (один запрос на вход)
         user_stats = self.db.get_user_stats(self.current_user_id)
+        level_records = self.db.get_user_level_records(self.current_user_id)
         unlocked_levels = user_stats.get('unlocked_levels', 1)
 
         title_label = UILabel(
@@ -170,7 +185,6 @@ class StartMenuView(arcade.View):
             level_centered.add(level_button)
 
             # Показываем рекорд
-            level_records = self.db.get_user_level_records(self.current_user_id)
             record = level_records.get(level, {})
             if record:
                 record_label = UILabel(
@@ -203,7 +217,7 @@ class StartMenuView(arcade.View):
 
     def start_level(self, level_number: int):
         from game import GameView
-        game_view = GameView(level_number, self.current_user_id, self.current_user)
+        game_view = GameView.for_window(self.window, level_number, self.current_user_id, self.current_user)
         self.window.show_view(game_view)
 
     def continue_game(self):
@@ -213,6 +227,8 @@ class StartMenuView(arcade.View):
             self.start_level(level)
 
     def on_update(self, delta_time: float):
+        if self.music_pending:
+            self.play_menu_music()
         if not self.stars:
             for _ in range(100):
                 self.stars.append({
@@ -237,6 +253,7 @@ class StartMenuView(arcade.View):
         self.ui_manager.draw()
 
         if self.current_user:
+            # Из кэша профиля: запрос к базе только после записи
             stats = self.db.get_user_stats(self.current_user_id)
             arcade.draw_text(
                 f"Игрок: {self.current_user}",
@@ -249,9 +266,6 @@ class StartMenuView(arcade.View):
                 arcade.color.LIGHT_GRAY, 12, font_name="Courier New"
             )
 
-    def on_close(self):
-        self.db.close()
-
 
 class LevelCompleteView(arcade.View):
     """Окно успешного завершения уровня"""
@@ -262,7 +276,7 @@ class LevelCompleteView(arcade.View):
         self.user_id = user_id
         self.username = username
         self.callback = callback
-        self.db = GameDatabase()
+        self.db = GameDatabase.shared()
         self.ui_manager = UIManager()
         self.setup_ui()
 
@@ -272,7 +286,6 @@ class LevelCompleteView(arcade.View):
 
     def on_hide_view(self):
         self.ui_manager.disable()
-        self.db.close()
 
     def setup_ui(self):
         main_box = UIBoxLayout(vertical=True, space_between=15)
@@ -369,7 +382,7 @@ class GameOverView(arcade.View):
         self.stats = stats
         self.user_id = user_id
         self.callback = callback
-        self.db = GameDatabase()
+        self.db = GameDatabase.shared()
         self.ui_manager = UIManager()
         self.setup_ui()
 
@@ -379,7 +392,6 @@ class GameOverView(arcade.View):
 
     def on_hide_view(self):
         self.ui_manager.disable()
-        self.db.close()
 
     def setup_ui(self):
         main_box = UIBoxLayout(vertical=True, space_between=15)
@@ -472,7 +484,7 @@ class FinalResultsView(arcade.View):
         self.user_id = user_id
         self.username = username
         self.callback = callback
-        self.db = GameDatabase()
+        self.db = GameDatabase.shared()
         self.ui_manager = UIManager()
         self.setup_ui()
 
@@ -482,7 +494,6 @@ class FinalResultsView(arcade.View):
 
     def on_hide_view(self):
         self.ui_manager.disable()
-        self.db.close()
 
     def setup_ui(self):
         main_box = UIBoxLayout(vertical=True, space_between=10)
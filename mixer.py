@@ -0,0 +1,217 @@
+# mixer.py
+"""
+Микшер звуков с ограниченным числом голосов.
+
+Каждый проигрываемый звук занимает один голос. Число голосов ограничено
+сверху (общий лимит берётся из ступени качества), а внутри него у каждой
+категории есть свой лимит и минимальный интервал между запусками:
+- "hit"    - попадания пуль;
+- "turret" - выстрелы турелей;
+- "music"  - музыка (всегда один трек, новый заменяет старый).
+
+Звуки с координатами приглушаются с расстоянием до слушателя (центра
+камеры), а слишком далёкие не запускаются вовсе. Если голосов не хватает,
+новый звук либо отбрасывается, либо вытесняет самый старый звук той же
+категории. Поэтому сколько бы жуков ни было в волне, одновременно звучит
+не больше max_voices плееров.
+"""
+import math
+from typing import Dict, List, Optional
+
+import arcade
+
+# Общее число голосов по умолчанию (в игре берётся из quality.sound_voices)
+MAX_VOICES = 16
+
+# Настройки категорий:
+# voices - сколько звуков категории может звучать одновременно
+# retrigger - минимальный интервал между запусками, секунд
+# volume - громкость категории
+# steal - вытеснять ли самый старый звук категории, когда лимит исчерпан
+SOUND_CATEGORIES: Dict[str, Dict] = {
+    "hit": {"voices": 6, "retrigger": 0.05, "volume": 0.7, "steal": False},
+    "turret": {"voices": 4, "retrigger": 0.08, "volume": 0.6, "steal": True},
+    "music": {"voices": 1, "retrigger": 0.0, "volume": 1.0, "steal": True},
+}
+
+# Затухание с расстоянием (в пикселях мира)
+FULL_VOLUME_DISTANCE = 300  # ближе - полная громкость
+HEARING_DISTANCE = 900  # дальше - звук не запускается
+MIN_AUDIBLE_VOLUME = 0.05  # тише - тоже не запускаем
+
+
+class Voice:
+    """Звучащий звук: категория, плеер pyglet и момент запуска"""
+
+    __slots__ = ("category", "player", "started")
+
+    def __init__(self, category: str, player, started: float):
+        self.category = category
+        self.player = player
+        self.started = started
+
+
+class Mixer:
+    """Пул голосов с лимитами по категориям и затуханием по расстоянию"""
+
+    def __init__(self, max_voices: int = MAX_VOICES, categories: Dict[str, Dict] = SOUND_CATEGORIES):
+        self.max_voices = max_voices
+        self.categories = categories
+        self.voices: List[Voice] = []
+        self.last_played: Dict[str, float] = {}  # категория -> время последнего запуска
+        self.time = 0.0  # внутренние часы микшера (двигаются в update)
+        self.listener = (0.0, 0.0)  # позиция слушателя (центр камеры)
+        self.music: Optional[Voice] = None
+
+        # Счётчики для отладки
+        self.played = 0
+        self.throttled = 0  # отброшены по лимиту или интервалу
+        self.culled = 0  # отброшены из-за расстояния
+        self.stolen = 0  # вытеснены новыми звуками
+
+    def set_voice_limit(self, max_voices: int):
+        """Изменить общий лимит голосов (лишние звуки останавливаются)"""
+        self.max_voices = max(1, max_voices)
+        while len(self.voices) > self.max_voices:
+            self._stop(self._oldest(exclude_music=True) or self.voices[0])
+
+    def set_listener(self, x: float, y: float):
+        """Позиция слушателя (обычно центр камеры)"""
+        self.listener = (x, y)
+
+    # === ЗАПУСК ЗВУКОВ ===
+
+    def play(self, category: str, sound: Optional[arcade.Sound],
+             x: Optional[float] = None, y: Optional[float] = None,
+             volume: float = 1.0, loop: bool = False):
+        """
+        Запустить звук категории (x, y - точка в мире, None - без затухания).
+        Возвращает плеер или None, если звук отброшен.
+        """
+        if sound is None:
+            return None
+        settings = self.categories[category]
+
+        pan = 0.0
+        if x is not None and y is not None:
+            gain, pan = self._spatial(x, y)
+            if gain < MIN_AUDIBLE_VOLUME:
+                self.culled += 1
+                return None
+            volume *= gain
+
+        last = self.last_played.get(category)
+        if last is not None and self.time - last < settings["retrigger"]:
+            self.throttled += 1
+            return None
+
+        self._reap()
+        if self._count(category) >= settings["voices"] and not self._free(category, settings["steal"]):
+            self.throttled += 1
+            return None
+        if len(self.voices) >= self.max_voices and not self._free(None, settings["steal"]):
+            self.throttled += 1
+            return None
+
+        player = arcade.play_sound(sound, volume=volume * settings["volume"], pan=pan, loop=loop)
+        if player is None:
+            return None
+        voice = Voice(category, player, self.time)
+        self.voices.append(voice)
+        self.last_played[category] = self.time
+        self.played += 1
+        return player
+
+    def play_music(self, sound: Optional[arcade.Sound], loop: bool = False):
+        """Сменить музыкальный трек (старый останавливается)"""
+        if sound is None:
+            return None
+        self.stop_music()
+        player = self.play("music", sound, loop=loop)
+        if player is not None:
+            self.music = self.voices[-1]
+        return player
+
+    def stop_music(self):
+        """Остановить музыку"""
+        if self.music is not None:
+            self._stop(self.music)
+            self.music = None
+
+    def stop_all(self):
+        """Остановить все звуки (при выходе с уровня)"""
+        for voice in list(self.voices):
+            self._stop(voice)
+        self.music = None
+
+    # === ОБНОВЛЕНИЕ ===
+
+    def update(self, delta_time: float):
+        """Раз в кадр: двигаем часы и освобождаем голоса отзвучавших звуков"""
+        self.time += delta_time
+        self._reap()
+
+    def _reap(self):
+        """Убрать из пула доигравшие звуки"""
+        if any(not voice.player.playing for voice in self.voices):
+            self.voices = [voice for voice in self.voices if voice.player.playing]
+            if self.music is not None and self.music not in self.voices:
+                self.music = None
+
+    # === ВНУТРЕННЕЕ ===
+
+    def _spatial(self, x: float, y: float):
+        """Громкость (0..1) и панорама (-1..1) для точки мира"""
+        dx = x - self.listener[0]
+        dy = y - self.listener[1]
+        distance = math.hypot(dx, dy)
+        if distance >= HEARING_DISTANCE:
+            return 0.0, 0.0
+        if distance <= FULL_VOLUME_DISTANCE:
+            gain = 1.0
+        else:
+            gain = 1.0 - (distance - FULL_VOLUME_DISTANCE) / (HEARING_DISTANCE - FULL_VOLUME_DISTANCE)
+        pan = max(-1.0, min(1.0, dx / HEARING_DISTANCE))
+        return gain, pan
+
+    def _count(self, category: str) -> int:
+        return sum(1 for voice in self.voices if voice.category == category)
+
+    def _oldest(self, category: Optional[str] = None, exclude_music: bool = False) -> Optional[Voice]:
+        """Самый старый голос категории (или любой, если category=None)"""
+        for voice in self.voices:
+            if category is not None and voice.category != category:
+                continue
+            if exclude_music and voice is self.music:
+                continue
+            return voice
+        return None
+
+    def _free(self, category: Optional[str], steal: bool) -> bool:
+        """Освободить голос, вытеснив самый старый звук (если можно)"""
+        if not steal:
+            return False
+        voice = self._oldest(category, exclude_music=True)
+        if voice is None:
+            return False
+        self._stop(voice)
+        self.stolen += 1
+        return True
+
+    def _stop(self, voice: Voice):
+        if voice in self.voices:
+            self.voices.remove(voice)
+        if voice is self.music:
+            self.music = None
+        arcade.stop_sound(voice.player)
+
+    def get_info(self) -> Dict[str, int]:
+        """Счётчики для отладочного вывода"""
+        return {
+            "voices": len(self.voices),
+            "max_voices": self.max_voices,
+            "played": self.played,
+            "throttled": self.throttled,
+            "culled": self.culled,
+            "stolen": self.stolen,
+        }
@@ -0,0 +1,154 @@
+# overlay.py
+"""
+Оверлей с полосками здоровья и маршрутами дронов.
+
+Вся геометрия оверлея - это одноцветные прямоугольники в одном SpriteList,
+то есть в одном вершинном буфере, и рисуется одним вызовом draw().
+Каждый кадр sync() сравнивает hp, позицию и маршрут каждой сущности
+с запомненными значениями и переписывает только изменившиеся записи.
+Освободившиеся прямоугольники не удаляются из SpriteList, а прячутся
+и переиспользуются (удаление из середины списка дорогое).
+"""
+import math
+from typing import Dict, Iterable, List
+
+import arcade
+
+BAR_HEIGHT = 4  # высота полоски здоровья, пикселей
+BAR_OFFSET = 4  # отступ полоски над спрайтом
+ROUTE_WIDTH = 2  # толщина линии маршрута
+
+BAR_BACK_COLOR = (90, 0, 0, 200)
+BAR_COLOR = (40, 200, 40, 230)
+ROUTE_COLOR = (80, 170, 255, 120)
+
+# Показывать полоски и у целых сущностей (по умолчанию только у раненых)
+SHOW_FULL_HP = False
+
+
+class OverlayLayer:
+    """Полоски здоровья и линии маршрутов в одном SpriteList"""
+
+    def __init__(self, capacity: int = 256):
+        self.sprite_list = arcade.SpriteList(capacity=capacity)
+        self.free: List[arcade.SpriteSolidColor] = []
+
+        # id(сущности) -> [фон, полоска, hp, max_hp, x, y]
+        self.bars: Dict[int, list] = {}
+        # id(дрона) -> [линия, x1, y1, x2, y2]
+        self.routes: Dict[int, list] = {}
+
+        self.updated = 0  # сколько записей переписано при последнем sync()
+
+    # === ПУЛ ПРЯМОУГОЛЬНИКОВ ===
+
+    def _take(self, color) -> arcade.SpriteSolidColor:
+        """Взять прямоугольник из пула (или создать новый)"""
+        if self.free:
+            sprite = self.free.pop()
+            sprite.visible = True
+        else:
+            sprite = arcade.SpriteSolidColor(1, 1, color=arcade.color.WHITE)
+            self.sprite_list.append(sprite)
+        sprite.color = color
+        return sprite
+
+    def _release(self, sprite: arcade.SpriteSolidColor):
+        """Спрятать прямоугольник и вернуть в пул"""
+        sprite.visible = False
+        self.free.append(sprite)
+
+    # === СИНХРОНИЗАЦИЯ С ИГРОЙ ===
+
+    def sync(self, *entity_lists: Iterable):
+        """
+        Обновить оверлей по спискам сущностей (здания, жуки, игроки и дроны).
+        Полоска рисуется у всех, у кого есть hp/max_hp,
+        линия маршрута - у всех, у кого есть source и destination.
+        """
+        self.updated = 0
+        seen_bars = set()
+        seen_routes = set()
+
+        for entities in entity_lists:
+            for entity in entities:
+                max_hp = getattr(entity, "max_hp", None)
+                if max_hp:
+                    hp = entity.hp
+                    if SHOW_FULL_HP or 0 < hp < max_hp:
+                        seen_bars.add(id(entity))
+                        self._sync_bar(entity, hp, max_hp)
+
+                source = getattr(entity, "source", None)
+                destination = getattr(entity, "destination", None)
+                if source is not None and destination is not None:
+                    seen_routes.add(id(entity))
+                    self._sync_route(entity, source, destination)
+
+        for key in [key for key in self.bars if key not in seen_bars]:
+            back, bar = self.bars.pop(key)[:2]
+            self._release(back)
+            self._release(bar)
+        for key in [key for key in self.routes if key not in seen_routes]:
+            self._release(self.routes.pop(key)[0])
+
+    def _sync_bar(self, entity, hp: float, max_hp: float):
+        """Полоска здоровья: переписывается только при изменении hp или позиции"""
+        x = entity.center_x
+        y = entity.top + BAR_OFFSET
+        entry = self.bars.get(id(entity))
+        if entry is None:
+            entry = [self._take(BAR_BACK_COLOR), self._take(BAR_COLOR), None, None, None, None]
+            self.bars[id(entity)] = entry
+        elif entry[2] == hp and entry[3] == max_hp and entry[4] == x and entry[5] == y:
+            return
+
+        back, bar = entry[0], entry[1]
+        width = max(entity.width, 8)
+        fill = width * max(0.0, min(1.0, hp / max_hp))
+
+        back.width = width
+        back.height = BAR_HEIGHT
+        back.position = (x, y)
+
+        bar.width = max(fill, 0.01)
+        bar.height = BAR_HEIGHT
+        bar.position = (x - (width - fill) / 2, y)
+
+        entry[2:] = [hp, max_hp, x, y]
+        self.updated += 1
+
+    def _sync_route(self, drone, source, destination):
+        """Линия маршрута: переписывается только при смене маршрута"""
+        x1, y1 = source.center_x, source.center_y
+        x2, y2 = destination.center_x, destination.center_y
+        entry = self.routes.get(id(drone))
+        if entry is None:
+            entry = [self._take(ROUTE_COLOR), None, None, None, None]
+            self.routes[id(drone)] = entry
+        elif entry[1:] == [x1, y1, x2, y2]:
+            return
+
+        line = entry[0]
+        line.width = max(math.hypot(x2 - x1, y2 - y1), 0.01)
+        line.height = ROUTE_WIDTH
+        line.position = ((x1 + x2) / 2, (y1 + y2) / 2)
+        line.angle = -math.degrees(math.atan2(y2 - y1, x2 - x1))
+
+        entry[1:] = [x1, y1, x2, y2]
+        self.updated += 1
+
+    def clear(self):
+        """Убрать всё (например, при смене уровня)"""
+        for back, bar, *_ in self.bars.values():
+            self._release(back)
+            self._release(bar)
+        for line, *_ in self.routes.values():
+            self._release(line)
+        self.bars.clear()
+        self.routes.clear()
+
+    def draw(self):
+        """Отрисовка всего оверлея одним вызовом"""
+        if self.bars or self.routes:
+            self.sprite_list.draw()
@@ -0,0 +1,209 @@
+# particles.py
+"""
+Пуловая система частиц для взрывов.
+
+Все частицы живут в одном заранее созданном SpriteList фиксированной
+ёмкости и рисуются одним вызовом. Новые спрайты во время игры не создаются:
+частица берётся из пула свободных слотов и возвращается туда после смерти.
+
+Общий бюджет частиц не даёт эффектам съесть кадр на больших волнах:
+- взрывы, пришедшие в одном кадре рядом друг с другом, сливаются в один;
+- если за кадр пришло слишком много взрывов, лишние отбрасываются;
+- если свободных слотов не осталось, взрыв получает столько частиц, сколько есть.
+"""
+import math
+from typing import Dict, List, Optional
+
+import arcade
+
+from rng import RNG
+
+# Общий бюджет частиц (ёмкость пула)
+MAX_PARTICLES = 600
+
+# Сколько отдельных взрывов принимаем за один кадр
+MAX_BURSTS_PER_FRAME = 12
+
+# Взрывы одного типа ближе этого расстояния (в пикселях) в одном кадре сливаются
+MERGE_DISTANCE = 24
+
+# Максимум частиц в одном (в том числе слитом) взрыве
+MAX_BURST_SIZE = 60
+
+# Настройки эффектов (повторяют старые Emitter из game.py).
+# Скорости заданы в пикселях за кадр при 60 FPS, как у LifetimeParticle.
+PARTICLE_PRESETS = {
+    # Попадание пули
+    "hit": {
+        "count": 30,
+        "speed": (0.0, 8.0),
+        "ring": False,
+        "lifetime": (0.01, 0.2),
+        "scale": (0.1, 0.15),
+        "alpha": (25, 50),
+    },
+    # Разрушение здания
+    "ring": {
+        "count": 30,
+        "speed": (0.2, 4.0),
+        "ring": True,
+        "lifetime": (0.1, 0.4),
+        "scale": (0.02, 0.1),
+        "alpha": (80, 80),
+    },
+}
+
+
+class ParticleSystem:
+    """Пул частиц с общим бюджетом и отрисовкой одним SpriteList"""
+
+    def __init__(self, textures: Dict[str, arcade.Texture], capacity: int = MAX_PARTICLES):
+        """
+        textures: {'hit': текстура, 'ring': текстура} - текстура для каждого эффекта
+        capacity: размер пула частиц (общий бюджет)
+        """
+        self.textures = textures
+        self.capacity = capacity
+
+        # Один SpriteList на все частицы, заполняется сразу
+        self.sprite_list = arcade.SpriteList(capacity=capacity)
+        default_texture = next(iter(textures.values()))
+        self.sprites: List[arcade.Sprite] = []
+        for _ in range(capacity):
+            sprite = arcade.Sprite(default_texture)
+            sprite.visible = False
+            self.sprites.append(sprite)
+            self.sprite_list.append(sprite)
+
+        # Состояние частиц в параллельных списках (индекс = слот в пуле)
+        self.change_x = [0.0] * capacity
+        self.change_y = [0.0] * capacity
+        self.lifetime = [0.0] * capacity
+        self.max_lifetime = [0.0] * capacity
+        self.start_alpha = [0] * capacity
+
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.active_slots: List[int] = []
+
+        # Взрывы, запрошенные в текущем кадре: [тип, x, y, количество]
+        self.pending: List[list] = []
+
+        # Ограничения, которые может ужесточить контроллер качества
+        self.burst_scale = 1.0
+        self.max_active = capacity
+        self.max_bursts = MAX_BURSTS_PER_FRAME
+
+        # Статистика для отладки
+        self.merged_bursts = 0
+        self.dropped_bursts = 0
+        self.dropped_particles = 0
+
+    def burst(self, kind: str, x: float, y: float, count: Optional[int] = None):
+        """
+        Запросить взрыв. Частицы появятся при ближайшем update().
+        Взрывы одного типа рядом друг с другом сливаются.
+        """
+        if count is None:
+            count = PARTICLE_PRESETS[kind]["count"]
+        count = max(1, int(count * self.burst_scale))
+
+        for request in self.pending:
+            if request[0] == kind and abs(request[1] - x) <= MERGE_DISTANCE \
+                    and abs(request[2] - y) <= MERGE_DISTANCE:
+                request[3] = min(MAX_BURST_SIZE, request[3] + count)
+                self.merged_bursts += 1
+                return
+
+        if len(self.pending) >= self.max_bursts:
+            self.dropped_bursts += 1
+            return
+
+        self.pending.append([kind, x, y, min(count, MAX_BURST_SIZE)])
+
+    def update(self, delta_time: float):
+        """Создание запрошенных взрывов и движение живых частиц"""
+        if self.pending:
+            for kind, x, y, count in self.pending:
+                self._spawn(kind, x, y, count)
+            self.pending.clear()
+
+        if not self.active_slots:
+            return
+
+        frames = delta_time * 60  # скорости заданы на кадр при 60 FPS
+        still_alive = []
+        for i in self.active_slots:
+            sprite = self.sprites[i]
+            self.lifetime[i] -= delta_time
+            if self.lifetime[i] <= 0:
+                sprite.visible = False
+                self.free_slots.append(i)
+                continue
+            sprite.center_x += self.change_x[i] * frames
+            sprite.center_y += self.change_y[i] * frames
+            sprite.alpha = int(self.start_alpha[i] * self.lifetime[i] / self.max_lifetime[i])
+            still_alive.append(i)
+        self.active_slots = still_alive
+
+    def _spawn(self, kind: str, x: float, y: float, count: int):
+        """Взять частицы из пула под один взрыв"""
+        preset = PARTICLE_PRESETS[kind]
+        texture = self.textures[kind]
+
+        available = min(len(self.free_slots), self.max_active - len(self.active_slots))
+        if count > available:
+            self.dropped_particles += count - max(0, available)
+            count = max(0, available)
+
+        min_speed, max_speed = preset["speed"]
+        min_life, max_life = preset["lifetime"]
+        min_scale, max_scale = preset["scale"]
+        min_alpha, max_alpha = preset["alpha"]
+        for _ in range(count):
+            i = self.free_slots.pop()
+            sprite = self.sprites[i]
+
+            angle = RNG.particles.uniform(0, 2 * math.pi)
+            if preset["ring"]:
+                speed = RNG.particles.uniform(min_speed, max_speed)
+            else:
+                # Равномерно внутри круга, как rand_in_circle
+                speed = max_speed * math.sqrt(RNG.particles.random())
+            self.change_x[i] = math.cos(angle) * speed
+            self.change_y[i] = math.sin(angle) * speed
+
+            life = RNG.particles.uniform(min_life, max_life)
+            self.lifetime[i] = life
+            self.max_lifetime[i] = life
+            self.start_alpha[i] = RNG.particles.randint(min_alpha, max_alpha)
+
+            if sprite.texture is not texture:
+                sprite.texture = texture
+            sprite.position = (x, y)
+            sprite.scale = RNG.particles.uniform(min_scale, max_scale)
+            sprite.alpha = self.start_alpha[i]
+            sprite.visible = True
+            self.active_slots.append(i)
+
+    def set_limits(self, burst_scale: float, max_active: int, max_bursts: int):
+        """Изменить бюджет частиц (используется контроллером качества)"""
+        self.burst_scale = burst_scale
+        self.max_active = min(max_active, self.capacity)
+        self.max_bursts = max_bursts
+
+    def clear(self):
+        """Погасить все частицы (например, при смене уровня)"""
+        for i in self.active_slots:
+            self.sprites[i].visible = False
+            self.free_slots.append(i)
+        self.active_slots = []
+        self.pending.clear()
+
+    def get_count(self) -> int:
+        """Сколько частиц сейчас живо"""
+        return len(self.active_slots)
+
+    def draw(self):
+        """Отрисовка всех частиц одним вызовом"""
+        if self.active_slots:
+            self.sprite_list.draw()
@@ -0,0 +1,282 @@
+# profiler.py
+"""
+Покадровый профайлер систем игры.
+
+Замеры - «круги» (lap): begin("update") открывает область кадра, каждый
+lap("turrets") закрывает отрезок от предыдущей отметки до текущего
+момента под своим именем, end() закрывает область. Так вокруг систем не
+нужно ничего оборачивать - достаточно отметки после каждой.
+
+Отрезки пишутся в кольцевой буфер фиксированного размера (номер имени,
+начало, конец), суммы по именам за кадр - в таблицу последних
+HISTORY_FRAMES кадров, из которой рисуется оверлей: столбик на кадр,
+отрезки столбика - системы. Столбики - прямоугольники в одном SpriteList
+(как в overlay.py), стоят по кругу: за кадр переписывается только
+столбик нового кадра, а курсор показывает, где сейчас запись.
+
+По TRACE_KEY последние TRACE_SECONDS секунд сохраняются в PROFILE_DIR
+в формате Chrome trace (chrome://tracing, ui.perfetto.dev).
+
+Пока профайлер выключен, каждая отметка - это вызов метода с одной
+проверкой флага, буфер и оверлей не трогаются.
+"""
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import arcade
+import numpy as np
+import pyglet
+
+# Клавиши: включить профайлер с оверлеем, сохранить трассу
+TOGGLE_KEY = arcade.key.F9
+TRACE_KEY = arcade.key.F10
+
+# Куда сохранять трассы и за сколько последних секунд
+PROFILE_DIR = "profiles"
+TRACE_SECONDS = 10.0
+
+# Отрезков в кольце: ~20 отметок на кадр, 60 кадров в секунду - около минуты
+EVENT_CAPACITY = 1 << 16
+# Кадров на графике и максимум разных имён
+HISTORY_FRAMES = 180
+MAX_SCOPES = 48
+
+# Оверлей: ширина столбика, высота графика (пиксели) и сколько мс в высоте
+BAR_WIDTH = 2
+GRAPH_HEIGHT = 150
+GRAPH_MS = 1000 / 30
+BUDGET_MS = 1000 / 60  # линия бюджета кадра
+GRAPH_MARGIN = 10
+# Раз в сколько кадров обновлять подписи со средним временем
+LABELS_REFRESH = 30
+
+GRAPH_BACK_COLOR = (0, 0, 0, 160)
+BUDGET_COLOR = (255, 255, 255, 140)
+CURSOR_COLOR = (255, 255, 255, 255)
+SCOPE_COLORS = [
+    (230, 25, 75, 255), (60, 180, 75, 255), (255, 225, 25, 255), (0, 130, 200, 255),
+    (245, 130, 48, 255), (145, 30, 180, 255), (70, 240, 240, 255), (240, 50, 230, 255),
+    (210, 245, 60, 255), (250, 190, 212, 255), (0, 128, 128, 255), (220, 190, 255, 255),
+    (170, 110, 40, 255), (255, 250, 200, 255), (128, 0, 0, 255), (170, 255, 195, 255),
+]
+
+
+class FrameProfiler:
+    """Отметки систем за кадр: кольцо отрезков, история кадров и оверлей"""
+
+    def __init__(self, capacity: int = EVENT_CAPACITY, history: int = HISTORY_FRAMES):
+        self.enabled = False
+        self.capacity = capacity
+        # Отрезок: номер имени и [начало, конец] (perf_counter, секунды)
+        self.scopes = np.zeros(capacity, dtype=np.int16)
+        self.spans = np.zeros((capacity, 2), dtype=np.float64)
+        self.head = 0  # куда пишется следующий отрезок
+        self.count = 0  # сколько отрезков в кольце
+
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+        # Мс по именам за последние кадры (строка - кадр) и текущий кадр
+        self.frames = np.zeros((history, MAX_SCOPES), dtype=np.float32)
+        self.frame_index = 0  # сколько кадров записано
+        self.current = [0.0] * MAX_SCOPES
+
+        # Открытая область и последняя отметка
+        self.scope = -1
+        self.scope_start = 0.0
+        self.mark = 0.0
+
+        # Оверлей: фон, линия бюджета, курсор и столбики (по столбику на строку frames)
+        self.sprite_list = arcade.SpriteList()
+        width = history * BAR_WIDTH
+        self._place(self._rect(GRAPH_BACK_COLOR), GRAPH_MARGIN, GRAPH_MARGIN, width, GRAPH_HEIGHT)
+        self._place(self._rect(BUDGET_COLOR), GRAPH_MARGIN, GRAPH_MARGIN + BUDGET_MS * GRAPH_HEIGHT / GRAPH_MS,
+                    width, 1)
+        self.cursor = self._rect(CURSOR_COLOR)
+        self.columns: List[List[arcade.SpriteSolidColor]] = [[] for _ in range(history)]
+        self.drawn_frame = 0  # до какого кадра столбики переписаны
+        # Подписи рисуются одним вызовом через общий пакет
+        self.label_batch = pyglet.graphics.Batch()
+        self.labels: List[arcade.Text] = []
+        self.labels_frame = -LABELS_REFRESH
+
+    def toggle(self) -> bool:
+        """Включить/выключить профайлер (при включении история очищается)"""
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.clear()
+        return self.enabled
+
+    def clear(self):
+        self.head = self.count = 0
+        self.frames.fill(0)
+        self.frame_index = 0
+        self.current = [0.0] * MAX_SCOPES
+        self.scope = -1
+        for column in self.columns:
+            for sprite in column:
+                sprite.visible = False
+        self.drawn_frame = 0
+        self.labels_frame = -LABELS_REFRESH
+
+    def _id(self, name: str) -> int:
+        scope = self.ids.get(name)
+        if scope is None:
+            if len(self.names) >= MAX_SCOPES:
+                raise ValueError(f"Слишком много имён в профайлере (больше {MAX_SCOPES})")
+            scope = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return scope
+
+    def _record(self, scope: int, start: float, end: float):
+        self.scopes[self.head] = scope
+        self.spans[self.head] = start, end
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    # === ОТМЕТКИ ===
+
+    def frame(self):
+        """Начало кадра: суммы прошлого кадра уходят в историю"""
+        if not self.enabled:
+            return
+        self.frames[self.frame_index % len(self.frames)] = self.current
+        self.frame_index += 1
+        self.current = [0.0] * MAX_SCOPES
+
+    def begin(self, name: str):
+        """Открыть область (update, draw); отметки дальше отсчитываются от неё"""
+        if not self.enabled:
+            return
+        self.scope = self._id(name)
+        self.scope_start = self.mark = time.perf_counter()
+
+    def lap(self, name: str):
+        """Отрезок от предыдущей отметки до сейчас - под именем name"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        scope = self._id(name)
+        self._record(scope, self.mark, now)
+        self.current[scope] += (now - self.mark) * 1000
+        self.mark = now
+
+    def end(self):
+        """Закрыть область"""
+        if not self.enabled or self.scope < 0:
+            return
+        self._record(self.scope, self.scope_start, time.perf_counter())
+        self.scope = -1
+
+    # === ТРАССА ===
+
+    def trace(self, seconds: float = TRACE_SECONDS) -> Dict:
+        """Последние seconds секунд в формате Chrome trace (время в мкс)"""
+        order = np.arange(self.head - self.count, self.head) % self.capacity
+        scopes, spans = self.scopes[order], self.spans[order]
+        if len(spans):
+            recent = spans[:, 1] >= spans[-1, 1] - seconds
+            scopes, spans = scopes[recent], spans[recent]
+        origin = spans[0, 0] if len(spans) else 0.0
+        events = [{"name": self.names[scope], "cat": "game", "ph": "X", "pid": os.getpid(), "tid": 1,
+                   "ts": round((start - origin) * 1e6, 3), "dur": round((end - start) * 1e6, 3)}
+                  for scope, (start, end) in zip(scopes.tolist(), spans.tolist())]
+        # Внешние области раньше вложенных при равном начале
+        events.sort(key=lambda event: (event["ts"], -event["dur"]))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, seconds: float = TRACE_SECONDS, directory: str = PROFILE_DIR) -> Optional[str]:
+        """Сохранить трассу последних seconds секунд; возвращает путь файла"""
+        if not self.count:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("trace_%Y%m%d_%H%M%S.json"))
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.trace(seconds), file)
+        return path
+
+    # === ОВЕРЛЕЙ ===
+
+    def averages(self) -> Dict[str, float]:
+        """Среднее время систем за кадр (мс) по истории"""
+        frames = min(self.frame_index, len(self.frames))
+        if not frames:
+            return {}
+        means = self.frames[:frames].mean(axis=0)
+        return {name: float(means[scope]) for scope, name in enumerate(self.names) if means[scope] > 0}
+
+    def _rect(self, color) -> arcade.SpriteSolidColor:
+        sprite = arcade.SpriteSolidColor(1, 1, color=arcade.color.WHITE)
+        sprite.color = color
+        self.sprite_list.append(sprite)
+        return sprite
+
+    @staticmethod
+    def _place(sprite: arcade.SpriteSolidColor, left: float, bottom: float, width: float, height: float):
+        sprite.width = width
+        sprite.height = height
+        sprite.position = (left + width / 2, bottom + height / 2)
+
+    def _set_column(self, column: int):
+        """Переписать столбик: отрезки систем снизу вверх, лишние прячутся"""
+        x = GRAPH_MARGIN + column * BAR_WIDTH
+        top = GRAPH_MARGIN + GRAPH_HEIGHT
+        y = GRAPH_MARGIN
+        sprites = self.columns[column]
+        for scope, ms in enumerate(self.frames[column, :len(self.names)].tolist()):
+            while len(sprites) <= scope:
+                sprites.append(self._rect(SCOPE_COLORS[len(sprites) % len(SCOPE_COLORS)]))
+            sprite = sprites[scope]
+            height = min(ms * GRAPH_HEIGHT / GRAPH_MS, top - y)
+            if height <= 0:
+                sprite.visible = False
+                continue
+            sprite.visible = True
+            self._place(sprite, x, y, BAR_WIDTH, height)
+            y += height
+
+    def _update_labels(self):
+        """Подписи: кадр целиком и среднее время каждой системы"""
+        averages = self.averages()
+        lines = [(f"кадр {sum(averages.values()):.2f} мс", (255, 255, 255, 255))]
+        lines += [(f"{name} {ms:.2f} мс", SCOPE_COLORS[self.ids[name] % len(SCOPE_COLORS)])
+                  for name, ms in averages.items()]
+        while len(self.labels) < len(lines):
+            self.labels.append(arcade.Text("", 0, 0, font_size=9, batch=self.label_batch))
+        # Столбцом справа от графика снизу вверх, кадр целиком - верхней строкой
+        x = GRAPH_MARGIN + len(self.columns) * BAR_WIDTH + 6
+        for i, label in enumerate(self.labels):
+            text, color = lines[i] if i < len(lines) else ("", (0, 0, 0, 0))
+            if label.text != text:
+                label.text = text
+            label.color = color
+            label.position = (x, GRAPH_MARGIN + 12 * (len(lines) - 1 - i) + 2)
+        self.labels_frame = self.frame_index
+
+    def draw(self):
+        """Нарисовать график в левом нижнем углу (в координатах экрана)"""
+        if not self.enabled:
+            return
+        history = len(self.columns)
+        for frame in range(max(self.drawn_frame, self.frame_index - history), self.frame_index):
+            self._set_column(frame % history)
+        self.drawn_frame = self.frame_index
+        self._place(self.cursor, GRAPH_MARGIN + (self.frame_index % history) * BAR_WIDTH, GRAPH_MARGIN,
+                    1, GRAPH_HEIGHT)
+        if self.frame_index - self.labels_frame >= LABELS_REFRESH:
+            self._update_labels()
+
+        self.sprite_list.draw()
+        self.label_batch.draw()
+
+    def get_info(self) -> Dict[str, float]:
+        return {
+            "enabled": self.enabled,
+            "events": self.count,
+            "capacity": self.capacity,
+            "frames": self.frame_index,
+            "scopes": len(self.names),
+        }
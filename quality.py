@@ -0,0 +1,192 @@
+# quality.py
+"""
+Адаптивное качество графики и звука.
+
+Контроллер копит время кадров в скользящем окне и сравнивает среднее
+с целевым бюджетом (по умолчанию 16.6 мс = 60 FPS):
+- если кадры стабильно дороже бюджета, качество понижается на одну ступень;
+- если кадры стабильно заметно дешевле бюджета, качество повышается.
+
+Пороги понижения и повышения разные, а после каждого переключения окно
+очищается и выдерживается пауза - так качество не «дрожит» между уровнями.
+"""
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# Ступени качества от самой дешёвой к самой дорогой
+QUALITY_LEVELS: List[Dict[str, Any]] = [
+    {
+        "name": "Минимальное",
+        "render_scale": 0.5,  # доля разрешения окна для слоя мира
+        "particle_burst_scale": 0.25,  # доля частиц во взрыве
+        "max_particles": 150,  # сколько частиц может жить одновременно
+        "max_bursts_per_frame": 3,  # сколько взрывов принимаем за кадр
+        "bullet_visuals": False,  # рисовать ли пули
+        "sound_voices": 4,  # сколько звуков может звучать одновременно
+        "draw_offscreen": False,  # эффекты за пределами экрана (спрайты за краем отсекает GPU)
+    },
+    {
+        "name": "Низкое",
+        "render_scale": 0.75,
+        "particle_burst_scale": 0.5,
+        "max_particles": 300,
+        "max_bursts_per_frame": 6,
+        "bullet_visuals": False,
+        "sound_voices": 8,
+        "draw_offscreen": False,
+    },
+    {
+        "name": "Среднее",
+        "render_scale": 1.0,
+        "particle_burst_scale": 0.75,
+        "max_particles": 450,
+        "max_bursts_per_frame": 9,
+        "bullet_visuals": True,
+        "sound_voices": 12,
+        "draw_offscreen": False,
+    },
+    {
+        "name": "Высокое",
+        "render_scale": 1.0,
+        "particle_burst_scale": 1.0,
+        "max_particles": 600,
+        "max_bursts_per_frame": 12,
+        "bullet_visuals": True,
+        "sound_voices": 16,
+        "draw_offscreen": True,
+    },
+]
+
+TARGET_FRAME_MS = 16.6  # бюджет кадра (60 FPS)
+
+# Печатать переключения ступеней (для отладки; журнал всегда в get_info())
+LOG_SWITCHES = False
+
+
+class QualityController:
+    """Переключает ступени качества по скользящему среднему времени кадра"""
+
+    def __init__(
+            self,
+            target_ms: float = TARGET_FRAME_MS,
+            window: int = 60,
+            downgrade_ratio: float = 1.15,
+            upgrade_ratio: float = 0.7,
+            cooldown: float = 2.0,
+            upgrade_hold: float = 5.0,
+            start_level: Optional[int] = None
+    ):
+        """
+        target_ms: бюджет кадра в миллисекундах
+        window: сколько последних кадров усредняем
+        downgrade_ratio: понижаем качество, если среднее > target_ms * downgrade_ratio
+        upgrade_ratio: повышаем, если среднее < target_ms * upgrade_ratio ...
+        upgrade_hold: ... непрерывно в течение стольких секунд
+        cooldown: пауза после любого переключения, секунд
+        start_level: начальная ступень (по умолчанию самая высокая)
+        """
+        self.target_ms = target_ms
+        self.downgrade_ms = target_ms * downgrade_ratio
+        self.upgrade_ms = target_ms * upgrade_ratio
+        self.cooldown = cooldown
+        self.upgrade_hold = upgrade_hold
+        self.enabled = True
+
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.samples_sum = 0.0
+        self.level = len(QUALITY_LEVELS) - 1 if start_level is None else start_level
+        self.cooldown_left = 0.0
+        self.fast_time = 0.0  # сколько секунд подряд кадры были дешёвыми
+        self.last_record = None  # момент предыдущего record() (perf_counter)
+
+        # Журнал переключений для логов
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Настройки текущей ступени"""
+        return QUALITY_LEVELS[self.level]
+
+    @property
+    def average_ms(self) -> float:
+        """Среднее время кадра в окне, мс"""
+        return self.samples_sum / len(self.samples) if self.samples else 0.0
+
+    def record(self, frame_ms: float, elapsed: Optional[float] = None) -> bool:
+        """
+        Учесть время очередного кадра (в миллисекундах).
+        elapsed - сколько реальных секунд прошло с прошлого кадра
+        (по умолчанию меряется по часам). Паузы и выдержка считаются по нему.
+        Возвращает True, если ступень качества изменилась.
+        """
+        now = time.perf_counter()
+        if elapsed is None:
+            elapsed = now - self.last_record if self.last_record is not None else frame_ms / 1000
+        self.last_record = now
+
+        if len(self.samples) == self.samples.maxlen:
+            self.samples_sum -= self.samples[0]
+        self.samples.append(frame_ms)
+        self.samples_sum += frame_ms
+
+        if not self.enabled:
+            return False
+
+        if self.cooldown_left > 0:
+            self.cooldown_left -= elapsed
+            return False
+        if len(self.samples) < self.samples.maxlen:
+            return False
+
+        average = self.average_ms
+        if average > self.downgrade_ms and self.level > 0:
+            return self._switch(self.level - 1, average, "кадр дороже бюджета")
+
+        if average < self.upgrade_ms:
+            self.fast_time += elapsed
+            if self.fast_time >= self.upgrade_hold and self.level < len(QUALITY_LEVELS) - 1:
+                return self._switch(self.level + 1, average, "есть запас по времени кадра")
+        else:
+            self.fast_time = 0.0
+        return False
+
+    def set_level(self, level: int, reason: str = "вручную") -> bool:
+        """Принудительно выставить ступень"""
+        level = max(0, min(len(QUALITY_LEVELS) - 1, level))
+        if level == self.level:
+            return False
+        return self._switch(level, self.average_ms, reason)
+
+    def _switch(self, level: int, average: float, reason: str) -> bool:
+        """Переключение ступени с записью в журнал"""
+        decision = {
+            "time": time.time(),
+            "from": QUALITY_LEVELS[self.level]["name"],
+            "to": QUALITY_LEVELS[level]["name"],
+            "average_ms": round(average, 2),
+            "target_ms": self.target_ms,
+            "reason": reason,
+        }
+        self.decisions.append(decision)
+        if LOG_SWITCHES:
+            print(f"Качество: {decision['from']} -> {decision['to']} "
+                  f"({decision['average_ms']} мс при бюджете {self.target_ms} мс, {reason})")
+
+        self.level = level
+        self.samples.clear()
+        self.samples_sum = 0.0
+        self.fast_time = 0.0
+        self.cooldown_left = self.cooldown
+        return True
+
+    def get_info(self) -> Dict[str, Any]:
+        """Информация для логов и отладочного вывода"""
+        return {
+            "level": self.level,
+            "name": self.settings["name"],
+            "average_ms": round(self.average_ms, 2),
+            "target_ms": self.target_ms,
+            "enabled": self.enabled,
+            "decisions": list(self.decisions),
+        }
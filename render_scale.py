@@ -0,0 +1,129 @@
+# render_scale.py
+"""
+Отрисовка мира в уменьшенном разрешении.
+
+Слой мира (всё, что рисуется через world_camera) рисуется во внеэкранный
+буфер размером scale * размер окна, а затем растягивается на весь экран
+одним прямоугольником. Слой gui_camera рисуется поверх уже в родном
+разрешении. Стоимость заливки пикселей падает примерно как scale²,
+что заметно на слабых встроенных видеокартах и программном OpenGL.
+
+При scale = 1.0 буфер не используется и мир рисуется прямо на экран.
+"""
+from typing import Optional
+
+import arcade
+from arcade.camera import Camera2D
+from arcade.gl import geometry
+from arcade.types import LBWH
+
+# Масштаб по умолчанию (если адаптивное качество выключено, остаётся таким)
+DEFAULT_RENDER_SCALE = 1.0
+
+# Допустимый диапазон масштаба
+MIN_RENDER_SCALE = 0.5
+MAX_RENDER_SCALE = 1.0
+
+# Фильтр растягивания: "nearest" (чёткие пиксели) или "linear" (сглаживание)
+DEFAULT_RENDER_FILTER = "nearest"
+
+
+class WorldRenderTarget:
+    """Внеэкранный буфер для слоя мира с настраиваемым масштабом"""
+
+    def __init__(self, window: arcade.Window, scale: float = DEFAULT_RENDER_SCALE,
+                 upscale_filter: str = DEFAULT_RENDER_FILTER):
+        """
+        window: окно игры
+        scale: доля размера окна (от MIN_RENDER_SCALE до MAX_RENDER_SCALE)
+        upscale_filter: "nearest" или "linear"
+        """
+        self.window = window
+        self.ctx = window.ctx
+        self.scale = 1.0
+        self.upscale_filter = upscale_filter
+
+        self.texture = None
+        self.framebuffer = None
+        self.camera: Optional[Camera2D] = None
+        self.quad = geometry.quad_2d_fs()
+        self.active = False  # идёт ли сейчас отрисовка в буфер
+
+        self.set_scale(scale)
+
+    @property
+    def enabled(self) -> bool:
+        """Используется ли буфер (масштаб меньше 1)"""
+        return self.scale < MAX_RENDER_SCALE
+
+    def set_scale(self, scale: float):
+        """Изменить масштаб; буфер пересоздаётся только при изменении размера"""
+        scale = max(MIN_RENDER_SCALE, min(MAX_RENDER_SCALE, scale))
+        if scale == self.scale and (self.framebuffer is not None or not self.enabled):
+            return
+        self.scale = scale
+        self._rebuild()
+
+    def set_filter(self, upscale_filter: str):
+        """Сменить фильтр растягивания ("nearest" или "linear")"""
+        self.upscale_filter = upscale_filter
+        if self.texture is not None:
+            self.texture.filter = self._gl_filter()
+
+    def on_resize(self):
+        """Вызывать при изменении размера окна"""
+        self._rebuild()
+
+    def _gl_filter(self):
+        if self.upscale_filter == "linear":
+            return self.ctx.LINEAR, self.ctx.LINEAR
+        return self.ctx.NEAREST, self.ctx.NEAREST
+
+    def _size(self):
+        width, height = self.window.get_framebuffer_size()
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
+
+    def _rebuild(self):
+        """Пересоздать буфер под текущий масштаб и размер окна"""
+        self.texture = None
+        self.framebuffer = None
+        self.camera = None
+        if not self.enabled:
+            return
+
+        width, height = self._size()
+        self.texture = self.ctx.texture((width, height), filter=self._gl_filter())
+        self.framebuffer = self.ctx.framebuffer(color_attachments=[self.texture])
+        self.camera = Camera2D(
+            viewport=LBWH(0, 0, width, height),
+            render_target=self.framebuffer,
+            window=self.window
+        )
+
+    def use(self, world_camera: Camera2D):
+        """
+        Начать отрисовку слоя мира.
+        Вызывается вместо world_camera.use(); после мира нужен finish().
+        """
+        if not self.enabled:
+            world_camera.use()
+            return
+
+        # Внутренняя камера видит ту же область мира, что и world_camera,
+        # но выводит её в буфер меньшего размера
+        self.camera.zoom = world_camera.zoom
+        self.camera.projection = world_camera.projection
+        self.camera.position = world_camera.position
+        self.camera.use()
+        self.framebuffer.clear(color=self.window.background_color)
+        self.active = True
+
+    def finish(self):
+        """Закончить слой мира и растянуть буфер на экран"""
+        if not self.active:
+            return
+        self.active = False
+
+        self.ctx.screen.use()
+        self.texture.use(0)
+        self.quad.render(self.ctx.utility_textured_quad_program)
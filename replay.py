@@ -0,0 +1,191 @@
+# replay.py
+"""
+Запись ввода и точный повтор захода на уровень.
+
+Мир детерминирован, если известны зерно уровня (rng.py), шаг времени
+каждого кадра и ввод. Всё это и пишет InputRecorder:
+- dt - delta_time каждого вызова on_update (кадр = тик);
+- events - нажатия/отпускания клавиш и клики мыши с номером тика,
+  перед которым они пришли: [тик, вид, аргументы...];
+- hashes - раз в REPLAY_HASH_EVERY тиков хэш мира (по snapshot.capture_world),
+  по ним повтор находит первый тик, где мир пошёл иначе.
+Если заход начался с загрузки сохранения, в запись кладётся и сам снимок.
+
+Запись сохраняется в REPLAY_DIR (gzip + JSON) в конце уровня.
+replay() прогоняет запись на GameView без отрисовки с максимальной
+скоростью; из командной строки - run_replay.py. Меню паузы (кнопки
+интерфейса) в запись не попадает - только игровой ввод.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import arcade
+
+from snapshot import capture_world, decode, restore_world
+
+REPLAY_VERSION = 1
+
+# Куда сохранять записи
+REPLAY_DIR = "replays"
+REPLAY_SUFFIX = ".replay.json.gz"
+
+# Раз в сколько тиков записывать хэш мира
+REPLAY_HASH_EVERY = 60
+
+# Вид события -> метод GameView
+EVENT_HANDLERS = {
+    "key_press": "on_key_press",
+    "key_release": "on_key_release",
+    "mouse_press": "on_mouse_press",
+}
+
+
+def world_hash(view) -> str:
+    """Хэш состояния мира (здания, склады, дроны, жуки, игрок, счётчики)"""
+    snapshot = capture_world(view)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(snapshot.meta, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for name in sorted(snapshot.arrays):
+        digest.update(name.encode("utf-8"))
+        digest.update(snapshot.arrays[name].tobytes())
+    return digest.hexdigest()
+
+
+class InputRecorder:
+    """Запись тиков, ввода и хэшей мира одного захода на уровень"""
+
+    def __init__(self, hash_every: int = REPLAY_HASH_EVERY):
+        self.hash_every = hash_every
+        self.enabled = True  # при повторе записи выключается
+        self.header: Dict[str, Any] = {}
+        self.dts: List[float] = []
+        self.events: List[List] = []
+        self.hashes: List[Tuple[int, str]] = []
+        self.session: Optional[str] = None
+        self.dirty = False
+
+    def start(self, session: str, level: int, seed: int, window_size: Tuple[int, int]):
+        """Новая запись (прошлая сохраняется, если не была)"""
+        if self.dirty:
+            self.save()
+        self.session = session
+        self.header = {"level": level, "seed": seed, "window": list(window_size), "snapshot": None}
+        self.dts = []
+        self.events = []
+        self.hashes = []
+        self.dirty = False
+
+    def set_snapshot(self, data: bytes):
+        """Заход начался с загруженного сохранения (закодированный снимок)"""
+        self.header["snapshot"] = base64.b64encode(data).decode("ascii")
+
+    # === ЗАПИСЬ ===
+
+    @property
+    def ticks(self) -> int:
+        return len(self.dts)
+
+    def event(self, kind: str, *args):
+        """Ввод: сработает перед следующим тиком"""
+        if self.enabled and self.session is not None:
+            self.events.append([self.ticks, kind, *args])
+
+    def update(self, view, delta_time: float):
+        """В начале on_update: хэш мира (раз в hash_every тиков) и шаг времени"""
+        if not self.enabled or self.session is None:
+            return
+        tick = self.ticks
+        if tick and tick % self.hash_every == 0:
+            self.hashes.append((tick, world_hash(view)))
+        self.dts.append(delta_time)
+        self.dirty = True
+
+    # === ФАЙЛ ===
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": REPLAY_VERSION, **self.header, "hash_every": self.hash_every,
+                "dt": self.dts, "events": self.events, "hashes": self.hashes}
+
+    def save(self, directory: str = REPLAY_DIR) -> Optional[str]:
+        """Сохранить запись; возвращает путь файла"""
+        if self.session is None or not self.dts:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.session + REPLAY_SUFFIX)
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False)
+        self.dirty = False
+        return path
+
+
+def load_replay(path: str) -> Dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        record = json.load(file)
+    if record.get("version") != REPLAY_VERSION:
+        raise ValueError(f"Неизвестная версия записи: {record.get('version')}")
+    return record
+
+
+class ReplayResult(NamedTuple):
+    ticks: int
+    game_time: float
+    wall_seconds: float
+    hashes_checked: int
+    divergence: Optional[Tuple[int, str, str]]  # (тик, ожидалось, получилось)
+
+
+def uses_rewind(record: Dict[str, Any]) -> bool:
+    """Нажимали ли в записи перемотку (Backspace)"""
+    return any(event[1] == "key_press" and event[2] == arcade.key.BACKSPACE for event in record["events"])
+
+
+def replay(view, record: Dict[str, Any], check: bool = True) -> ReplayResult:
+    """
+    Повторить запись на GameView (окно того же размера), без отрисовки.
+    Останавливается на конце записи, на первом расхождении хэшей
+    или когда уровень закончился (окно показывает другой View).
+    """
+    # Повтор не пишет ничего на диск: ни сохранений, ни телеметрии, ни новой записи.
+    # Снимки для перемотки нужны, только если в записи перематывали
+    was_offline = view.set_offline(True)
+    view.rewind.enabled = uses_rewind(record)
+    try:
+        view.start_level(record["level"], seed=record["seed"])
+        if record["snapshot"]:
+            restore_world(view, decode(base64.b64decode(record["snapshot"])))
+        view.window.show_view(view)
+
+        events: Dict[int, List[List]] = {}
+        for event in record["events"]:
+            events.setdefault(event[0], []).append(event)
+        hashes = dict(map(tuple, record["hashes"])) if check else {}
+
+        checked = 0
+        divergence = None
+        start = time.perf_counter()
+        tick = 0
+        for tick, delta_time in enumerate(record["dt"]):
+            for _, kind, *args in events.get(tick, ()):
+                getattr(view, EVENT_HANDLERS[kind])(*args)
+            expected = hashes.get(tick)
+            if expected is not None:
+                actual = world_hash(view)
+                checked += 1
+                if actual != expected:
+                    divergence = (tick, expected, actual)
+                    break
+            view.on_update(delta_time)
+            if view.window.current_view is not view:
+                tick += 1
+                break
+        else:
+            tick = len(record["dt"])
+        wall = time.perf_counter() - start
+        return ReplayResult(tick, view.game_time, wall, checked, divergence)
+    finally:
+        view.set_offline(was_offline)
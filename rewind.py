@@ -0,0 +1,243 @@
+# rewind.py
+"""
+Перемотка мира назад (откат неудачной волны или случайного сноса).
+
+Кольцевой буфер хранит последние REWIND_SECONDS секунд игры: раз в
+REWIND_INTERVAL секунд снимается мир (snapshot.capture_world), но целиком
+в буфер кладётся только каждый REWIND_KEYFRAME_EVERY-й снимок (ключевой
+кадр). Остальные кадры - разница с предыдущим снимком:
+- для массивов той же длины - номера изменившихся строк и их значения:
+  у записей (позиции, здоровье, таймеры) отдельно по каждому полю - за
+  кадр у здания обычно меняется один таймер, а не вся запись; у складов -
+  строки матрицы целиком;
+- если число объектов изменилось (построили, снесли, появились жуки) -
+  массив целиком, он маленький.
+Кадр восстанавливается так: ближайший ключевой кадр до него и все
+разницы после ключевого по порядку.
+
+Память ограничена REWIND_MEMORY_BUDGET байт: когда буфер выходит за бюджет
+или за окно времени, удаляется самая старая группа (ключевой кадр и его
+разницы). Сколько занято - get_info().
+"""
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+from snapshot import Snapshot, capture_world, restore_world
+
+# Сколько секунд игры можно отмотать
+REWIND_SECONDS = 30.0
+
+# Как часто снимать мир (секунд игры)
+REWIND_INTERVAL = 0.5
+
+# Каждый такой кадр хранится целиком, остальные - разницей
+REWIND_KEYFRAME_EVERY = 10
+
+# На сколько секунд отматывает одно нажатие клавиши перемотки
+REWIND_STEP = 5.0
+
+# Потолок памяти буфера (байт)
+REWIND_MEMORY_BUDGET = 8 * 1024 * 1024
+
+# Разница массива: ("full", массив), ("rows", номера строк, строки)
+# или ("fields", {поле: (номера строк, значения)})
+Change = Tuple
+
+
+class Frame:
+    """Кадр буфера: ключевой (arrays) или разница с предыдущим (changes)"""
+
+    __slots__ = ("time", "meta", "arrays", "changes", "nbytes")
+
+    def __init__(self, time: float, meta: Dict, arrays: Optional[Dict[str, np.ndarray]] = None,
+                 changes: Optional[Dict[str, Change]] = None):
+        self.time = time
+        self.meta = meta
+        self.arrays = arrays
+        self.changes = changes
+        if arrays is not None:
+            self.nbytes = sum(array.nbytes for array in arrays.values())
+        else:
+            self.nbytes = sum(change_nbytes(change) for change in changes.values())
+
+    @property
+    def keyframe(self) -> bool:
+        return self.arrays is not None
+
+
+def diff(previous: np.ndarray, current: np.ndarray) -> Optional[Change]:
+    """Разница двух снимков массива (None - ничего не изменилось)"""
+    if previous.shape != current.shape or previous.dtype != current.dtype:
+        return ("full", current)
+    if current.dtype.names:
+        fields = {}
+        for name in current.dtype.names:
+            rows = np.flatnonzero(current[name] != previous[name]).astype(np.int32)
+            if len(rows):
+                fields[name] = (rows, current[name][rows])
+        return ("fields", fields) if fields else None
+    rows = np.flatnonzero((current != previous).any(axis=1)).astype(np.int32)
+    if not len(rows):
+        return None
+    return ("rows", rows, current[rows])
+
+
+def apply(array: np.ndarray, change: Change) -> np.ndarray:
+    """Применить разницу к массиву (массив ключевого кадра не меняется)"""
+    if change[0] == "full":
+        return change[1]
+    array = array.copy()
+    if change[0] == "fields":
+        for name, (rows, values) in change[1].items():
+            array[name][rows] = values
+    else:
+        array[change[1]] = change[2]
+    return array
+
+
+def change_nbytes(change: Change) -> int:
+    if change[0] == "fields":
+        return sum(rows.nbytes + values.nbytes for rows, values in change[1].values())
+    return sum(part.nbytes for part in change[1:])
+
+
+class RewindBuffer:
+    """Кольцевой буфер снимков мира с ограничением по времени и памяти"""
+
+    def __init__(self, seconds: float = REWIND_SECONDS, interval: float = REWIND_INTERVAL,
+                 keyframe_every: int = REWIND_KEYFRAME_EVERY,
+                 memory_budget: int = REWIND_MEMORY_BUDGET):
+        self.seconds = seconds
+        self.interval = interval
+        self.keyframe_every = keyframe_every
+        self.memory_budget = memory_budget
+        self.enabled = True  # без записи на диск (GameView.set_offline) выключается
+        self.frames: Deque[Frame] = deque()
+        self.nbytes = 0
+        self.last: Optional[Snapshot] = None  # последний снимок целиком (с ним сравниваем)
+        self.since_keyframe = 0
+        self.timer = 0.0
+
+        # Счётчики для отладки
+        self.captures = 0
+        self.capture_ms = 0.0  # время последнего снимка
+        self.evicted = 0
+
+    def clear(self):
+        """Забыть историю (новый уровень, загрузка сохранения)"""
+        self.frames.clear()
+        self.nbytes = 0
+        self.last = None
+        self.since_keyframe = 0
+        self.timer = 0.0
+
+    # === ЗАПИСЬ ===
+
+    def update(self, view, delta_time: float) -> bool:
+        """Раз в кадр: снять мир, если подошло время. Возвращает, был ли снимок"""
+        if not self.enabled:
+            return False
+        self.timer += delta_time
+        if self.timer < self.interval:
+            return False
+        self.timer = 0.0
+        start = time.perf_counter()
+        self.record(capture_world(view))
+        self.capture_ms = (time.perf_counter() - start) * 1000
+        return True
+
+    def record(self, snapshot: Snapshot):
+        """Добавить снимок в буфер (ключевым кадром или разницей)"""
+        now = snapshot.meta["game_time"]
+        if self.last is None or self.since_keyframe + 1 >= self.keyframe_every:
+            frame = Frame(now, snapshot.meta, arrays=snapshot.arrays)
+            self.since_keyframe = 0
+        else:
+            changes = {}
+            for name, array in snapshot.arrays.items():
+                change = diff(self.last.arrays[name], array)
+                if change is not None:
+                    changes[name] = change
+            frame = Frame(now, snapshot.meta, changes=changes)
+            self.since_keyframe += 1
+        self.frames.append(frame)
+        self.nbytes += frame.nbytes
+        self.last = snapshot
+        self.captures += 1
+        self._evict(now)
+
+    def _evict(self, now: float):
+        """Удалить самые старые группы кадров, пока буфер не влезет в окно и бюджет"""
+        while self.frames:
+            # Последнюю группу (с текущим ключевым кадром) не трогаем
+            first_group = 1
+            while first_group < len(self.frames) and not self.frames[first_group].keyframe:
+                first_group += 1
+            if first_group == len(self.frames):
+                return
+            too_old = now - self.frames[first_group].time > self.seconds
+            if not too_old and self.nbytes <= self.memory_budget:
+                return
+            for _ in range(first_group):
+                self.nbytes -= self.frames.popleft().nbytes
+                self.evicted += 1
+
+    # === ПЕРЕМОТКА ===
+
+    def available(self) -> float:
+        """Насколько секунд можно отмотать"""
+        if not self.frames:
+            return 0.0
+        return self.frames[-1].time - self.frames[0].time
+
+    def snapshot_at(self, index: int) -> Snapshot:
+        """Собрать снимок кадра index: ключевой кадр до него плюс разницы"""
+        start = index
+        while not self.frames[start].keyframe:
+            start -= 1
+        arrays = dict(self.frames[start].arrays)
+        for position in range(start + 1, index + 1):
+            for name, change in self.frames[position].changes.items():
+                arrays[name] = apply(arrays[name], change)
+        return Snapshot(self.frames[index].meta, arrays)
+
+    def rewind(self, view, seconds: float) -> bool:
+        """
+        Вернуть мир на seconds секунд назад (или к самому старому кадру).
+        Кадры после точки возврата удаляются. Возвращает, была ли перемотка.
+        """
+        if not self.frames:
+            return False
+        target = self.frames[-1].time - seconds
+        index = len(self.frames) - 1
+        while index > 0 and self.frames[index].time > target:
+            index -= 1
+        snapshot = self.snapshot_at(index)
+
+        while len(self.frames) > index + 1:
+            self.nbytes -= self.frames.pop().nbytes
+        self.last = snapshot
+        self.since_keyframe = 0
+        while not self.frames[index - self.since_keyframe].keyframe:
+            self.since_keyframe += 1
+        self.timer = 0.0
+
+        restore_world(view, snapshot)
+        return True
+
+    # === ОТЛАДКА ===
+
+    def get_info(self) -> Dict[str, float]:
+        return {
+            "frames": len(self.frames),
+            "keyframes": sum(1 for frame in self.frames if frame.keyframe),
+            "seconds": self.available(),
+            "bytes": self.nbytes,
+            "budget": self.memory_budget,
+            "captures": self.captures,
+            "capture_ms": self.capture_ms,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,43 @@
+# rng.py
+"""
+Генераторы случайных чисел по подсистемам.
+
+У каждой подсистемы свой random.Random (см. STREAMS), все они выводятся
+из одного зерна уровня. Так случайность, от которой зависит мир (точки
+появления жуков, кремний из ядра), не сбивается случайностью, которая
+зависит от настроек и экрана (частицы взрывов рисуются не всегда,
+звуки - не на всех машинах): с тем же зерном и тем же вводом мир
+проходит ровно тот же путь. На этом держится повтор записей (replay.py).
+"""
+import random
+from typing import Optional
+
+# Подсистемы: мир (waves, core) и оформление (particles, audio)
+STREAMS = ("waves", "core", "particles", "audio")
+
+
+class RandomStreams:
+    """Набор генераторов по подсистемам: RNG.waves, RNG.core, ..."""
+
+    waves: random.Random
+    core: random.Random
+    particles: random.Random
+    audio: random.Random
+
+    def __init__(self, seed: Optional[int] = None):
+        self.current_seed = 0
+        self.seed(seed)
+
+    def seed(self, seed: Optional[int] = None) -> int:
+        """Пересоздать все генераторы из зерна (None - случайное). Возвращает зерно"""
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.current_seed = seed
+        for name in STREAMS:
+            # Строка в зерне хэшируется (sha512) - потоки не пересекаются
+            setattr(self, name, random.Random(f"{seed}:{name}"))
+        return seed
+
+
+# Общие генераторы процесса
+RNG = RandomStreams()
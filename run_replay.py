@@ -0,0 +1,62 @@
+# run_replay.py
+"""
+Повтор записанного захода на уровень (replay.py) без отрисовки.
+
+Запись прогоняется на скрытом окне того же размера с максимальной
+скоростью: тик за тиком с записанными шагами времени и вводом. По
+хэшам мира проверяется, что повтор идёт так же, как игра; при первом
+расхождении печатается тик и скрипт завершается с кодом 1.
+
+Так любую запись можно использовать как точную нагрузку для замеров
+(--repeat) и как регрессионный тест.
+
+Запуск:
+    python run_replay.py replays/level1_....replay.json.gz
+    python run_replay.py ЗАПИСЬ --repeat 5     # замер: медиана по 5 прогонам
+    python run_replay.py ЗАПИСЬ --no-check     # без сверки хэшей
+"""
+import argparse
+import statistics
+import sys
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="файл записи (.replay.json.gz)")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз прогнать запись")
+    parser.add_argument("--no-check", action="store_true", help="не сверять хэши мира")
+    args = parser.parse_args(argv)
+
+    # Окно не нужно показывать
+    import headless
+    headless.prepare()
+    import arcade
+    from replay import load_replay, replay
+
+    record = load_replay(args.path)
+    width, height = record["window"]
+    window = arcade.Window(width, height, "replay", visible=False)
+
+    from game import GameView
+    view = GameView.for_window(window, record["level"], offline=True)
+
+    walls = []
+    for run in range(args.repeat):
+        result = replay(view, record, check=not args.no_check)
+        walls.append(result.wall_seconds)
+        speed = result.game_time / result.wall_seconds if result.wall_seconds else 0.0
+        print(f"Прогон {run + 1}: {result.ticks}/{len(record['dt'])} тиков, "
+              f"{result.game_time:.1f} с игры за {result.wall_seconds:.2f} с ({speed:.1f}x), "
+              f"хэшей сверено: {result.hashes_checked}")
+        if result.divergence:
+            tick, expected, actual = result.divergence
+            print(f"Расхождение на тике {tick}: ожидался хэш {expected}, получен {actual}")
+            return 1
+
+    if args.repeat > 1:
+        print(f"Медиана: {statistics.median(walls):.3f} с, разброс {min(walls):.3f}-{max(walls):.3f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
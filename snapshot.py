@@ -0,0 +1,423 @@
+# snapshot.py
+"""
+Двоичный снимок мира: сохранения и автосохранение.
+
+Снимок - это несколько упакованных массивов NumPy вместо JSON на каждый
+объект:
+- buildings - записи зданий (тип, позиция, здоровье, таймеры, руда бура);
+- storages  - склады зданий: матрица (здания x ресурсы), int32;
+- drones    - дроны: позиция, здоровье, маршрут (индексы зданий), груз, состояние;
+- bugs      - жуки: тип, позиция, здоровье, перезарядка атаки;
+- player    - игрок: позиция, здоровье, таймеры;
+- meta      - маленький JSON: уровень, время, волна, счётчики и таблицы
+  имён (классы объектов и ресурсы), на которые ссылаются коды в массивах.
+Пули в полёте не сохраняются - они живут доли секунды.
+
+Формат файла (little-endian):
+- заголовок: магия b"FMGSNAP\\0", версия (u16), флаги (u16), число секций (u32);
+- секции: длина имени (u16), имя (utf-8), длина данных (u64), массив в формате .npy.
+Флаг SNAPSHOT_COMPRESSED - всё после заголовка сжато zlib.
+
+Снимок делается в два шага:
+1. capture_world(view) - в основном потоке, быстро: значения полей
+   копируются в новые массивы, дальше живой мир не трогается (то, что
+   у зданий не меняется, берётся из BuildingLayout);
+2. кодирование, сжатие и запись в каталог level.sqlite - в фоновом потоке
+   SnapshotWriter, поэтому автосохранение не даёт рывка кадра.
+Загрузка - это разбор нескольких массивов целиком (decode) и расстановка
+объектов по ним (restore_world).
+"""
+import io
+import json
+import struct
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"FMGSNAP\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_COMPRESSED = 1  # флаг: секции сжаты zlib
+
+HEADER = struct.Struct("<8sHHI")
+NAME_LENGTH = struct.Struct("<H")
+DATA_LENGTH = struct.Struct("<Q")
+
+BUILDING_DTYPE = np.dtype([
+    ("type", "<u2"), ("x", "<f4"), ("y", "<f4"), ("hp", "<f4"),
+    ("production_timer", "<f4"), ("cooldown", "<f4"), ("angle", "<f4"), ("ore", "<i2"),
+])
+BUG_DTYPE = np.dtype([
+    ("type", "<u2"), ("x", "<f4"), ("y", "<f4"), ("hp", "<f4"), ("attack_cooldown", "<f4"),
+])
+DRONE_DTYPE = np.dtype([
+    ("x", "<f4"), ("y", "<f4"), ("hp", "<f4"), ("source", "<i4"), ("destination", "<i4"),
+    ("state", "<u1"), ("cargo", "<i2"), ("target_x", "<f4"), ("target_y", "<f4"),
+])
+PLAYER_DTYPE = np.dtype([
+    ("x", "<f4"), ("y", "<f4"), ("hp", "<f4"), ("respawn_timer", "<f4"),
+    ("invulnerable_timer", "<f4"), ("damage_cooldown", "<f4"),
+])
+
+DRONE_STATES = ["to_source", "loading", "to_dest", "unloading"]
+
+
+class Snapshot:
+    """Снимок мира: метаданные и упакованные массивы"""
+
+    def __init__(self, meta: Dict, arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.arrays = arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+
+# === КОДИРОВАНИЕ ===
+
+def encode(snapshot: Snapshot, compress: bool = True) -> bytes:
+    """Снимок -> байты файла"""
+    sections = dict(snapshot.arrays)
+    sections["meta"] = np.frombuffer(json.dumps(snapshot.meta, ensure_ascii=False).encode("utf-8"),
+                                     dtype=np.uint8)
+    body = io.BytesIO()
+    for name, array in sections.items():
+        payload = io.BytesIO()
+        np.lib.format.write_array(payload, np.ascontiguousarray(array), allow_pickle=False)
+        encoded_name = name.encode("utf-8")
+        body.write(NAME_LENGTH.pack(len(encoded_name)))
+        body.write(encoded_name)
+        body.write(DATA_LENGTH.pack(payload.tell()))
+        body.write(payload.getbuffer())
+
+    data = body.getvalue()
+    flags = 0
+    if compress:
+        data = zlib.compress(data)
+        flags |= SNAPSHOT_COMPRESSED
+    return HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, len(sections)) + data
+
+
+def decode(data: bytes) -> Snapshot:
+    """
+    Байты файла -> снимок (каждый массив читается целиком).
+    Чужие и повреждённые данные (в том числе старые сохранения, перенесённые
+    из таблицы levels) - ValueError.
+    """
+    try:
+        return _decode(data)
+    except (struct.error, zlib.error, KeyError) as e:
+        raise ValueError(f"Снимок повреждён: {e!r}") from e
+
+
+def _decode(data: bytes) -> Snapshot:
+    magic, version, flags, count = HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Это не снимок мира")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+    body = memoryview(data)[HEADER.size:]
+    if flags & SNAPSHOT_COMPRESSED:
+        body = memoryview(zlib.decompress(body))
+
+    arrays = {}
+    position = 0
+    for _ in range(count):
+        (name_length,) = NAME_LENGTH.unpack_from(body, position)
+        position += NAME_LENGTH.size
+        name = bytes(body[position:position + name_length]).decode("utf-8")
+        position += name_length
+        (length,) = DATA_LENGTH.unpack_from(body, position)
+        position += DATA_LENGTH.size
+        payload = io.BytesIO(body[position:position + length])
+        arrays[name] = np.lib.format.read_array(payload, allow_pickle=False)
+        position += length
+
+    meta = json.loads(arrays.pop("meta").tobytes().decode("utf-8"))
+    return Snapshot(meta, arrays)
+
+
+# === СНИМОК ЖИВОГО МИРА ===
+
+class Codes:
+    """Таблицы имён снимка: классы объектов и ресурсы -> коды в массивах"""
+
+    def __init__(self, resources: List[str]):
+        self.types: List[str] = []
+        self.classes: Dict[type, int] = {}
+        self.resources = list(resources)
+        self.resource_codes: Dict[Optional[str], int] = {name: i for i, name in enumerate(self.resources)}
+        self.resource_codes[None] = -1
+
+    def copy(self) -> "Codes":
+        codes = Codes([])
+        codes.types = list(self.types)
+        codes.classes = dict(self.classes)
+        codes.resources = list(self.resources)
+        codes.resource_codes = dict(self.resource_codes)
+        return codes
+
+    def add_classes(self, objects: List):
+        """Завести коды классов objects (в порядке первого появления)"""
+        for cls in dict.fromkeys(map(type, objects)):
+            if cls not in self.classes:
+                self.classes[cls] = len(self.types)
+                self.types.append(cls.__name__)
+
+    def resource(self, name: Optional[str]) -> int:
+        code = self.resource_codes.get(name)
+        if code is None:
+            code = self.resource_codes[name] = len(self.resources)
+            self.resources.append(name)
+        return code
+
+
+class BuildingLayout:
+    """
+    Неизменная часть записей зданий: код типа, позиция, руда бура, столбцы
+    склада. Считается заново, только когда меняется список зданий (или набор
+    ключей бесконечного склада ядра) - здания не двигаются, а снимок
+    делается каждые полсекунды (rewind).
+    """
+
+    def __init__(self, building_list: List):
+        from buildings import MineDrill, Turret
+        from constants import RESOURCES
+
+        self.buildings = building_list
+        self.codes = Codes(RESOURCES)
+        codes = self.codes
+        codes.add_classes(building_list)
+        self.records = np.array([(codes.classes[type(building)], *building.position, 0, 0, 0, 0,
+                                  codes.resource(building.resource_type) if isinstance(building, MineDrill) else -1)
+                                 for building in building_list], dtype=BUILDING_DTYPE)
+        self.turret_index = np.array([i for i, building in enumerate(building_list) if isinstance(building, Turret)],
+                                     dtype=np.intp)
+        self.turrets = [building_list[i] for i in self.turret_index.tolist()]
+        # Склад - строка матрицы: по ячейке на ключ, в порядке ключей словаря
+        keys = [tuple(building.resources) for building in building_list]
+        self.rows = np.repeat(np.arange(len(building_list)), [len(names) for names in keys])
+        self.columns = np.array([codes.resource(name) for names in keys for name in names], dtype=np.intp)
+        self.infinite = [(i, keys[i]) for i, building in enumerate(building_list) if building.is_infinite]
+        # Для маршрутов дронов: объект здания -> номер записи
+        self.index = {id(building): i for i, building in enumerate(building_list)}
+
+    def matches(self, building_list: List) -> bool:
+        return (self.buildings == building_list
+                and all(tuple(building_list[i].resources) == keys for i, keys in self.infinite))
+
+
+_layout: Optional[BuildingLayout] = None
+
+
+def capture_world(view) -> Snapshot:
+    """
+    Снять мир игрового View (основной поток).
+    Возвращает независимую копию - её можно кодировать в другом потоке.
+    """
+    global _layout
+    from drones import Drone
+    from sprite_list import buildings, bugs, players
+
+    # Здания: неизменное - из раскладки, меняющееся - по столбцам
+    building_list = list(buildings)
+    if _layout is None or not _layout.matches(building_list):
+        _layout = BuildingLayout(building_list)
+    layout = _layout
+    codes = layout.codes.copy()
+    records = layout.records.copy()
+    records["hp"] = [building.hp for building in building_list]
+    records["production_timer"] = [building.production_timer for building in building_list]
+    if layout.turrets:
+        records["cooldown"][layout.turret_index] = [turret.current_cooldown for turret in layout.turrets]
+        records["angle"][layout.turret_index] = [turret.tower_angle for turret in layout.turrets]
+    storages = np.zeros((len(building_list), len(codes.resources)), dtype=np.int32)
+    if len(layout.columns):
+        storages[layout.rows, layout.columns] = [amount for building in building_list
+                                                 for amount in building.resources.values()]
+
+    # Дроны (лежат в players вместе с игроком)
+    index = layout.index
+    states = {state: i for i, state in enumerate(DRONE_STATES)}
+    drone_rows = [(drone.center_x, drone.center_y, drone.hp,
+                   index.get(id(drone.source), -1), index.get(id(drone.destination), -1),
+                   states.get(drone.state, 0), codes.resource(drone.cargo), drone.target_x, drone.target_y)
+                  for drone in players if isinstance(drone, Drone)]
+
+    bug_list = list(bugs)
+    codes.add_classes(bug_list)
+    classes = codes.classes
+    bug_rows = [(classes[type(bug)], *bug.position, bug.hp, bug.attack_cooldown) for bug in bug_list]
+
+    player = view.player
+    player_rows = []
+    if player is not None:
+        player_rows.append((player.center_x, player.center_y, player.hp, player.respawn_timer,
+                            player.invulnerable_timer, player.damage_cooldown))
+
+    meta = {
+        "level": view.current_level,
+        "game_time": view.game_time,
+        "wave_index": view.current_wave_index,
+        "wave_timer": view.wave_timer,
+        "enemies_killed": view.enemies_killed,
+        "buildings_built": view.buildings_built,
+        "drones_used": view.drones_used,
+        "types": codes.types,
+        "resources": codes.resources,
+    }
+    arrays = {
+        "buildings": records,
+        "storages": storages,
+        "drones": np.array(drone_rows, dtype=DRONE_DTYPE),
+        "bugs": np.array(bug_rows, dtype=BUG_DTYPE),
+        "player": np.array(player_rows, dtype=PLAYER_DTYPE),
+    }
+    return Snapshot(meta, arrays)
+
+
+def snapshot_classes() -> Dict[str, type]:
+    """Имя класса из снимка -> класс (модули мира импортируются только здесь)"""
+    import buildings
+    import core
+    import enemies
+    classes = {}
+    for module in (buildings, core, enemies):
+        for name in dir(module):
+            value = getattr(module, name)
+            if isinstance(value, type):
+                classes[name] = value
+    return classes
+
+
+def restore_world(view, snapshot: Snapshot):
+    """
+    Расставить мир по снимку. Уровень snapshot.meta["level"] уже должен быть
+    загружен (view.start_level) - здесь заменяются только объекты на нём.
+    """
+    from buildings import MineDrill, Turret
+    from constants import SPRITE_SCALE
+    from core import Core
+    from drones import Drone
+    from sprite_list import buildings, bugs, players
+
+    meta = snapshot.meta
+    types = meta["types"]
+    resources = meta["resources"]
+    classes = snapshot_classes()
+
+    # Мир, расставленный start_level (ядро, игрок), заменяется снимком
+    for building in list(buildings):
+        if isinstance(building, Turret):
+            view.turrets.remove(building)
+        else:
+            view.chunks.remove_building(building)
+    buildings.clear()
+    bugs.clear()
+    for sprite in list(players):
+        if isinstance(sprite, Drone):
+            players.remove(sprite)
+
+    restored = []
+    records = snapshot["buildings"]
+    storages = snapshot["storages"]
+    for record, storage in zip(records, storages):
+        cls = classes[types[record["type"]]]
+        x, y = float(record["x"]), float(record["y"])
+        if issubclass(cls, Core):
+            building = cls(SPRITE_SCALE, x, y)
+            view.core = building
+        elif issubclass(cls, MineDrill):
+            building = cls(x, y, resource_type=resources[record["ore"]])
+        else:
+            building = cls(x, y)
+        building.hp = float(record["hp"])
+        building.production_timer = float(record["production_timer"])
+        amounts = {resources[i]: int(amount) for i, amount in enumerate(storage) if amount}
+        if building.is_infinite:
+            building.resources = amounts
+        else:
+            building.resources = {name: amounts.get(name, 0) for name in building.resources}
+        if isinstance(building, Turret):
+            building.current_cooldown = float(record["cooldown"])
+            building.tower_angle = float(record["angle"])
+            view.turrets.add(building)
+        else:
+            view.chunks.add_building(building)
+        buildings.append(building)
+        restored.append(building)
+    view.turrets.sync_towers(reload=True)
+
+    for record in snapshot["drones"]:
+        drone = Drone(SPRITE_SCALE, float(record["x"]), float(record["y"]))
+        if record["source"] >= 0 and record["destination"] >= 0:
+            drone.set_route(restored[record["source"]], restored[record["destination"]])
+        drone.center_x, drone.center_y = float(record["x"]), float(record["y"])
+        drone.hp = float(record["hp"])
+        drone.state = DRONE_STATES[record["state"]]
+        drone.cargo = resources[record["cargo"]] if record["cargo"] >= 0 else None
+        drone.target_x, drone.target_y = float(record["target_x"]), float(record["target_y"])
+        players.append(drone)
+
+    for record in snapshot["bugs"]:
+        bug = classes[types[record["type"]]](float(record["x"]), float(record["y"]), view.core)
+        bug.hp = float(record["hp"])
+        bug.attack_cooldown = float(record["attack_cooldown"])
+        bugs.append(bug)
+
+    player = view.player
+    if player is not None and len(snapshot["player"]):
+        record = snapshot["player"][0]
+        player.core = view.core
+        player.center_x, player.center_y = float(record["x"]), float(record["y"])
+        player.hp = float(record["hp"])
+        player.respawn_timer = float(record["respawn_timer"])
+        player.invulnerable_timer = float(record["invulnerable_timer"])
+        player.damage_cooldown = float(record["damage_cooldown"])
+
+    view.game_time = meta["game_time"]
+    view.current_wave_index = meta["wave_index"]
+    view.wave_timer = meta["wave_timer"]
+    view.enemies_killed = meta["enemies_killed"]
+    view.buildings_built = meta["buildings_built"]
+    view.drones_used = meta["drones_used"]
+
+
+# === ФОНОВАЯ ЗАПИСЬ ===
+
+class SnapshotWriter:
+    """Кодирование и запись снимков в каталог level.sqlite в фоновом потоке"""
+
+    def __init__(self, db_name: Optional[str] = None, compress: bool = True):
+        self.db_name = db_name
+        self.compress = compress
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.catalog = None  # своё соединение с базой, живёт в потоке записи
+        self.pending: Optional[Future] = None
+
+    @property
+    def busy(self) -> bool:
+        """Идёт ли запись (автосохранение в это время пропускается)"""
+        return self.pending is not None and not self.pending.done()
+
+    def save(self, name: str, snapshot: Snapshot) -> Future:
+        """Поставить снимок на запись в слот name. Возвращает future (entry_id)"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+        self.pending = self.executor.submit(self._write, name, snapshot)
+        return self.pending
+
+    def _write(self, name: str, snapshot: Snapshot) -> int:
+        from level_catalog import LevelCatalog
+        if self.catalog is None:
+            self.catalog = LevelCatalog(self.db_name)
+        data = encode(snapshot, self.compress)
+        return self.catalog.save_slot(name, data, level_number=snapshot.meta["level"])
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Дождаться текущей записи (не дольше timeout секунд). False - запись ещё идёт"""
+        if self.pending is None:
+            return True
+        done, _ = wait_futures([self.pending], timeout)
+        return bool(done)
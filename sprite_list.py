@@ -5,4 +5,8 @@ players = arcade.SpriteList()
 buildings = arcade.SpriteList()
 bugs = arcade.SpriteList()
 good_bullet = arcade.SpriteList()
-bad_bullet = arcade.SpriteList()
\ No newline at end of file
+bad_bullet = arcade.SpriteList()
+
+# Турели рисуются двумя слоями: основания и поворотные башни
+turret_bases = arcade.SpriteList()
+turret_towers = arcade.SpriteList()
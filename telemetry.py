@@ -0,0 +1,240 @@
+# telemetry.py
+"""
+Телеметрия уровня: посекундные счётчики игры в game_database.db.
+
+Счёт ведётся в двух местах:
+- COUNTS - обычный список счётчиков текущей секунды. Здания, дроны и
+  бой прибавляют к нему через produced()/consumed()/count() - это одно
+  сложение в списке, без numpy и без базы;
+- TelemetryRecorder раз в TELEMETRY_INTERVAL секунд игры переносит
+  счётчики (и показатели: число жуков, время кадра) строкой в заранее
+  выделенный кольцевой массив numpy и обнуляет их.
+
+Раз в TELEMETRY_FLUSH_EVERY строк накопленное уходит в базу одним
+executemany в потоке записи (DatabaseWriter), кадр диска не ждёт.
+Строки таблицы telemetry - по сессии (один заход на уровень, см.
+telemetry_sessions) и времени игры. Если поток записи не успевает и
+кольцо переполняется, самые старые строки теряются (счётчик dropped).
+
+Итоги сессии (totals) берутся для статистики уровня: собранные ресурсы,
+убитые жуки.
+"""
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from constants import RESOURCES
+
+# Имена столбцов для ресурсов (в порядке constants.RESOURCES)
+RESOURCE_COLUMNS = ("copper", "tin", "coal", "bronze", "silicon", "ammo")
+RESOURCE_INDEX = {name: i for i, name in enumerate(RESOURCES)}
+
+# Счётчики (сумма за интервал)
+COUNTERS = (
+    tuple(f"produced_{name}" for name in RESOURCE_COLUMNS)
+    + tuple(f"consumed_{name}" for name in RESOURCE_COLUMNS)
+    + ("drone_trips", "shots", "hits", "kills")
+)
+PRODUCED = COUNTERS.index("produced_copper")
+CONSUMED = COUNTERS.index("consumed_copper")
+DRONE_TRIPS = COUNTERS.index("drone_trips")
+SHOTS = COUNTERS.index("shots")
+HITS = COUNTERS.index("hits")
+KILLS = COUNTERS.index("kills")
+
+# Показатели (значение на момент снятия или за интервал)
+GAUGES = ("bugs", "frame_ms", "frame_ms_max")
+
+COLUMNS = COUNTERS + GAUGES
+
+# Раз в сколько секунд игры снимается строка
+TELEMETRY_INTERVAL = 1.0
+
+# Сколько строк держит кольцо (10 минут игры)
+TELEMETRY_CAPACITY = 600
+
+# Раз в сколько строк отправлять накопленное в базу
+TELEMETRY_FLUSH_EVERY = 30
+
+# Счётчики текущего интервала (см. produced/consumed/count)
+COUNTS: List[int] = [0] * len(COUNTERS)
+
+
+def produced(resource: str, amount: int = 1):
+    """Здание выработало ресурс"""
+    COUNTS[PRODUCED + RESOURCE_INDEX[resource]] += amount
+
+
+def consumed(resource: str, amount: int = 1):
+    """Ресурс потрачен (сырьё, топливо, патроны)"""
+    COUNTS[CONSUMED + RESOURCE_INDEX[resource]] += amount
+
+
+def count(counter: int, amount: int = 1):
+    """Прибавить к счётчику (DRONE_TRIPS, SHOTS, HITS, KILLS)"""
+    COUNTS[counter] += amount
+
+
+def create_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS telemetry_sessions (
+            session_id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            level_number INTEGER NOT NULL,
+            started TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    columns = ",\n".join(f"{name} INTEGER NOT NULL" for name in COUNTERS)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS telemetry (
+            session_id INTEGER NOT NULL,
+            t REAL NOT NULL,
+            {columns},
+            bugs INTEGER NOT NULL,
+            frame_ms REAL NOT NULL,
+            frame_ms_max REAL NOT NULL,
+            PRIMARY KEY (session_id, t)
+        ) WITHOUT ROWID
+    ''')
+
+
+INSERT_SQL = (f"INSERT OR REPLACE INTO telemetry (session_id, t, {', '.join(COLUMNS)}) "
+              f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))})")
+
+
+def _start_session(cursor, session_id: int, user_id: Optional[int], level_number: int):
+    cursor.execute(
+        "INSERT OR IGNORE INTO telemetry_sessions (session_id, user_id, level_number) VALUES (?, ?, ?)",
+        (session_id, user_id, level_number)
+    )
+
+
+def _write_rows(cursor, rows: List[List[float]]):
+    cursor.executemany(INSERT_SQL, rows)
+
+
+def read_session(connection, session_id: int) -> Dict[str, np.ndarray]:
+    """Телеметрия сессии по столбцам: {'t': ..., 'shots': ..., ...}"""
+    rows = connection.execute(
+        f"SELECT t, {', '.join(COLUMNS)} FROM telemetry WHERE session_id = ? ORDER BY t",
+        (session_id,)
+    ).fetchall()
+    table = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS) + 1)
+    return {name: table[:, i] for i, name in enumerate(("t",) + COLUMNS)}
+
+
+class TelemetryRecorder:
+    """Кольцевой буфер посекундных строк с пакетной записью в базу"""
+
+    def __init__(self, capacity: int = TELEMETRY_CAPACITY, interval: float = TELEMETRY_INTERVAL,
+                 flush_every: int = TELEMETRY_FLUSH_EVERY):
+        self.capacity = capacity
+        self.interval = interval
+        self.flush_every = flush_every
+        # Строка: время игры, затем COLUMNS
+        self.rows = np.zeros((capacity, len(COLUMNS) + 1), dtype=np.float64)
+        self.totals = np.zeros(len(COUNTERS), dtype=np.int64)
+        self.head = 0  # куда пишется следующая строка
+        self.pending = 0  # строк, ещё не отправленных в базу
+        self.timer = 0.0
+        self.frame_sum = 0.0
+        self.frame_max = 0.0
+        self.frames = 0
+
+        self.session_id: Optional[int] = None
+        self.db = None  # GameDatabase (берётся при первом начале сессии)
+        self.persist = True  # писать ли сессии в базу (False - только счётчики в памяти)
+
+        # Счётчики для отладки
+        self.flushes = 0
+        self.dropped = 0
+
+    def start(self, level_number: int, user_id: Optional[int] = None):
+        """Новая сессия (заход на уровень): предыдущая дописывается в базу"""
+        self.flush()
+        self.totals[:] = 0
+        COUNTS[:] = [0] * len(COUNTERS)
+        self.timer = 0.0
+        self.frame_sum = self.frame_max = 0.0
+        self.frames = 0
+        self.session_id = time.time_ns()
+        if not self.persist:
+            return
+        if self.db is None:
+            from database import GameDatabase
+            self.db = GameDatabase.shared()
+        self.db.writer.submit(_start_session, self.session_id, user_id, level_number)
+
+    # === ЗАПИСЬ ===
+
+    def frame(self, frame_ms: float):
+        """Время очередного кадра (из on_draw)"""
+        self.frame_sum += frame_ms
+        self.frames += 1
+        if frame_ms > self.frame_max:
+            self.frame_max = frame_ms
+
+    def update(self, game_time: float, delta_time: float, bug_count: int) -> bool:
+        """Раз в кадр: снять строку, если подошло время. Возвращает, была ли строка"""
+        self.timer += delta_time
+        if self.timer < self.interval:
+            return False
+        self.timer -= self.interval
+        self.sample(game_time, bug_count)
+        if self.pending >= self.flush_every:
+            self.flush()
+        return True
+
+    def sample(self, game_time: float, bug_count: int):
+        """Перенести счётчики интервала строкой в кольцо и обнулить их"""
+        row = self.rows[self.head]
+        row[0] = game_time
+        row[1:len(COUNTERS) + 1] = COUNTS
+        row[len(COUNTERS) + 1:] = (bug_count,
+                                   self.frame_sum / self.frames if self.frames else 0.0,
+                                   self.frame_max)
+        self.totals += COUNTS
+        COUNTS[:] = [0] * len(COUNTERS)
+        self.frame_sum = self.frame_max = 0.0
+        self.frames = 0
+
+        self.head = (self.head + 1) % self.capacity
+        if self.pending == self.capacity:
+            self.dropped += 1
+        else:
+            self.pending += 1
+
+    def flush(self):
+        """Отправить неотправленные строки в базу одним executemany"""
+        if not self.pending or self.session_id is None:
+            return
+        if not self.persist:
+            self.pending = 0
+            return
+        order = np.arange(self.head - self.pending, self.head) % self.capacity
+        table = self.rows[order]
+        rows = [[self.session_id] + row for row in table.tolist()]
+        self.pending = 0
+        self.db.writer.submit(_write_rows, rows)
+        self.flushes += 1
+
+    # === ИТОГИ ===
+
+    def total(self, counter: int) -> int:
+        """Сумма счётчика за сессию (вместе с ещё не снятым интервалом)"""
+        return int(self.totals[counter]) + COUNTS[counter]
+
+    def resources_produced(self) -> int:
+        """Сколько всего ресурсов выработано за сессию"""
+        end = PRODUCED + len(RESOURCE_COLUMNS)
+        return int(self.totals[PRODUCED:end].sum()) + sum(COUNTS[PRODUCED:end])
+
+    def get_info(self) -> Dict[str, float]:
+        return {
+            "session": self.session_id,
+            "pending": self.pending,
+            "capacity": self.capacity,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,66 @@
+# tests/conftest.py
+"""
+Общие настройки тестов: игра без дисплея (headless.py), рабочая папка -
+корень игры (пути к картинкам и картам в коде относительные), базы
+game_database.db и level.sqlite - во временной папке.
+
+Запуск (из корня игры):
+    python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import headless
+
+headless.prepare()
+
+# Мир для тестов снимков: по несколько зданий каждого класса, дронов и жуков
+WORLD_SIZES = {"bugs": 2, "turrets": 2, "drones": 6, "production": 2}
+WORLD_TICKS = 30
+
+
+@pytest.fixture(scope="session", autouse=True)
+def scratch_databases(tmp_path_factory):
+    """Настоящие сохранения и рекорды тесты не трогают"""
+    import database
+    import level_catalog
+    directory = tmp_path_factory.mktemp("databases")
+    database.DB_NAME = str(directory / "game_database.db")
+    level_catalog.LEVEL_DB = str(directory / "level.sqlite")
+    yield directory
+    database.GameDatabase.close_shared()
+
+
+@pytest.fixture(scope="session")
+def window():
+    import arcade
+    window = arcade.Window(800, 600, "tests", visible=False)
+    yield window
+    window.close()
+
+
+@pytest.fixture
+def world(window):
+    """Уровень 1 без записи на диск с постройками, дронами и жуками после WORLD_TICKS тиков"""
+    from bench_simulation import Scenario
+    from game import GameView
+    view = GameView.for_window(window, 1, offline=True)
+    window.show_view(view)
+    scenario = Scenario(view, WORLD_SIZES)
+    # Бур другой руды: у зданий одного класса бывают разные склады
+    from constants import T_SIZE
+    from sprite_list import buildings
+    drill = scenario.producers[0]
+    tin_drill = type(drill)(drill.center_x, drill.center_y + 6 * T_SIZE, "Олово")
+    tin_drill.add("Олово", 3)
+    buildings.append(tin_drill)
+    view.chunks.add_building(tin_drill)
+    for _ in range(WORLD_TICKS):
+        view.on_update(1 / 60)
+    return view
@@ -0,0 +1,71 @@
+# tests/test_asset_pack.py
+"""Пак ассетов: сборка, чтение записей через mmap и проверка хэшей"""
+import os
+
+import pytest
+
+import asset_pack
+from asset_pack import PACK_ALIGN, AssetPack, build_pack
+
+IMAGES = [("Изображения/a.png", "image", b"\x89PNG" + bytes(range(40))),
+          ("Изображения/Папка/b.png", "image", b"")]
+SOUNDS = [("mp/click.wav", "sound", b"RIFF" * 100)]
+LEVELS = [("level_cache/level_1.npy", "level", os.urandom(1000)),
+          ("level_cache/level_1.json", "level_meta", b'{"width": 10}')]
+
+
+@pytest.fixture
+def pack_path(tmp_path, monkeypatch):
+    """Пак из маленьких синтетических записей (без настоящих картинок и mp.zip)"""
+    monkeypatch.setattr(asset_pack, "collect_images", lambda: iter(IMAGES))
+    monkeypatch.setattr(asset_pack, "collect_sounds", lambda zip_path: iter(SOUNDS))
+    monkeypatch.setattr(asset_pack, "collect_levels", lambda: iter(LEVELS))
+    path = str(tmp_path / "assets.pack")
+    build_pack(path)
+    return path
+
+
+def test_build_and_read(pack_path):
+    pack = AssetPack(pack_path)
+    try:
+        assert pack.open()
+        assert sorted(pack.names()) == sorted(name for name, _, _ in IMAGES + SOUNDS + LEVELS)
+        assert pack.names("level_meta") == ["level_cache/level_1.json"]
+        for name, entry_type, data in IMAGES + SOUNDS + LEVELS:
+            entry = pack.get(name)
+            assert entry.type == entry_type
+            assert entry.offset % PACK_ALIGN == 0
+            assert bytes(pack.view(name)) == data
+            assert pack.open_file(name).read() == data
+            assert pack.verify(name)
+        assert ".\\Изображения\\a.png" in pack
+        assert "нет/такого.png" not in pack
+    finally:
+        pack.close()
+
+
+def test_verify_detects_damage(pack_path):
+    pack = AssetPack(pack_path)
+    assert pack.open()
+    offset = pack.get("mp/click.wav").offset
+    pack.close()
+    with open(pack_path, "r+b") as f:
+        f.seek(offset)
+        f.write(b"X")
+
+    pack = AssetPack(pack_path)
+    try:
+        assert pack.open()
+        assert not pack.verify("mp/click.wav")
+        assert pack.verify("level_cache/level_1.npy")
+    finally:
+        pack.close()
+
+
+def test_missing_or_foreign_pack(tmp_path):
+    assert not AssetPack(str(tmp_path / "none.pack")).open()
+    foreign = tmp_path / "foreign.pack"
+    foreign.write_bytes(b"not a pack" * 10)
+    pack = AssetPack(str(foreign))
+    assert not pack.open()
+    assert pack.failed
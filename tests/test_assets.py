@@ -0,0 +1,54 @@
+# tests/test_assets.py
+"""Фоновый загрузчик ассетов: упавшая загрузка не остаётся в кэше"""
+import threading
+
+from assets import AssetLoader
+
+
+def settle(future):
+    """Дождаться колбэков задачи (они идут по порядку добавления, после ожидающих result())"""
+    done = threading.Event()
+    future.add_done_callback(lambda _: done.set())
+    assert done.wait(5)
+
+
+def test_failed_preload_is_retried():
+    loader = AssetLoader(audio=None, manifest={})
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("файл ещё не скачан")
+        return "готово"
+
+    assert loader.require("flaky") is None  # вне манифеста и не запущена
+    first = loader.preload("flaky", flaky)
+    settle(first)
+    assert first.exception() is not None
+    assert not loader.is_ready("flaky") and loader.get("flaky") is None
+    assert loader.preload("flaky", flaky).result() == "готово"
+    assert loader.get("flaky") == "готово" and len(calls) == 2
+    loader.shutdown()
+
+
+def test_get_requeues_failed_manifest_asset(monkeypatch):
+    loader = AssetLoader(audio=None, manifest={"icon": ("hud", "texture", "icon.png")})
+    loaded = threading.Event()
+    results = iter([OSError("битый файл"), "текстура"])
+
+    def load(key):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        loaded.set()
+        return result
+
+    monkeypatch.setattr(loader, "_load", load)
+    monkeypatch.setattr(loader, "_open_pack", lambda: False)
+    settle(loader.load_group("hud")[0])
+    assert not loader.is_ready("icon")
+    assert loader.get("icon", "заглушка") == "заглушка"  # ставит загрузку заново
+    assert loaded.wait(5)
+    assert loader.require("icon") == "текстура"
+    loader.shutdown()
@@ -0,0 +1,97 @@
+# tests/test_database.py
+"""Фоновая запись в базу (пачки транзакций, откат одной записи) и кэш профилей игроков"""
+import sqlite3
+import threading
+
+import pytest
+
+from database import DatabaseWriter, GameDatabase
+
+
+def insert(cursor: sqlite3.Cursor, *values: int):
+    for value in values:
+        cursor.execute("INSERT INTO items (value) VALUES (?)", (value,))
+    return len(values)
+
+
+@pytest.fixture
+def writer(tmp_path):
+    path = str(tmp_path / "writer.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE items (value INTEGER UNIQUE)")
+    connection.close()
+    writer = DatabaseWriter(path)
+    yield writer
+    writer.stop()
+
+
+def stored(writer: DatabaseWriter):
+    connection = sqlite3.connect(writer.db_name)
+    try:
+        return [row[0] for row in connection.execute("SELECT value FROM items ORDER BY value")]
+    finally:
+        connection.close()
+
+
+def test_failed_job_rolls_back_only_itself(writer):
+    # Поток занят первой записью, пока в очередь встают остальные - они уйдут одной пачкой
+    started, release = threading.Event(), threading.Event()
+    writer.submit(lambda cursor: (started.set(), release.wait(5)))
+    assert started.wait(5)
+    first = writer.submit(insert, 1)
+    broken = writer.submit(insert, 2, 1)  # 2 запишется, 1 - повтор: запись падает целиком
+    last = writer.submit(insert, 3)
+    release.set()
+
+    assert first.result(5) == 1
+    assert last.result(5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        broken.result(5)
+    assert stored(writer) == [1, 3]
+
+
+def test_flush_and_stop_finish_the_queue(writer):
+    futures = [writer.submit(insert, value) for value in range(10)]
+    writer.flush()
+    assert all(future.done() for future in futures)
+    writer.submit(insert, 10)
+    writer.stop()
+    assert stored(writer) == list(range(11))
+
+
+LEVEL_RECORD = {'level_number': 1, 'score': 120, 'enemies_killed': 7, 'time_spent': 95.5,
+                'waves_completed': 3, 'resources_collected': 40, 'buildings_built': 5, 'drones_used': 2}
+
+
+@pytest.fixture
+def db(tmp_path):
+    with GameDatabase(str(tmp_path / "game.db")) as db:
+        yield db
+
+
+def test_profile_is_cached_until_a_write(db):
+    user_id = db.register_user("tester")
+    profile = db.get_profile(user_id)
+    assert profile['records'] == {}
+    assert db.get_profile(user_id) is profile
+
+    db.save_level_record(user_id, LEVEL_RECORD)
+    db.flush()  # запись закончена, колбэки сброса кэша отработали
+    profile = db.get_profile(user_id)
+    assert profile['records'][1]['score'] == 120
+    assert profile['stats']['total_enemies_killed'] == 7
+    assert db.get_profile(user_id) is profile
+
+
+def test_read_overtaken_by_a_write_is_not_cached(db, monkeypatch):
+    user_id = db.register_user("tester")
+    load = db._load_profile
+
+    def load_during_write(user):
+        profile = load(user)
+        db.invalidate_profile(user)  # запись завершилась, пока шёл запрос
+        return profile
+
+    monkeypatch.setattr(db, "_load_profile", load_during_write)
+    db.get_profile(user_id)
+    assert user_id not in db.profiles
@@ -0,0 +1,111 @@
+# tests/test_leaderboard.py
+"""Лидерборд: места и страницы по гистограмме против обычной сортировки всей таблицы"""
+import random
+import sqlite3
+
+import pytest
+
+from leaderboard import LEADERBOARD_BLOCK, LEADERBOARD_BUCKET, Leaderboard, create_tables, rebuild_buckets, \
+    submit_score
+
+BOARDS = (0, 1)
+PLAYERS = 120
+
+
+@pytest.fixture(scope="module")
+def board():
+    connection = sqlite3.connect(":memory:")
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT)")
+    cursor.executemany("INSERT INTO users VALUES (?, ?)",
+                       [(user_id, f"player{user_id}") for user_id in range(1, PLAYERS + 1)])
+    create_tables(cursor)
+
+    rng = random.Random(7)
+    # Края корзин и блоков гистограммы, ноль и отрицательные очки
+    block = LEADERBOARD_BUCKET * LEADERBOARD_BLOCK
+    edges = [k * width + d for width in (LEADERBOARD_BUCKET, block)
+             for k in range(-3, 4) for d in (-1, 0, 1)]
+    for _ in range(PLAYERS * 3):
+        score = rng.choice(edges) if rng.random() < 0.5 else rng.randint(-block, 3 * block)
+        # Немного одинаковых tiebreak, чтобы места решал user_id
+        submit_score(cursor, rng.choice(BOARDS), rng.randint(1, PLAYERS), score,
+                     tiebreak=rng.choice((1.0, 2.0, rng.random() * 10)))
+    connection.commit()
+    yield Leaderboard(connection)
+    connection.close()
+
+
+def expected(leaderboard, board_id):
+    return leaderboard.cursor.execute('''
+        SELECT neg_score, tiebreak, user_id FROM leaderboard
+        WHERE board = ? ORDER BY neg_score, tiebreak, user_id
+    ''', (board_id,)).fetchall()
+
+
+def keys(entries):
+    return [entry.key for entry in entries]
+
+
+def ranks(entries):
+    return [entry.rank for entry in entries]
+
+
+@pytest.mark.parametrize("board_id", BOARDS)
+def test_rank_of(board, board_id):
+    order = expected(board, board_id)
+    assert board.size(board_id) == len(order)
+    for place, key in enumerate(order, 1):
+        assert board.rank_of(board_id, key[2]) == place
+    ranked = {key[2] for key in order}
+    missing = next(user_id for user_id in range(1, PLAYERS + 2) if user_id not in ranked)
+    assert board.rank_of(board_id, missing) is None
+
+
+@pytest.mark.parametrize("board_id", BOARDS)
+def test_pages_by_key(board, board_id):
+    order = expected(board, board_id)
+    first = board.page_after(board_id, None, 7)
+    assert keys(first) == order[:7] and ranks(first) == list(range(1, 8))
+    for i, key in enumerate(order):
+        after = board.page_after(board_id, key, 7)
+        assert keys(after) == order[i + 1:i + 8]
+        assert ranks(after) == list(range(i + 2, i + 2 + len(after)))
+        before = board.page_before(board_id, key, 7)
+        assert keys(before) == order[max(0, i - 7):i]
+        assert ranks(before) == list(range(max(0, i - 7) + 1, i + 1))
+    assert all(entry.username == f"player{entry.user_id}" for entry in first)
+
+
+@pytest.mark.parametrize("board_id", BOARDS)
+def test_page_at_rank(board, board_id):
+    order = expected(board, board_id)
+    for rank in range(1, len(order) + 3):
+        page = board.page_at_rank(board_id, rank, 5)
+        assert keys(page) == order[rank - 1:rank + 4]
+        assert ranks(page) == list(range(rank, rank + len(page)))
+
+
+def test_only_better_result_counts(board):
+    user_id = expected(board, 1)[0][2]
+    cursor = board.cursor
+    best = board.key_of(1, user_id)
+    assert not submit_score(cursor, 1, user_id, -best[0] - 1, 0.0)
+    assert board.key_of(1, user_id) == best
+    size = board.size(1)
+    assert submit_score(cursor, 1, user_id, -best[0] + 5, 0.0)
+    assert board.rank_of(1, user_id) == 1 and board.size(1) == size
+    cursor.connection.rollback()
+
+
+def test_histogram_matches_rebuild(board):
+    """Гистограмма, которую ведёт submit_score, совпадает с пересчитанной заново"""
+    def histogram():
+        return [board.cursor.execute(f"SELECT * FROM {table} WHERE entries != 0 ORDER BY 1, 2").fetchall()
+                for table in ("leaderboard_buckets", "leaderboard_blocks")]
+
+    kept = histogram()
+    assert len(kept[1]) > 4  # записи в нескольких блоках
+    rebuild_buckets(board.cursor)
+    assert histogram() == kept
+    board.cursor.connection.rollback()
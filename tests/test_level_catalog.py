@@ -0,0 +1,87 @@
+# tests/test_level_catalog.py
+"""Каталог level.sqlite: запись и чтение блобов по частям, замена, удаление и сжатие файла"""
+import os
+import sqlite3
+
+import pytest
+
+from level_catalog import BLOB_CHUNK, LevelCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    with LevelCatalog(str(tmp_path / "level.sqlite")) as catalog:
+        yield catalog
+
+
+def test_put_and_read(catalog):
+    small = b'{"map": 1}'
+    big = os.urandom(BLOB_CHUNK * 3 + 123)  # несколько порций и хвост
+    catalog.put("level", "1", small, level_number=1, waves="[[1]]")
+    catalog.save_slot("autosave", big, level_number=1)
+    catalog.save_slot("empty", b"")
+
+    assert catalog.read("level", "1") == small
+    assert catalog.load_slot("autosave") == big
+    assert catalog.load_slot("empty") == b""
+    assert catalog.load_slot("нет такого") is None
+
+    entry = catalog.find("level", "1")
+    assert (entry.level_number, entry.size, entry.waves) == (1, len(small), "[[1]]")
+    assert sorted(entry.name for entry in catalog.list_saves()) == ["autosave", "empty"]
+    assert [entry.name for entry in catalog.list_levels()] == ["1"]
+
+
+def test_put_replaces_same_name(catalog):
+    first = catalog.save_slot("slot", b"a" * 1000)
+    second = catalog.save_slot("slot", b"b" * 10)
+    assert first == second
+    assert catalog.load_slot("slot") == b"b" * 10
+    assert len(catalog.list_saves()) == 1
+
+
+def test_read_checks_checksum(catalog):
+    entry_id = catalog.save_slot("slot", b"hello world")
+    with catalog.connection.blobopen("blobs", "data", entry_id) as blob:
+        blob.write(b"J")
+    catalog.connection.commit()
+    assert catalog.load_slot("slot") is None
+
+
+def test_delete_and_compact(catalog):
+    path = catalog.db_name
+    for i in range(4):
+        catalog.save_slot(f"slot{i}", os.urandom(BLOB_CHUNK * 4))
+    full_size = os.path.getsize(path)
+
+    assert catalog.delete("save", "slot0")
+    assert not catalog.delete("save", "slot0")
+    for i in range(1, 4):
+        catalog.delete("save", f"slot{i}")
+    assert catalog.list_saves() == []
+    # delete() сам возвращает файлу освободившиеся страницы
+    assert catalog.cursor.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert os.path.getsize(path) < full_size / 4
+    assert catalog.cursor.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
+
+
+def test_compact_below_threshold(catalog):
+    catalog.save_slot("slot", b"x" * 100)
+    catalog.delete("save", "slot")
+    assert catalog.compact() == 0
+
+
+def test_legacy_table_is_migrated(tmp_path):
+    path = str(tmp_path / "legacy.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE levels (name TEXT, voln TEXT, json BLOB, players_bugs_buildings BLOB)")
+    connection.execute("INSERT INTO levels VALUES ('2', '[[3]]', ?, ?)", (b"map", b"world"))
+    connection.commit()
+    connection.close()
+
+    with LevelCatalog(path) as catalog:
+        assert catalog.read("level", "2") == b"map"
+        assert catalog.load_slot("2") == b"world"
+        assert catalog.find("level", "2").waves == "[[3]]"
+        assert catalog.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'levels'").fetchone() is None
@@ -0,0 +1,61 @@
+# tests/test_rewind.py
+"""Буфер перемотки: разницы массивов и сборка кадров из ключевого кадра и разниц"""
+import numpy as np
+
+from rewind import RewindBuffer, apply, diff
+from snapshot import BUG_DTYPE, capture_world
+
+from test_snapshot import assert_same
+
+
+def test_diff_apply_records():
+    previous = np.zeros(4, dtype=BUG_DTYPE)
+    current = previous.copy()
+    current["hp"][1] = 5
+    current["x"][3] = 7.5
+    change = diff(previous, current)
+    assert change[0] == "fields"
+    assert sorted(change[1]) == ["hp", "x"]
+    assert apply(previous, change).tobytes() == current.tobytes()
+    assert previous["hp"][1] == 0  # исходный массив не меняется
+    assert diff(current, current.copy()) is None
+
+
+def test_diff_apply_matrix_and_resize():
+    previous = np.arange(12, dtype=np.int32).reshape(4, 3)
+    current = previous.copy()
+    current[2, 1] = -1
+    change = diff(previous, current)
+    assert change[0] == "rows" and change[1].tolist() == [2]
+    assert np.array_equal(apply(previous, change), current)
+
+    grown = np.vstack([current, current[:1]])
+    change = diff(current, grown)
+    assert change[0] == "full"
+    assert np.array_equal(apply(current, change), grown)
+
+
+def test_buffer_rebuilds_every_frame(world):
+    buffer = RewindBuffer(keyframe_every=4)
+    captured = []
+    for _ in range(10):
+        for _ in range(6):
+            world.on_update(1 / 60)
+        snapshot = capture_world(world)
+        buffer.record(snapshot)
+        captured.append(snapshot)
+
+    assert sum(frame.keyframe for frame in buffer.frames) == 3
+    for index, snapshot in enumerate(captured):
+        assert_same(buffer.snapshot_at(index), snapshot)
+
+
+def test_rewind_restores_world(world):
+    buffer = RewindBuffer(interval=0.1)
+    for _ in range(60):
+        world.on_update(1 / 60)
+        buffer.update(world, 1 / 60)
+    target = buffer.snapshot_at(0)
+    assert buffer.rewind(world, buffer.available())
+    assert_same(capture_world(world), target)
+    assert len(buffer.frames) == 1
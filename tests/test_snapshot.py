@@ -0,0 +1,60 @@
+# tests/test_snapshot.py
+"""Формат снимка мира: кодирование, разбор и расстановка мира без потерь"""
+import numpy as np
+import pytest
+
+from snapshot import HEADER, Snapshot, capture_world, decode, encode, restore_world
+
+
+def assert_same(actual: Snapshot, expected: Snapshot):
+    """Метаданные равны, массивы совпадают побайтно (тип, форма, данные)"""
+    assert actual.meta == expected.meta
+    assert sorted(actual.arrays) == sorted(expected.arrays)
+    for name, array in expected.arrays.items():
+        assert actual[name].dtype == array.dtype, name
+        assert actual[name].shape == array.shape, name
+        assert actual[name].tobytes() == array.tobytes(), name
+
+
+def test_world_is_not_empty(world):
+    snapshot = capture_world(world)
+    for name in ("buildings", "storages", "drones", "bugs", "player"):
+        assert len(snapshot[name]), name
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_encode_decode_round_trip(world, compress):
+    snapshot = capture_world(world)
+    assert_same(decode(encode(snapshot, compress)), snapshot)
+
+
+def test_restore_then_capture_is_bit_exact(world):
+    snapshot = decode(encode(capture_world(world)))
+    restore_world(world, snapshot)
+    assert_same(capture_world(world), snapshot)
+
+
+def test_decode_rejects_foreign_data():
+    data = bytearray(encode(Snapshot({}, {"bugs": np.zeros(3, dtype=np.float32)})))
+    data[:8] = b"NOTASNAP"
+    with pytest.raises(ValueError):
+        decode(bytes(data))
+
+
+@pytest.mark.parametrize("damage", ["short", "body", "legacy"])
+def test_decode_damaged_data_is_value_error(damage):
+    data = encode(Snapshot({"level": 1}, {"bugs": np.zeros(3, dtype=np.float32)}))
+    if damage == "short":
+        data = data[:10]
+    elif damage == "body":
+        data = data[:HEADER.size] + b"\0" * 32  # заголовок цел, сжатые секции - нет
+    else:
+        data = b'{"players": [], "bugs": []}'  # сохранение из старой таблицы levels
+    with pytest.raises(ValueError):
+        decode(data)
+
+
+def test_load_game_skips_unreadable_save(world):
+    world.get_catalog().save_slot("старое", b'{"players": []}', level_number=1)
+    assert world.load_game("старое") is False
+    assert world.load_game("нет такого") is False